@@ -1,449 +1,721 @@
-import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from config import executar_query
-from sqlalchemy.exc import OperationalError
-import logging
-
-# ================================
-# DASHBOARD PRINCIPAL
-# ================================
-def dashboardDesAlunoIlha(email_hash=None):
-
-    # ----------------------------------------------------------
-    # QUERY
-    # ----------------------------------------------------------
-    query = """
-    SELECT 
-        s.name AS escola_nome,
-        t.education_level AS turma_nivel,
-        t.shift AS turma_turno,
-        t.grade AS turma_serie,
-        t.name AS turma_nome,
-        t.year AS turma_ano,
-        a.name AS aluno_nome,
-        av.status AS avaliacao_status,
-        av.interpretation_score AS pts_ilha_leitura,
-        av.scriptura_score AS pts_ilha_escrita,
-        av.lectio_score AS pts_ilha_letras_palavras,
-        av.visualis_score AS pts_ilha_atencao_visual,
-        av.grafomo_score AS pts_ilha_habilidades_motoras,
-        av.meta_score AS pts_ilha_rima,
-        av.opus_score AS pts_ilha_memoria,
-        av.calculum_score AS pts_ilha_calculo
-    FROM auth.users u
-    JOIN auth.school_users su ON u.id = su.user_id
-    JOIN core.schools s ON su.school_id = s.id
-    JOIN core.school_classes t ON s.id = t.school_id
-    JOIN core.children a ON t.id = a.class_id
-    JOIN littera.children_avaliation av ON a.id = av.child_id
-    WHERE av.status = 'Concluido'
-    AND u.email_hash = :email_hash
-    ORDER BY t.grade;
-    """
-
-    # ----------------------------------------------------------
-    # EXECUTAR QUERY
-    # ----------------------------------------------------------
-    try:
-        df = executar_query(query, params={"email_hash": email_hash})
-    except OperationalError as e:
-        logging.error(f"Falha ao conectar banco: {e}")
-        st.error("Erro temporário ao conectar. Tente novamente mais tarde.")
-        return
-    except Exception as e:
-        logging.error(f"Erro inesperado: {e}")
-        st.error("Ocorreu um erro inesperado.")
-        return
-
-    if df.empty:
-        st.warning("Nenhum registro encontrado.")
-        return
-
-    # ----------------------------------------------------------
-    # IDENTIFICADOR COMPLETO DA TURMA
-    # ----------------------------------------------------------
-    df["turma_id"] = (
-        df["turma_ano"].astype(str) + ": " +
-        df["turma_serie"].astype(str) + "ª série " +
-        df["turma_nome"].astype(str) + " " +
-        df["turma_turno"].astype(str)
-    )
-
-    # ----------------------------------------------------------
-    # CONFIG STREAMLIT
-    # ----------------------------------------------------------
-    st.set_page_config(
-        page_title="Alunos x Ilhas",
-        page_icon="📊",
-        layout="wide"
-    )
-
-    st.markdown(
-        "<h2 style='color: #5A6ACF;'>📊 Desempenho dos Alunos e Turmas nas Ilhas de Conhecimento</h2>",
-        unsafe_allow_html=True
-    )
-
-    # ----------------------------------------------------------
-    # CSS — CARDS MODERNOS
-    # ----------------------------------------------------------
-    st.markdown("""
-    <style>
-
-        /* -----------------------------
-        REMOVER HEADER E AJUSTAR LAYOUT
-        ----------------------------- */
-        [data-testid="stHeader"], 
-        div[role="banner"] { 
-            display: none !important; 
-        }
-
-        body, .stApp, [data-testid="stAppViewContainer"], 
-        [data-testid="stBlock"], .main, .block-container {
-            padding-top: 0 !important; 
-            margin-top: 0 !important;
-        }
-
-
-        /* -----------------------------
-        CARDS MODERNOS
-        ----------------------------- */
-        .card {
-            background-color: #ffffff;
-            padding: 20px;
-            border-radius: 16px;
-            box-shadow: 0 4px 10px rgba(0,0,0,0.08);
-            text-align: center;
-            transition: transform 0.15s ease, box-shadow 0.15s ease;
-        }
-        .card:hover {
-            transform: translateY(-4px);
-            box-shadow: 0 8px 20px rgba(0,0,0,0.12);
-        }
-        .card-title {
-            font-size: 16px;
-            color: #444;
-            font-weight: 600;
-        }
-        .card-value {
-            font-size: 28px;
-            font-weight: 800;
-            color: #5A6ACF;
-        }
-        .card-sub {
-            font-size: 14px;
-            color: #666;
-        }
-
-
-        /* -----------------------------
-        MULTISELECT / SELECT – ESTILO BASE
-        ----------------------------- */
-
-        /* Caixa geral */
-        div[data-baseweb="select"] {
-            border-radius: 12px !important;
-            border: 1px solid #d5d5d5 !important;
-            padding: 4px !important;
-            background-color: #ffffff !important;
-            transition: border-color 0.2s ease, box-shadow 0.2s ease;
-        }
-
-        /* Foco */
-        div[data-baseweb="select"]:focus-within {
-            border-color: #5A6ACF !important;
-            box-shadow: 0 0 0 2px rgba(90, 106, 207, 0.25) !important;
-        }
-
-        /* Texto */
-        div[data-baseweb="select"] div {
-            font-size: 15px !important;
-            color: #333 !important;
-        }
-
-        /* Hover no item da lista */
-        ul[role="listbox"] > li:hover {
-            background-color: #eef0ff !important;
-            color: #5A6ACF !important;
-            cursor: pointer !important;
-        }
-
-
-        /* -----------------------------
-        FIX DEFINITIVO DO FUNDO PRETO
-        (Chips + item selecionado)
-        ----------------------------- */
-
-        /* Chip do multiselect */
-        div[data-baseweb="tag"][class] {
-            background: #EEF0FF !important;
-            background-color: #EEF0FF !important;
-            color: #5A6ACF !important;
-            border-radius: 10px !important;
-            padding: 2px 8px !important;
-        }
-
-        /* Texto do chip */
-        div[data-baseweb="tag"][class] span {
-            color: #5A6ACF !important;
-            font-weight: 600 !important;
-        }
-
-        /* Ícone X do chip */
-        div[data-baseweb="tag"][class] svg {
-            fill: #5A6ACF !important;
-        }
-
-        /* Item selecionado na lista */
-        ul[role="listbox"] > li[aria-selected="true"] {
-            background: #5A6ACF !important;
-            color: white !important;
-        }
-
-    </style>
-
-    """, unsafe_allow_html=True)
-
-    # ----------------------------------------------------------
-    # LISTA DE ILHAS
-    # ----------------------------------------------------------
-    ILHAS = [
-        "pts_ilha_leitura",
-        "pts_ilha_escrita",
-        "pts_ilha_letras_palavras",
-        "pts_ilha_atencao_visual",
-        "pts_ilha_habilidades_motoras",
-        "pts_ilha_rima",
-        "pts_ilha_memoria",
-        "pts_ilha_calculo"
-    ]
-
-    ILHAS_LABELS = {
-        "pts_ilha_leitura": "Leitura",
-        "pts_ilha_escrita": "Escrita",
-        "pts_ilha_letras_palavras": "Letras e Palavras",
-        "pts_ilha_atencao_visual": "Atenção Visual",
-        "pts_ilha_habilidades_motoras": "Habilidades Motoras",
-        "pts_ilha_rima": "Rima",
-        "pts_ilha_memoria": "Memória",
-        "pts_ilha_calculo": "Cálculo"
-    }
-
-    # ----------------------------------------------------------
-    # MULTISELECT COM TRATAMENTO "TODOS"
-    # ----------------------------------------------------------
-    turmas = sorted(df["turma_id"].unique())
-    opcoes_turmas = ["Todos"] + turmas
-
-    turma_select = st.multiselect(
-        "Selecione uma ou mais turmas:",
-        opcoes_turmas,
-        default=["Todos"]
-    )
-
-    # Se apagar tudo → volta para "Todos"
-    if not turma_select:
-        turma_select = ["Todos"]
-    
-
-    # Se selecionar "Todos" + outras → mantém só "Todos"
-    if "Todos" in turma_select and len(turma_select) > 1:
-        turma_select = ["Todos"]
-
-    # Filtrar DF
-    if "Todos" in turma_select:
-        df = df.copy()
-    else:
-        df = df[df["turma_id"].isin(turma_select)]
-
-    # ----------------------------------------------------------
-    # CARDS DE MÉTRICAS
-    # ----------------------------------------------------------
-    total_alunos = df["aluno_nome"].nunique()
-    total_turmas = df["turma_id"].nunique()
-
-    media_geral_erros = df[ILHAS].mean().mean().round(2)
-
-    df_mean_global = df[ILHAS].mean()
-    pior_ilha = ILHAS_LABELS[df_mean_global.idxmax()]
-    pior_valor = df_mean_global.max().round(2)
-
-    colA, colB, colC, colD = st.columns(4)
-
-    with colA:
-        st.markdown(f"""
-        <div class="card">
-            <div class="card-title">Total de Alunos</div>
-            <div class="card-value">{total_alunos}</div>
-            <div class="card-sub">Alunos avaliados</div>
-        </div>
-        """, unsafe_allow_html=True)
-
-    with colB:
-        st.markdown(f"""
-        <div class="card">
-            <div class="card-title">Total de Turmas</div>
-            <div class="card-value">{total_turmas}</div>
-            <div class="card-sub">Turmas analisadas</div>
-        </div>
-        """, unsafe_allow_html=True)
-
-    with colC:
-        st.markdown(f"""
-        <div class="card">
-            <div class="card-title">Média Geral de Erros</div>
-            <div class="card-value">{media_geral_erros}</div>
-            <div class="card-sub">Entre todas as ilhas</div>
-        </div>
-        """, unsafe_allow_html=True)
-
-    with colD:
-        st.markdown(f"""
-        <div class="card">
-            <div class="card-title">Pior Ilha</div>
-            <div class="card-value">{pior_ilha}</div>
-            <div class="card-sub">{pior_valor} erros (média)</div>
-        </div>
-        """, unsafe_allow_html=True)
-
-    #st.markdown("---")
-
-    # ----------------------------------------------------------
-    # ABAS
-    # ----------------------------------------------------------
-    aba1, aba2, aba3 = st.tabs([
-        "📌 Radar por Aluno",
-        "🔥 Heatmap por Turma",
-        "📈 Barras por Ilha"
-    ])
-
-    # ----------------------------------------------------------
-    # ABA 1 – RADAR + PIZZA
-    # ----------------------------------------------------------
-    with aba1:
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.subheader("📌 Radar de Desempenho por Ilha")
-
-            aluno = st.selectbox("Selecione o aluno:", df["aluno_nome"].unique())
-
-            st.caption("🔹 No gráfico de pizza, cada fatia refere-se a ilha com pelo menos 'Um Erro'.")
-
-            df_aluno = df[df["aluno_nome"] == aluno].iloc[0]
-            valores = [df_aluno[i] for i in ILHAS]
-            labels = list(ILHAS_LABELS.values())
-
-            # -----------------------------
-            # TABELA VERTICAL AJUSTADA
-            # -----------------------------
-            #df_vertical = (
-             #   pd.DataFrame({
-              #      "Ilha": [ILHAS_LABELS[i] for i in ILHAS],
-               #     "Erros": [df_aluno[i] for i in ILHAS]
-                #})
-            #)
-
-            st.markdown(f"""
-            <div style="
-                padding: 15px;
-                border-radius: 12px;
-                background-color: #ffffff;
-                box-shadow: 0 4px 12px rgba(0,0,0,0.08);
-            ">
-                <strong>Aluno:</strong> {df_aluno["aluno_nome"]}
-                <strong>Turma:</strong> {df_aluno["turma_id"]}
-            </div>
-            """, unsafe_allow_html=True)
-
-
-            #st.write("### 📊 Erros por Ilha")
-            #st.write(df_vertical)
-
-
-        with col2:
-            st.subheader("📊 Distribuição de Erros por Ilha")
-
-            df_pizza = pd.DataFrame({
-                "Ilha": labels,
-                "Erros": valores
-            })
-
-            fig_pizza = px.pie(
-                df_pizza,
-                names="Ilha",
-                values="Erros",
-                hole=0.1
-            )
-
-            fig_pizza.update_layout(
-                height=500,
-                margin=dict(l=50, r=50, t=0, b=20)
-            )
-
-            fig_pizza.update_traces(
-                textinfo="label+value+percent",
-                textposition="inside",
-                textfont=dict(size=14),
-                pull=[0.02] * len(df_pizza)
-            )
-
-            st.plotly_chart(fig_pizza, width='stretch')
-
-    # ----------------------------------------------------------
-    # ABA 2 – HEATMAP
-    # ----------------------------------------------------------
-    with aba2:
-        st.subheader("🔥 Heatmap das Turmas (Médias de Erros por Ilha)")
-
-        df_mean = df.groupby("turma_id")[ILHAS].mean().round(2).reset_index()
-
-        fig_heat = px.imshow(
-            df_mean.set_index("turma_id").rename(columns=ILHAS_LABELS),
-            text_auto=True,
-            aspect="auto",
-            color_continuous_scale="Reds"
-        )
-
-        fig_heat.update_layout(
-            height=500,
-            yaxis_title="Turmas",   # ← novo label do eixo Y
-            margin=dict(l=50, r=50, t=10, b=20)
-        )
-
-        st.plotly_chart(fig_heat, width='stretch')
-
-    # ----------------------------------------------------------
-    # ABA 3 – BARRAS
-    # ----------------------------------------------------------
-    with aba3:
-        st.subheader("📈 Comparativo de Média de Erros das Turmas por Ilha")
-
-        df_melt = df_mean.melt(
-            id_vars="turma_id",
-            var_name="Ilha",
-            value_name="Erros"
-        )
-
-        df_melt["Ilha"] = df_melt["Ilha"].map(ILHAS_LABELS)
-
-        fig_bar = px.bar(
-            df_melt,
-            x="Ilha",
-            y="Erros",
-            text="Erros",
-            color="turma_id",
-            labels={"turma_id":"Turmas", "Erros" : "Média de Erros"},
-            barmode="group"
-        )
-
-        #fig_bar.update_layout(height=500)
-
-        fig_bar.update_layout(
-            height=500,
-            margin=dict(l=50, r=50, t=10, b=20)
-        )
-
-
-        st.plotly_chart(fig_bar, width='stretch')
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from config import executar_query
+from cache_compartilhado import ARMAZEM_PRECALCULADO, CACHE_FIGURAS
+from datasets_mapeados import DATASETS_MAPEADOS
+from versao_dados import versao_gestor
+from atualizacao_incremental import DatasetIncremental
+from indice_alunos import IndiceAlunos, seletor_aluno
+from renderizacao import (
+    MedidorPintura, aguardar, cancelar_especulacoes, em_segundo_plano, especular, selo_dados_antigos
+)
+from sqlalchemy.exc import OperationalError
+import logging
+
+# ----------------------------------------------------------
+# QUERY
+# ----------------------------------------------------------
+QUERY_DESEMPENHO = """
+SELECT 
+    s.name AS escola_nome,
+    t.education_level AS turma_nivel,
+    t.shift AS turma_turno,
+    t.grade AS turma_serie,
+    t.name AS turma_nome,
+    t.year AS turma_ano,
+    a.name AS aluno_nome,
+    av.status AS avaliacao_status,
+    av.interpretation_score AS pts_ilha_leitura,
+    av.scriptura_score AS pts_ilha_escrita,
+    av.lectio_score AS pts_ilha_letras_palavras,
+    av.visualis_score AS pts_ilha_atencao_visual,
+    av.grafomo_score AS pts_ilha_habilidades_motoras,
+    av.meta_score AS pts_ilha_rima,
+    av.opus_score AS pts_ilha_memoria,
+    av.calculum_score AS pts_ilha_calculo,
+    a.id AS aluno_id,
+    av.id AS avaliacao_id,
+    av.updated_at AS atualizado_em,
+    ({filtro}) AS incluir
+FROM auth.users u
+JOIN auth.school_users su ON u.id = su.user_id
+JOIN core.schools s ON su.school_id = s.id
+JOIN core.school_classes t ON s.id = t.school_id
+JOIN core.children a ON t.id = a.class_id
+JOIN littera.children_avaliation av ON a.id = av.child_id
+WHERE {condicao}
+AND u.email_hash = :email_hash
+ORDER BY t.grade;
+"""
+
+# Carga completa uma vez por gestor; depois só as avaliações alteradas (atualizacao_incremental)
+DATASET_DESEMPENHO = DatasetIncremental(
+    "desempenho_ilhas", QUERY_DESEMPENHO, filtro="av.status = 'Concluido'", ordenar=["turma_serie"]
+)
+
+# Pontuação de cada ilha em littera.children_avaliation (mesma ordem de ILHAS)
+COLUNAS_ILHAS_SQL = {
+    "pts_ilha_leitura": "av.interpretation_score",
+    "pts_ilha_escrita": "av.scriptura_score",
+    "pts_ilha_letras_palavras": "av.lectio_score",
+    "pts_ilha_atencao_visual": "av.visualis_score",
+    "pts_ilha_habilidades_motoras": "av.grafomo_score",
+    "pts_ilha_rima": "av.meta_score",
+    "pts_ilha_memoria": "av.opus_score",
+    "pts_ilha_calculo": "av.calculum_score",
+}
+
+# ----------------------------------------------------------
+# QUERY DE RESUMO (KPIs): uma linha por turma, soma e quantidade por ilha
+# ----------------------------------------------------------
+QUERY_RESUMO_TURMAS = """
+SELECT
+    t.shift AS turma_turno,
+    t.grade AS turma_serie,
+    t.name AS turma_nome,
+    t.year AS turma_ano,
+    COUNT(DISTINCT a.id) AS alunos,
+    {somas}
+FROM auth.users u
+JOIN auth.school_users su ON u.id = su.user_id
+JOIN core.schools s ON su.school_id = s.id
+JOIN core.school_classes t ON s.id = t.school_id
+JOIN core.children a ON t.id = a.class_id
+JOIN littera.children_avaliation av ON a.id = av.child_id
+WHERE av.status = 'Concluido'
+AND u.email_hash = :email_hash
+GROUP BY t.id, t.shift, t.grade, t.name, t.year;
+""".format(somas=",\n    ".join(
+    f"SUM({coluna}) AS soma_{ilha}, COUNT({coluna}) AS qtd_{ilha}"
+    for ilha, coluna in COLUNAS_ILHAS_SQL.items()
+))
+
+
+# ----------------------------------------------------------
+# LISTA DE ILHAS
+# ----------------------------------------------------------
+ILHAS = [
+    "pts_ilha_leitura",
+    "pts_ilha_escrita",
+    "pts_ilha_letras_palavras",
+    "pts_ilha_atencao_visual",
+    "pts_ilha_habilidades_motoras",
+    "pts_ilha_rima",
+    "pts_ilha_memoria",
+    "pts_ilha_calculo"
+]
+
+ILHAS_LABELS = {
+    "pts_ilha_leitura": "Leitura",
+    "pts_ilha_escrita": "Escrita",
+    "pts_ilha_letras_palavras": "Letras e Palavras",
+    "pts_ilha_atencao_visual": "Atenção Visual",
+    "pts_ilha_habilidades_motoras": "Habilidades Motoras",
+    "pts_ilha_rima": "Rima",
+    "pts_ilha_memoria": "Memória",
+    "pts_ilha_calculo": "Cálculo"
+}
+
+# ----------------------------------------------------------
+# MODO "MUITAS TURMAS" (payload limitado no navegador)
+# ----------------------------------------------------------
+# Acima deste nº de turmas, heatmap e barras mostram só as piores e as melhores
+# turmas + uma linha "Outras" e as barras viram um único trace
+LIMITE_TURMAS = 30
+TURMAS_EXTREMOS = 10
+
+# Acima deste nº de células o heatmap não escreve o valor em cada célula
+LIMITE_ANOTACOES = 300
+
+CORES_GRUPO_TURMA = {"piores": "#FF7E7E", "melhores": "#5ACF47", "outras": "#B0B0B0"}
+
+
+# ----------------------------------------------------------
+# DADOS (CACHE POR GESTOR)
+# ----------------------------------------------------------
+def montar_turma_id(df):
+    """Identificador completo da turma ("2025: 3ª série A Manhã")."""
+    return (
+        df["turma_ano"].astype(str) + ": " +
+        df["turma_serie"].astype(str) + "ª série " +
+        df["turma_nome"].astype(str) + " " +
+        df["turma_turno"].astype(str)
+    )
+
+
+def preparar_desempenho(df):
+    df["turma_id"] = montar_turma_id(df)
+    return df
+
+
+@DATASETS_MAPEADOS.em_cache(DATASET_DESEMPENHO.nome)
+def carregar_desempenho(email_hash, versao):
+    """Avaliações concluídas das turmas do gestor, com o identificador completo da turma (`versao`: versao_gestor, só chave do cache)."""
+    return DATASET_DESEMPENHO.obter(email_hash, versao, preparar=preparar_desempenho)
+
+
+COLUNAS_TURMA = ["turma_turno", "turma_serie", "turma_nome", "turma_ano", "turma_id"]
+
+
+def resumir_turmas(df):
+    """Mesmo agregado da QUERY_RESUMO_TURMAS, calculado sobre o dataset já em memória."""
+    grupos = df.groupby(COLUNAS_TURMA, sort=False)
+    resumo = grupos.agg(
+        alunos=("aluno_id", "nunique"),
+        **{f"soma_{ilha}": (ilha, "sum") for ilha in ILHAS},
+        **{f"qtd_{ilha}": (ilha, "count") for ilha in ILHAS},
+    )
+    return resumo.reset_index()
+
+
+@st.cache_data(ttl=3600, show_spinner=False, refresh_mode="background")
+@ARMAZEM_PRECALCULADO.ler_primeiro("resumo_turmas_ilhas")
+def carregar_resumo_turmas(email_hash, versao):
+    """
+    Agregado leve por turma (alunos, soma e quantidade de pontos por ilha) para lista de
+    turmas e KPIs. Com o dataset do gestor já em memória, sai dele (atualizado por delta)
+    em vez de outra agregação no banco.
+    """
+    if DATASET_DESEMPENHO.em_memoria(email_hash):
+        # só as colunas do agregado são descomprimidas
+        return resumir_turmas(carregar_desempenho(email_hash, versao, colunas=[*COLUNAS_TURMA, "aluno_id", *ILHAS]))
+    resumo = executar_query(QUERY_RESUMO_TURMAS, params={"email_hash": email_hash}, nome="resumo_turmas_ilhas")
+    resumo["turma_id"] = montar_turma_id(resumo)
+    return resumo
+
+
+def kpis_da_selecao(resumo):
+    """KPIs dos cards a partir do resumo por turma (média de cada ilha = soma / quantidade)."""
+    medias = pd.Series({
+        ilha: resumo[f"soma_{ilha}"].sum() / resumo[f"qtd_{ilha}"].sum() if resumo[f"qtd_{ilha}"].sum() else np.nan
+        for ilha in ILHAS
+    })
+    return {
+        "total_alunos": int(resumo["alunos"].sum()),
+        "total_turmas": resumo["turma_id"].nunique(),
+        "media_geral_erros": round(medias.mean(), 2),
+        "pior_ilha": ILHAS_LABELS[medias.idxmax()],
+        "pior_valor": round(medias.max(), 2),
+    }
+
+
+def filtrar_turmas(df, turmas):
+    """Recorte das turmas selecionadas (("Todos",) não filtra)."""
+    if "Todos" in turmas:
+        return df
+    return df[df["turma_id"].isin(turmas)]
+
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def obter_indice_alunos(email_hash, turmas, versao):
+    """Índice de busca dos alunos da seleção, construído uma vez por versão dos dados (`versao` é a chave do cache)."""
+    return IndiceAlunos(filtrar_turmas(carregar_desempenho(email_hash, versao), turmas))
+
+
+def indice_alunos(email_hash, turmas):
+    return obter_indice_alunos(email_hash, turmas, versao_gestor(email_hash))
+
+
+# ----------------------------------------------------------
+# FIGURAS POR ABA (CACHE POR GESTOR + TURMAS + VERSÃO DOS DADOS)
+# ----------------------------------------------------------
+# Só a aba aberta chama a sua função; a figura pronta fica no CACHE_FIGURAS.
+@CACHE_FIGURAS.em_cache("dash_desaluno_ilha", versao=versao_gestor)
+def figura_pizza(email_hash, turmas, aluno):
+    df_aluno = indice_alunos(email_hash, turmas).linha(aluno)
+
+    df_pizza = pd.DataFrame({
+        "Ilha": list(ILHAS_LABELS.values()),
+        "Erros": [df_aluno[i] for i in ILHAS]
+    })
+
+    fig_pizza = px.pie(
+        df_pizza,
+        names="Ilha",
+        values="Erros",
+        hole=0.1
+    )
+
+    fig_pizza.update_layout(
+        height=500,
+        margin=dict(l=50, r=50, t=0, b=20)
+    )
+
+    fig_pizza.update_traces(
+        textinfo="label+value+percent",
+        textposition="inside",
+        textfont=dict(size=14),
+        pull=[0.02] * len(df_pizza)
+    )
+    return fig_pizza
+
+
+def reduzir_turmas(df, medias, n=TURMAS_EXTREMOS):
+    """
+    Mantém as n turmas com mais erros e as n com menos (média entre as ilhas) e junta as
+    demais numa linha "Outras (k turmas)", com a média dos alunos dessas turmas.
+    """
+    ordem = medias.mean(axis=1).sort_values(ascending=False).index
+    extremos = list(ordem[:n]) + list(ordem[-n:])
+    outras = df.loc[~df["turma_id"].isin(extremos), ILHAS].mean()
+    outras.name = f"Outras ({len(ordem) - len(extremos)} turmas)"
+    return pd.concat([medias.loc[extremos], outras.to_frame().T]).rename_axis("turma_id")
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+@ARMAZEM_PRECALCULADO.ler_primeiro("medias_por_turma")
+def medias_por_turma(email_hash, turmas, versao):
+    """
+    Médias de erros por turma e ilha. Retorna (df_mean, total_turmas); com mais de
+    LIMITE_TURMAS turmas o df_mean já vem reduzido (ver reduzir_turmas).
+    """
+    df = filtrar_turmas(carregar_desempenho(email_hash, versao), turmas)
+    medias = df.groupby("turma_id")[ILHAS].mean()
+    total_turmas = len(medias)
+    if total_turmas > LIMITE_TURMAS:
+        medias = reduzir_turmas(df, medias)
+    return medias.round(2).reset_index(), total_turmas
+
+
+@CACHE_FIGURAS.em_cache("dash_desaluno_ilha", versao=versao_gestor)
+def figura_heatmap(email_hash, turmas):
+    df_mean, _ = medias_por_turma(email_hash, turmas, versao_gestor(email_hash))
+
+    fig_heat = px.imshow(
+        df_mean.set_index("turma_id").rename(columns=ILHAS_LABELS),
+        text_auto=df_mean[ILHAS].size <= LIMITE_ANOTACOES,
+        aspect="auto",
+        color_continuous_scale="Reds"
+    )
+
+    fig_heat.update_layout(
+        height=500,
+        yaxis_title="Turmas",   # ← novo label do eixo Y
+        margin=dict(l=50, r=50, t=10, b=20)
+    )
+    return fig_heat
+
+
+@CACHE_FIGURAS.em_cache("dash_desaluno_ilha", versao=versao_gestor)
+def figura_barras(email_hash, turmas):
+    df_mean, total_turmas = medias_por_turma(email_hash, turmas, versao_gestor(email_hash))
+    df_melt = df_mean.melt(
+        id_vars="turma_id",
+        var_name="Ilha",
+        value_name="Erros"
+    )
+
+    df_melt["Ilha"] = df_melt["Ilha"].map(ILHAS_LABELS)
+
+    if total_turmas > LIMITE_TURMAS:
+        return figura_barras_reduzida(df_melt)
+
+    fig_bar = px.bar(
+        df_melt,
+        x="Ilha",
+        y="Erros",
+        text="Erros",
+        color="turma_id",
+        labels={"turma_id":"Turmas", "Erros" : "Média de Erros"},
+        barmode="group"
+    )
+
+    #fig_bar.update_layout(height=500)
+
+    fig_bar.update_layout(
+        height=500,
+        margin=dict(l=50, r=50, t=10, b=20)
+    )
+    return fig_bar
+
+
+def figura_barras_reduzida(df_melt):
+    """
+    Barras do modo "muitas turmas": um único trace (eixo ilha → turma), cor pelo grupo
+    (piores, melhores, outras) em vez de uma cor/trace e uma legenda por turma.
+    """
+    turmas = list(dict.fromkeys(df_melt["turma_id"]))
+    grupo = {t: "piores" if i < TURMAS_EXTREMOS else "melhores" for i, t in enumerate(turmas[:-1])}
+    grupo[turmas[-1]] = "outras"
+
+    fig_bar = go.Figure(go.Bar(
+        x=[df_melt["Ilha"], df_melt["turma_id"]],
+        y=df_melt["Erros"],
+        marker_color=df_melt["turma_id"].map(grupo).map(CORES_GRUPO_TURMA),
+        hovertemplate="%{x}<br>Média de Erros: %{y}<extra></extra>"
+    ))
+
+    fig_bar.update_layout(
+        height=500,
+        margin=dict(l=50, r=50, t=10, b=20),
+        yaxis_title="Média de Erros",
+        xaxis=dict(showticklabels=True, tickangle=-90, tickfont=dict(size=9))
+    )
+    return fig_bar
+
+
+def legenda_modo_reduzido(email_hash, turmas):
+    """Avisa quando heatmap/barras estão no modo "muitas turmas"."""
+    _, total_turmas = medias_por_turma(email_hash, turmas, versao_gestor(email_hash))
+    if total_turmas > LIMITE_TURMAS:
+        st.caption(
+            f"🔹 {total_turmas} turmas selecionadas: exibindo as {TURMAS_EXTREMOS} com mais erros, "
+            f"as {TURMAS_EXTREMOS} com menos erros e a média das demais em \"Outras\"."
+        )
+
+
+# ----------------------------------------------------------
+# SEÇÃO INTERATIVA (FRAGMENTO)
+# ----------------------------------------------------------
+@st.fragment
+def secao_radar(email_hash, turmas):
+    """
+    Seleção de aluno + pizza. Como fragmento, trocar o aluno reexecuta só esta seção
+    (a partir do dataset em cache), não a página inteira.
+    """
+    indice = indice_alunos(email_hash, turmas)
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.subheader("📌 Radar de Desempenho por Ilha")
+
+        aluno = seletor_aluno(indice, "Selecione o aluno:", chave="aluno_radar")
+        if aluno is None:
+            return
+
+        st.caption("🔹 No gráfico de pizza, cada fatia refere-se a ilha com pelo menos 'Um Erro'.")
+
+        df_aluno = indice.linha(aluno)
+
+        # -----------------------------
+        # TABELA VERTICAL AJUSTADA
+        # -----------------------------
+        #df_vertical = (
+         #   pd.DataFrame({
+          #      "Ilha": [ILHAS_LABELS[i] for i in ILHAS],
+           #     "Erros": [df_aluno[i] for i in ILHAS]
+            #})
+        #)
+
+        st.markdown(f"""
+        <div style="
+            padding: 15px;
+            border-radius: 12px;
+            background-color: #ffffff;
+            box-shadow: 0 4px 12px rgba(0,0,0,0.08);
+        ">
+            <strong>Aluno:</strong> {df_aluno["aluno_nome"]}
+            <strong>Turma:</strong> {df_aluno["turma_id"]}
+        </div>
+        """, unsafe_allow_html=True)
+
+
+        #st.write("### 📊 Erros por Ilha")
+        #st.write(df_vertical)
+
+
+    with col2:
+        st.subheader("📊 Distribuição de Erros por Ilha")
+        st.plotly_chart(figura_pizza(email_hash, turmas, aluno), width='stretch')
+
+
+# ================================
+# DASHBOARD PRINCIPAL
+# ================================
+def dashboardDesAlunoIlha(email_hash=None):
+
+    medidor = MedidorPintura("dash_desaluno_ilha")
+    # figuras que a execução anterior especulou para outras abas/filtros não servem mais
+    cancelar_especulacoes()
+
+    # ----------------------------------------------------------
+    # CONFIG STREAMLIT
+    # ----------------------------------------------------------
+    st.set_page_config(
+        page_title="Alunos x Ilhas",
+        page_icon="📊",
+        layout="wide"
+    )
+
+    st.markdown(
+        "<h2 style='color: #5A6ACF;'>📊 Desempenho dos Alunos e Turmas nas Ilhas de Conhecimento</h2>",
+        unsafe_allow_html=True
+    )
+
+    # ----------------------------------------------------------
+    # CSS — CARDS MODERNOS
+    # ----------------------------------------------------------
+    st.markdown("""
+    <style>
+
+        /* -----------------------------
+        REMOVER HEADER E AJUSTAR LAYOUT
+        ----------------------------- */
+        [data-testid="stHeader"], 
+        div[role="banner"] { 
+            display: none !important; 
+        }
+
+        body, .stApp, [data-testid="stAppViewContainer"], 
+        [data-testid="stBlock"], .main, .block-container {
+            padding-top: 0 !important; 
+            margin-top: 0 !important;
+        }
+
+
+        /* -----------------------------
+        CARDS MODERNOS
+        ----------------------------- */
+        .card {
+            background-color: #ffffff;
+            padding: 20px;
+            border-radius: 16px;
+            box-shadow: 0 4px 10px rgba(0,0,0,0.08);
+            text-align: center;
+            transition: transform 0.15s ease, box-shadow 0.15s ease;
+        }
+        .card:hover {
+            transform: translateY(-4px);
+            box-shadow: 0 8px 20px rgba(0,0,0,0.12);
+        }
+        .card-title {
+            font-size: 16px;
+            color: #444;
+            font-weight: 600;
+        }
+        .card-value {
+            font-size: 28px;
+            font-weight: 800;
+            color: #5A6ACF;
+        }
+        .card-sub {
+            font-size: 14px;
+            color: #666;
+        }
+
+
+        /* -----------------------------
+        MULTISELECT / SELECT – ESTILO BASE
+        ----------------------------- */
+
+        /* Caixa geral */
+        div[data-baseweb="select"] {
+            border-radius: 12px !important;
+            border: 1px solid #d5d5d5 !important;
+            padding: 4px !important;
+            background-color: #ffffff !important;
+            transition: border-color 0.2s ease, box-shadow 0.2s ease;
+        }
+
+        /* Foco */
+        div[data-baseweb="select"]:focus-within {
+            border-color: #5A6ACF !important;
+            box-shadow: 0 0 0 2px rgba(90, 106, 207, 0.25) !important;
+        }
+
+        /* Texto */
+        div[data-baseweb="select"] div {
+            font-size: 15px !important;
+            color: #333 !important;
+        }
+
+        /* Hover no item da lista */
+        ul[role="listbox"] > li:hover {
+            background-color: #eef0ff !important;
+            color: #5A6ACF !important;
+            cursor: pointer !important;
+        }
+
+
+        /* -----------------------------
+        FIX DEFINITIVO DO FUNDO PRETO
+        (Chips + item selecionado)
+        ----------------------------- */
+
+        /* Chip do multiselect */
+        div[data-baseweb="tag"][class] {
+            background: #EEF0FF !important;
+            background-color: #EEF0FF !important;
+            color: #5A6ACF !important;
+            border-radius: 10px !important;
+            padding: 2px 8px !important;
+        }
+
+        /* Texto do chip */
+        div[data-baseweb="tag"][class] span {
+            color: #5A6ACF !important;
+            font-weight: 600 !important;
+        }
+
+        /* Ícone X do chip */
+        div[data-baseweb="tag"][class] svg {
+            fill: #5A6ACF !important;
+        }
+
+        /* Item selecionado na lista */
+        ul[role="listbox"] > li[aria-selected="true"] {
+            background: #5A6ACF !important;
+            color: white !important;
+        }
+
+    </style>
+
+    """, unsafe_allow_html=True)
+
+    # ----------------------------------------------------------
+    # EXECUTAR QUERY
+    # ----------------------------------------------------------
+    try:
+        versao = versao_gestor(email_hash)
+        # A consulta completa (gráficos) começa em paralelo; os cards saem do resumo por turma
+        futuro_dados = em_segundo_plano(carregar_desempenho, email_hash, versao)
+        resumo = carregar_resumo_turmas(email_hash, versao)
+    except OperationalError as e:
+        logging.error(f"Falha ao conectar banco: {e}")
+        st.error("Erro temporário ao conectar. Tente novamente mais tarde.")
+        return
+    except Exception as e:
+        logging.error(f"Erro inesperado: {e}")
+        st.error("Ocorreu um erro inesperado.")
+        return
+
+    if resumo.empty:
+        st.warning("Nenhum registro encontrado.")
+        return
+
+    selo_dados_antigos([resumo], [carregar_resumo_turmas, carregar_desempenho], (email_hash, versao))
+
+    # ----------------------------------------------------------
+    # MULTISELECT COM TRATAMENTO "TODOS"
+    # ----------------------------------------------------------
+    turmas = sorted(resumo["turma_id"].unique())
+    opcoes_turmas = ["Todos"] + turmas
+
+    turma_select = st.multiselect(
+        "Selecione uma ou mais turmas:",
+        opcoes_turmas,
+        default=["Todos"]
+    )
+
+    # Se apagar tudo → volta para "Todos"
+    if not turma_select:
+        turma_select = ["Todos"]
+    
+
+    # Se selecionar "Todos" + outras → mantém só "Todos"
+    if "Todos" in turma_select and len(turma_select) > 1:
+        turma_select = ["Todos"]
+
+    # a tupla de turmas também é a chave do cache das figuras
+    turmas_sel = tuple(turma_select)
+
+    # ----------------------------------------------------------
+    # CARDS DE MÉTRICAS (do resumo por turma, sem esperar a consulta completa)
+    # ----------------------------------------------------------
+    kpis = kpis_da_selecao(filtrar_turmas(resumo, turmas_sel))
+    total_alunos = kpis["total_alunos"]
+    total_turmas = kpis["total_turmas"]
+    media_geral_erros = kpis["media_geral_erros"]
+    pior_ilha = kpis["pior_ilha"]
+    pior_valor = kpis["pior_valor"]
+
+    colA, colB, colC, colD = st.columns(4)
+
+    with colA:
+        st.markdown(f"""
+        <div class="card">
+            <div class="card-title">Total de Alunos</div>
+            <div class="card-value">{total_alunos}</div>
+            <div class="card-sub">Alunos avaliados</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with colB:
+        st.markdown(f"""
+        <div class="card">
+            <div class="card-title">Total de Turmas</div>
+            <div class="card-value">{total_turmas}</div>
+            <div class="card-sub">Turmas analisadas</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with colC:
+        st.markdown(f"""
+        <div class="card">
+            <div class="card-title">Média Geral de Erros</div>
+            <div class="card-value">{media_geral_erros}</div>
+            <div class="card-sub">Entre todas as ilhas</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with colD:
+        st.markdown(f"""
+        <div class="card">
+            <div class="card-title">Pior Ilha</div>
+            <div class="card-value">{pior_ilha}</div>
+            <div class="card-sub">{pior_valor} erros (média)</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    medidor.marcar("primeira pintura (KPIs)")
+
+    #st.markdown("---")
+
+    # ----------------------------------------------------------
+    # ABAS (só a aba aberta é executada: on_change="rerun" + .open)
+    # ----------------------------------------------------------
+    aba1, aba2, aba3 = st.tabs([
+        "📌 Radar por Aluno",
+        "🔥 Heatmap por Turma",
+        "📈 Barras por Ilha"
+    ], key="abas_desempenho_ilhas", on_change="rerun")
+
+    # Espera a consulta completa (normalmente já terminou enquanto os cards eram montados)
+    try:
+        with st.spinner("Carregando gráficos..."):
+            aguardar(futuro_dados)
+    except OperationalError as e:
+        logging.error(f"Falha ao conectar banco: {e}")
+        st.error("Erro temporário ao conectar. Tente novamente mais tarde.")
+        return
+    except Exception as e:
+        logging.error(f"Erro inesperado: {e}")
+        st.error("Ocorreu um erro inesperado.")
+        return
+
+    # Abas fechadas: figuras calculadas no pool enquanto a aba aberta é desenhada
+    if not aba2.open:
+        especular(figura_heatmap, email_hash, turmas_sel)
+    if not aba3.open:
+        especular(figura_barras, email_hash, turmas_sel)
+
+    # ----------------------------------------------------------
+    # ABA 1 – RADAR + PIZZA
+    # ----------------------------------------------------------
+    if aba1.open:
+        with aba1:
+            secao_radar(email_hash, turmas_sel)
+
+    # ----------------------------------------------------------
+    # ABA 2 – HEATMAP
+    # ----------------------------------------------------------
+    if aba2.open:
+        with aba2:
+            st.subheader("🔥 Heatmap das Turmas (Médias de Erros por Ilha)")
+            legenda_modo_reduzido(email_hash, turmas_sel)
+            st.plotly_chart(figura_heatmap(email_hash, turmas_sel), width='stretch')
+
+    # ----------------------------------------------------------
+    # ABA 3 – BARRAS
+    # ----------------------------------------------------------
+    if aba3.open:
+        with aba3:
+            st.subheader("📈 Comparativo de Média de Erros das Turmas por Ilha")
+            legenda_modo_reduzido(email_hash, turmas_sel)
+            st.plotly_chart(figura_barras(email_hash, turmas_sel), width='stretch')
+
+    medidor.marcar("página completa", final=True)
@@ -1,262 +1,604 @@
-import streamlit as st
-import pandas as pd
-from sqlalchemy import text
-from sqlalchemy.exc import OperationalError
-from config import executar_query
-import logging
-import folium
-from folium.plugins import MarkerCluster
-from streamlit_folium import st_folium
-
-def escolasNoMapa():
-
-    # -------------------------------------
-    # ⚙️ Configurações da página
-    # -------------------------------------
-    st.markdown("""
-    <style>
-    [data-testid="stHeader"], div[role="banner"] { display:none !important; }
-
-    body, .stApp, [data-testid="stAppViewContainer"],
-    .block-container {
-        padding-top: 0 !important;
-        margin-top: 0 !important;
-        background-color: #ffffff !important;
-    }
-
-    /* Estiliza os contêineres dos selectbox */
-    div[data-baseweb="select"] {
-        border: 2px solid #4A90E2 !important;   /* Cor da borda */
-        border-radius: 8px !important;          /* Bordas arredondadas */
-        background-color: #ffffff !important;   /* Fundo branco */
-        transition: all 0.3s ease;              /* Animação suave */
-    }
-
-    /* Efeito quando passa o mouse */
-    div[data-baseweb="select"]:hover {
-        border-color: #1A73E8 !important;       /* Azul mais escuro */
-        box-shadow: 0 0 6px rgba(26, 115, 232, 0.4);
-    }
-
-    /* Efeito quando está em foco (clicado) */
-    div[data-baseweb="select"]:focus-within {
-        border-color: #1A73E8 !important;
-        box-shadow: 0 0 0 3px rgba(26, 115, 232, 0.3);
-    }
-
-    /* Ajuste do texto interno */
-    div[data-baseweb="select"] > div {
-        font-size: 14px !important;
-        color: #333333 !important;
-    }
-
-    /* Ícone da setinha */
-    div[data-baseweb="select"] svg {
-        color: #4A90E2 !important;
-    }
-    
-    /* -----------------------------
-    CARDS MODERNOS
-    ----------------------------- */
-    .card {
-        background-color: #ffffff;
-        padding: 2px;
-        border-radius: 16px;
-        box-shadow: 0 4px 10px rgba(0,0,0,0.08);
-        text-align: center;
-        transition: transform 0.15s ease, box-shadow 0.15s ease;
-    }
-    .card-title {
-        font-size: 16px;
-        color: #444;
-        font-weight: 600;
-    }
-    .card-value {
-        font-size: 28px;
-        font-weight: 800;
-        color: #5A6ACF;
-    }
-                
-    </style>
-    """, unsafe_allow_html=True)
-
-    st.set_page_config(page_title="Mapa de Escolas", page_icon="assets/favicon.ico", layout="wide")
-    #st.title("📊 Painel Estratégico - Mapa de Escolas")
-
-    st.markdown("<h2 style='color:#5A6ACF;'>🗺️ Painel Estratégico - Mapa de Escolas</h2>", unsafe_allow_html=True)
-
-    # -------------------------------------
-    # 📦 Consulta ao banco de dados
-    # -------------------------------------
-    query = """
-    SELECT 
-        s.id AS school_id,
-        s.name AS school_name,
-        s.students_count,
-        addr.state,
-        addr.city,
-        addr.zip_code,
-        addr.latitude,
-        addr.longitude,
-        av.status AS avaliacao_status,
-        COUNT(DISTINCT c.id) AS total_alunos_status
-    FROM core.schools AS s
-    JOIN auth.addresses AS addr 
-        ON s.id = addr.school_id
-    LEFT JOIN core.school_classes AS sc 
-        ON s.id = sc.school_id
-    LEFT JOIN core.children AS c 
-        ON sc.id = c.class_id
-    LEFT JOIN littera.children_avaliation AS av 
-        ON c.id = av.child_id
-    WHERE s.is_demo IS FALSE
-    GROUP BY 
-        s.id, s.name, s.students_count,
-        addr.state, addr.city, addr.zip_code, addr.latitude, addr.longitude,
-        av.status
-    ORDER BY 
-        s.name, av.status;
-    """
-
-    try:
-        #df_original = pd.read_sql(query, engine)
-        df_original = executar_query(query)
-    except OperationalError as e:
-        logging.error(f"Erro ao conectar ao banco: {e}")
-        st.error("Erro temporário ao conectar. Tente novamente mais tarde.")
-        st.stop()
-    except Exception as e:
-        logging.error(f"Erro inesperado ao consultar dados: {e}")
-        st.error("Erro inesperado. Tente novamente mais tarde.")
-        st.stop()
-
-    if df_original.empty:
-        st.warning("Nenhum registro encontrado.")
-        st.stop()
-
-    # -------------------------------------
-    # 🧹 Limpeza e preparação dos dados
-    # -------------------------------------
-    df_original['latitude'] = pd.to_numeric(df_original['latitude'], errors='coerce')
-    df_original['longitude'] = pd.to_numeric(df_original['longitude'], errors='coerce')
-    df_original = df_original.dropna(subset=['latitude', 'longitude'])
-
-    # -------------------------------------
-    # 🎛️ Filtros
-    # -------------------------------------
-    col1, col2, col3 = st.columns(3)
-
-    # --- Estado ---
-    estados = sorted(df_original['state'].unique())
-    with col1:
-        estado_sel = st.selectbox("Estado:", estados)
-
-    # Filtra pelo estado
-    df = df_original[df_original['state'] == estado_sel]
-
-    # --- Cidade ---
-    cidades = ["Todos"] + sorted(df['city'].unique())   # 👈 adiciona "Todos" no início da lista
-    with col2:
-        cidade_sel = st.selectbox("Cidade:", cidades)
-
-    # Filtra pelo estado + cidade (se não for "Todos")
-    if cidade_sel != "Todos":
-        df = df[df['city'] == cidade_sel]
-
-    # --- Métrica ---
-    with col3:
-
-        st.markdown(f"""
-        <div class="card ">
-            <div class="card-title">Total de Escolas</div>
-            <div class="card-value">{df['school_name'].nunique()}</div>
-        </div>
-        """, unsafe_allow_html=True)
-
-    # Caso não haja dados após os filtros
-    if df.empty:
-        st.warning("Nenhuma escola encontrada com os filtros selecionados.")
-        st.stop()
-
-
-    # -------------------------------------
-    # 🧭 Função de deslocamento (jitter)
-    # -------------------------------------
-    def aplicar_deslocamento(dframe, offset=0.00090):
-        coord_counts = {}
-        latitudes, longitudes = [], []
-        for _, row in dframe.iterrows():
-            coord = (row['latitude'], row['longitude'])
-            count = coord_counts.get(coord, 0)
-            coord_counts[coord] = count + 1
-            latitudes.append(row['latitude'] + count * offset)
-            longitudes.append(row['longitude'] + count * offset)
-        dframe = dframe.copy()
-        dframe['lat_jitter'] = latitudes
-        dframe['lon_jitter'] = longitudes
-        return dframe
-
-    df = aplicar_deslocamento(df)
-
-    # -------------------------------------
-    # 🧹 Agrupamento por escola para o mapa
-    # -------------------------------------
-    # Agrupa os status por escola em um dicionário {status: total}
-    status_por_escola = (
-        df.groupby(['school_id', 'school_name', 'state', 'city', 'zip_code', 'latitude', 'longitude', 'students_count'])
-        .apply(lambda g: {row['avaliacao_status']: row['total_alunos_status'] for _, row in g.iterrows()})
-        .reset_index(name='status_dict')
-    )
-
-    # Dicionário de mapeamento
-    status_labels = {
-        "NaoIniciado": "Não Iniciado",
-        "EmAndamento": "Em Andamento",
-        "Concluido": "Concluído"
-    }
-
-    # Função para formatar o tooltip com labels amigáveis
-    def formatar_status(status_dict):
-        if not status_dict:
-            return "Nenhum status disponível"
-        linhas = [f"{status_labels.get(status, status)}: {qtd}" for status, qtd in status_dict.items()]
-        return "<br>".join(linhas)
-
-    # Aplica no dataframe
-    status_por_escola['tooltip_text'] = status_por_escola['status_dict'].apply(formatar_status)
-
-    # Aplica deslocamento para evitar sobreposição de marcadores
-    status_por_escola = aplicar_deslocamento(status_por_escola)
-
-    # -------------------------------------
-    # 🗺️ Mapa Folium (ajustado)
-    # -------------------------------------
-    lat_inicial = status_por_escola.iloc[0]['lat_jitter']
-    lon_inicial = status_por_escola.iloc[0]['lon_jitter']
-    m = folium.Map(location=[lat_inicial, lon_inicial], zoom_start=10, tiles='OpenStreetMap')
-
-    if status_por_escola.shape[0] > 500:
-        marker_container = MarkerCluster().add_to(m)
-    else:
-        marker_container = m
-
-    for _, row in status_por_escola.iterrows():
-        popup = f"""
-        <b>{row['school_name']}</b><br>
-        {row['city']} - {row['state']}<br>
-        Total de Alunos Cadastrados: {row['students_count']}<br>
-        <br>
-        <b>Status de Avaliação</b><br>
-        {row['tooltip_text']}
-        """
-        folium.Marker(
-            location=[row['lat_jitter'], row['lon_jitter']],
-            tooltip=popup,
-            icon=folium.Icon(color='blue', icon='graduation-cap', prefix='fa')
-        ).add_to(marker_container)
-
-    # -------------------------------------
-    # 📊 Layout final
-    # -------------------------------------
-    st_folium(m, width='stretch', height=500, returned_objects=[])
-
+import streamlit as st
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from config import executar_query, medir_tempo
+import logging
+import json
+import zlib
+import folium
+from folium.plugins import FastMarkerCluster
+from branca.element import MacroElement
+from jinja2 import Template
+from streamlit_folium import st_folium
+from indices_mapa import IndiceEspacial, IndiceHierarquico, zoom_para_limites
+from cache_compartilhado import BACKEND_CACHE, CacheCompartilhado
+from datasets_mapeados import DATASETS_MAPEADOS
+from geocodificacao import preencher_coordenadas
+from renderizacao import selo_dados_antigos
+from versao_dados import versao_global
+
+# -------------------------------------
+# 🏷️ Status de avaliação (colunas fixas do agrupamento por escola)
+# -------------------------------------
+# Dicionário de mapeamento
+status_labels = {
+    "NaoIniciado": "Não Iniciado",
+    "EmAndamento": "Em Andamento",
+    "Concluido": "Concluído",
+    "SemAvaliacao": "Sem Avaliação"
+}
+
+COLUNAS_ESCOLA = ['school_id', 'school_name', 'state', 'city', 'zip_code', 'latitude', 'longitude', 'students_count', 'coord_aproximada']
+
+# Colunas calculadas em montar_status_por_escola (as demais são contagens por status)
+COLUNAS_DERIVADAS = ['lat_jitter', 'lon_jitter']
+
+# Acima deste número de escolas os marcadores são agrupados (cluster)
+LIMIAR_CLUSTER = 500
+
+# HTML dos mapas já renderizados, por (estado, cidade, versão dos dados)
+CACHE_MAPAS = CacheCompartilhado("mapas", BACKEND_CACHE, ttl=24 * 3600)
+
+# Faixas de zoom: estados (< ZOOM_CIDADES), cidades (< ZOOM_ESCOLAS) e escolas individuais
+ZOOM_CIDADES = 6
+ZOOM_ESCOLAS = 10
+
+# -------------------------------------
+# 🖌️ Marcador montado no navegador (tooltip por template JS)
+# -------------------------------------
+# Cada linha de dados: [lat, lon, nome, cidade, estado, alunos, coord_aproximada, qtd_status_1, qtd_status_2, ...]
+CALLBACK_MARCADOR = """
+function (row) {
+    var rotulos = %s;
+    var linhas = [];
+    for (var i = 0; i < rotulos.length; i++) {
+        if (row[7 + i] > 0) { linhas.push(rotulos[i] + ": " + row[7 + i]); }
+    }
+    var tooltip = "<b>" + row[2] + "</b><br>" + row[3] + " - " + row[4] + "<br>"
+        + "Total de Alunos Cadastrados: " + row[5] + "<br><br><b>Status de Avaliação</b><br>"
+        + (linhas.length ? linhas.join("<br>") : "Nenhum status disponível")
+        + (row[6] ? "<br><br><i>📮 Localização aproximada pelo CEP</i>" : "");
+    var icon = L.AwesomeMarkers.icon({icon: "graduation-cap", prefix: "fa", markerColor: "blue"});
+    return L.marker(new L.LatLng(row[0], row[1]), {icon: icon}).bindTooltip(tooltip);
+}
+"""
+
+
+# -------------------------------------
+# 🧭 Função de deslocamento (jitter)
+# -------------------------------------
+def aplicar_deslocamento(dframe, offset=0.00090):
+    """Desloca a n-ésima escola de uma mesma coordenada em n * offset (vetorizado, sem iterrows)."""
+    ordem = dframe.groupby(['latitude', 'longitude'], sort=False).cumcount()
+    dframe = dframe.copy()
+    dframe['lat_jitter'] = dframe['latitude'] + ordem * offset
+    dframe['lon_jitter'] = dframe['longitude'] + ordem * offset
+    return dframe
+
+
+# -------------------------------------
+# 🧹 Agrupamento por escola para o mapa
+# -------------------------------------
+@medir_tempo("Preparação dos dados do mapa")
+def montar_status_por_escola(df):
+    """
+    Uma linha por escola com uma coluna fixa por status (total de alunos).
+    Tudo vetorizado: pivot dos status; o tooltip é montado no navegador (ver CALLBACK_MARCADOR).
+    """
+    df = df.copy()
+    if 'coord_aproximada' not in df:
+        df['coord_aproximada'] = False
+    # avaliação inexistente (LEFT JOIN) vira uma coluna própria
+    df['avaliacao_status'] = df['avaliacao_status'].fillna("SemAvaliacao")
+    df['chave_escola'] = df.groupby(COLUNAS_ESCOLA, dropna=False, sort=True).ngroup()
+
+    escolas = df.drop_duplicates('chave_escola').set_index('chave_escola')[COLUNAS_ESCOLA].sort_index()
+
+    contagens = df.pivot_table(
+        index='chave_escola',
+        columns='avaliacao_status',
+        values='total_alunos_status',
+        aggfunc='sum',
+        fill_value=0
+    )
+    # colunas fixas (status conhecidos) + eventuais status novos no final
+    colunas_status = list(status_labels) + [c for c in contagens.columns if c not in status_labels]
+    contagens = contagens.reindex(index=escolas.index, columns=colunas_status, fill_value=0).fillna(0).astype(int)
+
+    status_por_escola = escolas.join(contagens).reset_index(drop=True)
+
+    # Aplica deslocamento para evitar sobreposição de marcadores
+    return aplicar_deslocamento(status_por_escola)
+
+
+def colunas_de_status(status_por_escola):
+    """Colunas de contagem por status (fixas + eventuais status novos), na ordem do agrupamento."""
+    return [c for c in status_por_escola.columns if c not in COLUNAS_ESCOLA + COLUNAS_DERIVADAS]
+
+
+def texto_status(df, colunas_status):
+    """Linhas "Status: qtd" (somente status com alunos), montadas coluna a coluna."""
+    texto = pd.Series("", index=df.index)
+    for status in colunas_status:
+        qtd = df[status]
+        linha = f"{status_labels.get(status, status)}: " + qtd.astype(str) + "<br>"
+        texto = texto + linha.where(qtd > 0, "")
+    texto = texto.str.removesuffix("<br>")
+    return texto.where(texto != "", "Nenhum status disponível")
+
+
+# -------------------------------------
+# 🏙️ Agregados por estado e cidade (zoom afastado)
+# -------------------------------------
+def agregar_por_regiao(status_por_escola, nivel):
+    """
+    Agrega as escolas por ['state'] ou ['state', 'city']: nº de escolas, soma de students_count,
+    totais por status e posição média (centro do círculo no mapa).
+    """
+    colunas_status = colunas_de_status(status_por_escola)
+    df = status_por_escola.assign(
+        students_count=pd.to_numeric(status_por_escola['students_count'], errors='coerce').fillna(0)
+    )
+    agregados = df.groupby(nivel, sort=True).agg(
+        escolas=('school_id', 'nunique'),
+        alunos=('students_count', 'sum'),
+        latitude=('latitude', 'mean'),
+        longitude=('longitude', 'mean'),
+        **{status: (status, 'sum') for status in colunas_status}
+    ).reset_index()
+    agregados['alunos'] = agregados['alunos'].astype(int)
+
+    nome = agregados['state'] if nivel == ['state'] else agregados['city'] + " - " + agregados['state']
+    agregados['tooltip'] = (
+        "<b>" + nome.astype(str) + "</b><br>"
+        + agregados['escolas'].astype(str) + " escolas<br>"
+        + "Total de Alunos Cadastrados: " + agregados['alunos'].astype(str) + "<br>"
+        + "<br><b>Status de Avaliação</b><br>"
+        + texto_status(agregados, colunas_status)
+    )
+    return agregados
+
+
+# -------------------------------------
+# 🗺️ Mapa Folium (camada única de dados)
+# -------------------------------------
+def camada_escolas(status_por_escola):
+    """
+    Camada única FastMarkerCluster: os dados vão como um array compacto e
+    marcadores/tooltips são criados no navegador (sem um folium.Marker por escola).
+    """
+    colunas_status = colunas_de_status(status_por_escola)
+    dados = status_por_escola[['lat_jitter', 'lon_jitter', 'school_name', 'city', 'state', 'students_count', 'coord_aproximada'] + colunas_status]
+    dados = dados.round({'lat_jitter': 5, 'lon_jitter': 5}).astype(object).where(dados.notna(), None)
+
+    callback = CALLBACK_MARCADOR % json.dumps([status_labels.get(c, c) for c in colunas_status], ensure_ascii=False)
+
+    # Até LIMIAR_CLUSTER escolas os marcadores ficam soltos (cluster só no zoom mínimo)
+    opcoes = {} if len(dados) > LIMIAR_CLUSTER else {"disableClusteringAtZoom": 1}
+    return FastMarkerCluster(dados.values.tolist(), callback=callback, **opcoes)
+
+
+def camada_agregados(agregados, nome):
+    """Círculos proporcionais ao nº de escolas, um por estado/cidade."""
+    fg = folium.FeatureGroup(name=nome)
+    maior = agregados['escolas'].max() if not agregados.empty else 1
+    for lat, lon, qtd, tooltip in agregados[['latitude', 'longitude', 'escolas', 'tooltip']].itertuples(index=False):
+        folium.CircleMarker(
+            location=[lat, lon],
+            radius=6 + 24 * (qtd / maior) ** 0.5,
+            color='#5A6ACF',
+            weight=1,
+            fill=True,
+            fill_opacity=0.55,
+            tooltip=tooltip
+        ).add_to(fg)
+    return fg
+
+
+class AlternarPorZoom(MacroElement):
+    """Mostra cada camada só na sua faixa de zoom [min, max], alternando no navegador (sem rerun)."""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function () {
+            var mapa = {{ this._parent.get_name() }};
+            var faixas = [
+                {%- for camada, zmin, zmax in this.faixas %}
+                [{{ camada.get_name() }}, {{ zmin }}, {{ zmax }}],
+                {%- endfor %}
+            ];
+            function atualizar() {
+                var z = mapa.getZoom();
+                faixas.forEach(function (f) {
+                    var visivel = z >= f[1] && z <= f[2];
+                    if (visivel && !mapa.hasLayer(f[0])) { mapa.addLayer(f[0]); }
+                    if (!visivel && mapa.hasLayer(f[0])) { mapa.removeLayer(f[0]); }
+                });
+            }
+            mapa.on('zoomend', atualizar);
+            atualizar();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, faixas):
+        super().__init__()
+        self._name = "AlternarPorZoom"
+        self.faixas = faixas
+
+
+def construir_mapa(status_por_escola, agregados=None):
+    """
+    Monta o mapa com todas as escolas recebidas em uma única camada de dados.
+    Com `agregados` ({'estados': df, 'cidades': df}) o zoom afastado mostra círculos por
+    estado/cidade e os marcadores individuais aparecem só a partir de ZOOM_ESCOLAS.
+    """
+    lat_inicial = status_por_escola.iloc[0]['lat_jitter']
+    lon_inicial = status_por_escola.iloc[0]['lon_jitter']
+    m = folium.Map(location=[lat_inicial, lon_inicial], zoom_start=10, tiles='OpenStreetMap')
+    escolas = camada_escolas(status_por_escola).add_to(m)
+
+    if agregados is not None:
+        estados = camada_agregados(agregados['estados'], "Estados").add_to(m)
+        cidades = camada_agregados(agregados['cidades'], "Cidades").add_to(m)
+        m.fit_bounds([
+            [status_por_escola['lat_jitter'].min(), status_por_escola['lon_jitter'].min()],
+            [status_por_escola['lat_jitter'].max(), status_por_escola['lon_jitter'].max()]
+        ])
+        AlternarPorZoom([
+            (estados, 0, ZOOM_CIDADES - 1),
+            (cidades, ZOOM_CIDADES, ZOOM_ESCOLAS - 1),
+            (escolas, ZOOM_ESCOLAS, 30),
+        ]).add_to(m)
+    return m
+
+
+# -------------------------------------
+# 📦 Consulta ao banco de dados (global: não depende do gestor)
+# -------------------------------------
+QUERY_MAPA = """
+SELECT
+    s.id AS school_id,
+    s.name AS school_name,
+    s.students_count,
+    addr.state,
+    addr.city,
+    addr.zip_code,
+    addr.latitude,
+    addr.longitude,
+    av.status AS avaliacao_status,
+    COUNT(DISTINCT c.id) AS total_alunos_status
+FROM core.schools AS s
+JOIN auth.addresses AS addr
+    ON s.id = addr.school_id
+LEFT JOIN core.school_classes AS sc
+    ON s.id = sc.school_id
+LEFT JOIN core.children AS c
+    ON sc.id = c.class_id
+LEFT JOIN littera.children_avaliation AS av
+    ON c.id = av.child_id
+WHERE s.is_demo IS FALSE
+GROUP BY
+    s.id, s.name, s.students_count,
+    addr.state, addr.city, addr.zip_code, addr.latitude, addr.longitude,
+    av.status
+ORDER BY
+    s.name, av.status;
+"""
+
+
+@DATASETS_MAPEADOS.em_cache("mapa_escolas")
+def carregar_escolas(versao):
+    """
+    Executa a query do mapa e devolve uma linha por escola (status pivotados + jitter).
+    Os dados são globais, então o resultado é compartilhado por todas as sessões e pelos
+    processos do host, num arquivo Arrow mapeado (`versao`: versao_global, só chave do cache).
+    """
+    df = executar_query(QUERY_MAPA, nome="mapa_escolas")
+
+    # -------------------------------------
+    # 🧹 Limpeza e preparação dos dados
+    # -------------------------------------
+    # Coordenadas ausentes/inválidas são estimadas pelo CEP (offline); sem CEP reconhecido a escola fica de fora
+    df = preencher_coordenadas(df)
+    df = df.dropna(subset=['latitude', 'longitude'])
+    if df.empty:
+        return df
+
+    # publicado já na ordem do índice hierárquico: as fatias por estado/cidade são visões do arquivo
+    escolas = montar_status_por_escola(df)
+    return escolas.sort_values(['state', 'city'], kind="stable", na_position="last", ignore_index=True)
+
+
+def filtrar_escolas(escolas, estado, cidade):
+    """Filtra por estado e cidade ("Todos" não filtra)."""
+    if estado != "Todos":
+        escolas = escolas[escolas['state'] == estado]
+    if cidade != "Todos":
+        escolas = escolas[escolas['city'] == cidade]
+    return escolas
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def carregar_agregados(versao):
+    """Agregados por estado e por cidade, calculados uma vez a partir do agrupamento por escola."""
+    escolas = carregar_escolas(versao)
+    return {
+        'estados': agregar_por_regiao(escolas, ['state']),
+        'cidades': agregar_por_regiao(escolas, ['state', 'city']),
+    }
+
+
+def agregados_da_selecao(estado, cidade):
+    """Recorta os agregados pré-calculados para o estado/cidade selecionados."""
+    agregados = carregar_agregados(versao_global())
+    return {
+        'estados': filtrar_escolas(agregados['estados'], estado, "Todos"),
+        'cidades': filtrar_escolas(agregados['cidades'], estado, cidade),
+    }
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def obter_indice_hierarquico(versao):
+    """Índice estado → cidade → escolas, construído uma vez por versão dos dados (`versao` é a chave do cache)."""
+    return IndiceHierarquico(carregar_escolas(versao))
+
+
+def escolas_da_selecao(estado, cidade):
+    """Escolas da seleção: fatia contígua do índice hierárquico (sem máscara booleana)."""
+    return obter_indice_hierarquico(versao_global()).fatiar(estado, cidade)
+
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def obter_indice_espacial(estado, cidade, versao):
+    """Índice espacial das escolas da seleção (construído uma vez por versão dos dados e compartilhado entre sessões)."""
+    return IndiceEspacial(escolas_da_selecao(estado, cidade))
+
+
+# -------------------------------------
+# 💾 HTML do mapa pré-renderizado (cache compartilhado)
+# -------------------------------------
+def html_do_mapa(estado, cidade):
+    """
+    HTML completo do mapa da seleção. Lido do cache compartilhado quando já existe para a
+    versão atual dos dados; senão é gerado (filtro + camadas + serialização) e gravado.
+    """
+    chave = (estado, cidade, versao_global())
+    comprimido = CACHE_MAPAS.obter(chave)
+    if comprimido is not None:
+        return zlib.decompress(comprimido).decode("utf-8")
+
+    escolas = escolas_da_selecao(estado, cidade)
+    html = construir_mapa(escolas, agregados_da_selecao(estado, cidade)).get_root().render()
+    CACHE_MAPAS.gravar(chave, zlib.compress(html.encode("utf-8"), 6))
+    return html
+
+
+@medir_tempo("Aquecimento do cache de mapas")
+def aquecer_cache_mapas(incluir_cidades=False):
+    """Pré-renderiza o mapa de todos os estados (e opcionalmente de cada cidade)."""
+    hierarquia = obter_indice_hierarquico(versao_global())
+    CACHE_MAPAS.remover_expirados()
+    total = 0
+    for estado in hierarquia.estados:
+        html_do_mapa(estado, "Todos")
+        total += 1
+        if incluir_cidades:
+            for cidade in hierarquia.cidades(estado):
+                html_do_mapa(estado, cidade)
+                total += 1
+    logging.info(f"🗺️ {total} mapas pré-renderizados")
+    return total
+
+
+# -------------------------------------
+# 🔭 Modo viewport: só o que está visível vai para o navegador
+# -------------------------------------
+def limites_do_retorno(retorno):
+    """Converte o 'bounds' devolvido pelo st_folium em (sul, oeste, norte, leste)."""
+    try:
+        sw, ne = retorno["bounds"]["_southWest"], retorno["bounds"]["_northEast"]
+        limites = (sw["lat"], sw["lng"], ne["lat"], ne["lng"])
+    except (KeyError, TypeError):
+        return None
+    return None if any(v is None for v in limites) else tuple(float(v) for v in limites)
+
+
+def camada_viewport(indice, agregados, limites, zoom):
+    """
+    Camada com o conteúdo da área visível: escolas individuais a partir de ZOOM_ESCOLAS,
+    círculos por cidade ou por estado nos zooms menores.
+    """
+    if zoom >= ZOOM_ESCOLAS:
+        fg = folium.FeatureGroup(name="Escolas")
+        visiveis = indice.consultar(*limites)
+        if not visiveis.empty:
+            camada_escolas(visiveis).add_to(fg)
+        return fg
+
+    nivel, nome = ('cidades', "Cidades") if zoom >= ZOOM_CIDADES else ('estados', "Estados")
+    sul, oeste, norte, leste = limites
+    df = agregados[nivel]
+    visiveis = df[df['latitude'].between(sul, norte) & df['longitude'].between(oeste, leste)]
+    return camada_agregados(visiveis, nome)
+
+
+def exibir_mapa_viewport(estado, cidade):
+    """Mapa que carrega apenas as escolas (ou agregados) dentro da área visível."""
+    indice = obter_indice_espacial(estado, cidade, versao_global())
+    agregados = agregados_da_selecao(estado, cidade)
+    chave = f"mapa_viewport_{estado}_{cidade}"
+
+    extensao = indice.limites()
+    zoom_inicial = zoom_para_limites(*extensao)
+    centro = [(extensao[0] + extensao[2]) / 2, (extensao[1] + extensao[3]) / 2]
+
+    # Estado devolvido pelo mapa na interação anterior (bounds/zoom atuais do usuário)
+    retorno = st.session_state.get(chave) or {}
+    limites = limites_do_retorno(retorno) or extensao
+    zoom = retorno.get("zoom") or zoom_inicial
+
+    m = folium.Map(location=centro, zoom_start=zoom_inicial, tiles='OpenStreetMap')
+    st_folium(
+        m,
+        key=chave,
+        feature_group_to_add=camada_viewport(indice, agregados, limites, zoom),
+        width='stretch',
+        height=500,
+        returned_objects=["bounds", "zoom"]
+    )
+
+
+def escolasNoMapa():
+
+    # -------------------------------------
+    # ⚙️ Configurações da página
+    # -------------------------------------
+    st.markdown("""
+    <style>
+    [data-testid="stHeader"], div[role="banner"] { display:none !important; }
+
+    body, .stApp, [data-testid="stAppViewContainer"],
+    .block-container {
+        padding-top: 0 !important;
+        margin-top: 0 !important;
+        background-color: #ffffff !important;
+    }
+
+    /* Estiliza os contêineres dos selectbox */
+    div[data-baseweb="select"] {
+        border: 2px solid #4A90E2 !important;   /* Cor da borda */
+        border-radius: 8px !important;          /* Bordas arredondadas */
+        background-color: #ffffff !important;   /* Fundo branco */
+        transition: all 0.3s ease;              /* Animação suave */
+    }
+
+    /* Efeito quando passa o mouse */
+    div[data-baseweb="select"]:hover {
+        border-color: #1A73E8 !important;       /* Azul mais escuro */
+        box-shadow: 0 0 6px rgba(26, 115, 232, 0.4);
+    }
+
+    /* Efeito quando está em foco (clicado) */
+    div[data-baseweb="select"]:focus-within {
+        border-color: #1A73E8 !important;
+        box-shadow: 0 0 0 3px rgba(26, 115, 232, 0.3);
+    }
+
+    /* Ajuste do texto interno */
+    div[data-baseweb="select"] > div {
+        font-size: 14px !important;
+        color: #333333 !important;
+    }
+
+    /* Ícone da setinha */
+    div[data-baseweb="select"] svg {
+        color: #4A90E2 !important;
+    }
+    
+    /* -----------------------------
+    CARDS MODERNOS
+    ----------------------------- */
+    .card {
+        background-color: #ffffff;
+        padding: 2px;
+        border-radius: 16px;
+        box-shadow: 0 4px 10px rgba(0,0,0,0.08);
+        text-align: center;
+        transition: transform 0.15s ease, box-shadow 0.15s ease;
+    }
+    .card-title {
+        font-size: 16px;
+        color: #444;
+        font-weight: 600;
+    }
+    .card-value {
+        font-size: 28px;
+        font-weight: 800;
+        color: #5A6ACF;
+    }
+                
+    </style>
+    """, unsafe_allow_html=True)
+
+    st.set_page_config(page_title="Mapa de Escolas", page_icon="assets/favicon.ico", layout="wide")
+    #st.title("📊 Painel Estratégico - Mapa de Escolas")
+
+    st.markdown("<h2 style='color:#5A6ACF;'>🗺️ Painel Estratégico - Mapa de Escolas</h2>", unsafe_allow_html=True)
+
+
+    # -------------------------------------
+    # 📦 Consulta ao banco de dados (cacheada e compartilhada)
+    # -------------------------------------
+    try:
+        versao = versao_global()
+        escolas = carregar_escolas(versao)
+    except OperationalError as e:
+        logging.error(f"Erro ao conectar ao banco: {e}")
+        st.error("Erro temporário ao conectar. Tente novamente mais tarde.")
+        st.stop()
+    except Exception as e:
+        logging.error(f"Erro inesperado ao consultar dados: {e}")
+        st.error("Erro inesperado. Tente novamente mais tarde.")
+        st.stop()
+
+    selo_dados_antigos([escolas], [carregar_escolas, carregar_agregados], (versao,))
+
+    if escolas.empty:
+        st.warning("Nenhum registro encontrado.")
+        st.stop()
+
+    # -------------------------------------
+    # 🎛️ Filtros
+    # -------------------------------------
+    modo_viewport = st.toggle(
+        "🔭 Carregar apenas a área visível do mapa",
+        value=False,
+        help="Envia ao navegador só as escolas da área visível; com zoom afastado mostra contagens agregadas."
+    )
+
+    col1, col2, col3 = st.columns(3)
+
+    hierarquia = obter_indice_hierarquico(versao)
+
+    # --- Estado ---
+    estados = hierarquia.estados
+    if modo_viewport:
+        estados = ["Todos"] + estados   # 👈 visão nacional só no modo viewport
+    with col1:
+        estado_sel = st.selectbox("Estado:", estados)
+
+    # --- Cidade ---
+    cidades = ["Todos"] + hierarquia.cidades(estado_sel)   # 👈 adiciona "Todos" no início da lista
+    with col2:
+        cidade_sel = st.selectbox("Cidade:", cidades)
+
+    total_escolas = hierarquia.total_escolas(estado_sel, cidade_sel)
+
+    # --- Métrica ---
+    with col3:
+
+        st.markdown(f"""
+        <div class="card ">
+            <div class="card-title">Total de Escolas</div>
+            <div class="card-value">{total_escolas}</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    # Caso não haja dados após os filtros
+    if total_escolas == 0:
+        st.warning("Nenhuma escola encontrada com os filtros selecionados.")
+        st.stop()
+
+    # -------------------------------------
+    # 📊 Layout final
+    # -------------------------------------
+    if modo_viewport:
+        exibir_mapa_viewport(estado_sel, cidade_sel)
+    else:
+        st.iframe(html_do_mapa(estado_sel, cidade_sel), height=500)
+
+    aproximadas = int(escolas_da_selecao(estado_sel, cidade_sel)['coord_aproximada'].sum())
+    if aproximadas:
+        st.caption(f"📮 {aproximadas} escola(s) sem coordenadas cadastradas foram posicionadas pelo CEP (localização aproximada).")
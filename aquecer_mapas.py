@@ -0,0 +1,22 @@
+# aquecer_mapas.py
+"""
+Pré-renderiza o HTML do mapa de escolas de todos os estados no cache compartilhado.
+
+Uso (no deploy, antes ou em paralelo ao Streamlit):
+    python aquecer_mapas.py
+    python aquecer_mapas.py --cidades
+"""
+import argparse
+
+import DashMapaEscolas as mapa
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aquece o cache de HTML do mapa de escolas.")
+    parser.add_argument("--cidades", action="store_true", help="Também pré-renderiza cada cidade")
+    args = parser.parse_args(argv)
+    mapa.aquecer_cache_mapas(incluir_cidades=args.cidades)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# atualizacao_incremental.py
+"""
+Atualização incremental dos datasets por gestor: depois da primeira carga completa, só
+as avaliações alteradas desde a última marca d'água (MAX(updated_at) já carregado) vêm
+do banco, e são mescladas no DataFrame em memória (inserção, substituição ou remoção por
+avaliacao_id). O custo de atualizar passa a ser proporcional ao volume de mudanças, não
+ao histórico do gestor.
+
+A query de cada dataset é um template com dois marcadores:
+    {filtro}    condição de pertencimento ao dataset (ex.: av.status = 'Concluido'),
+                selecionada também como coluna `incluir`;
+    {condicao}  WHERE da carga: o próprio filtro na carga completa e
+                av.updated_at >= :desde no delta (sem o filtro, para enxergar as
+                avaliações que saíram do dataset — elas voltam com incluir = false).
+
+O delta parte de DELTA_SOBREPOSICAO segundos antes da marca: updated_at é o instante do
+UPDATE, não do COMMIT, e uma transação que confirma depois de a marca avançar teria as
+linhas perdidas. As avaliações repetidas da janela só substituem as iguais (avaliacao_id).
+
+Cada versão carregada é publicada no ARMAZEM_PRECALCULADO (quando ele grava). Sem
+estado em memória, o dataset da mesma versão gravado lá (pelo worker de pré-cálculo ou
+por outra instância) substitui a carga completa, e os deltas seguintes partem dele.
+
+O DataFrame de cada versão é publicado em DATASETS_MAPEADOS com a mesma chave usada
+pelos carregadores das páginas ((nome, email_hash, versao)): os processos do host leem
+um único arquivo mapeado, e o delta seguinte parte desse mesmo arquivo.
+
+Os deltas não guardam nem recebem o último resultado válido da camada de consultas
+(executar_query(ultimo_valido=False)): um delta antigo mesclado sob a versão nova a
+daria por atualizada. Com o banco fora, o delta falha e a página recebe o dataset da
+versão anterior marcado em df.attrs["dados_de"], sem publicá-lo sob a versão nova; a
+próxima chamada tenta o delta de novo. Uma carga completa que volte do último resultado
+válido também é só servida, sem virar estado.
+
+Exclusões físicas não aparecem no delta: quando o total da sonda de versão diminui, ou
+a carga completa passa de RECARGA_COMPLETA segundos, o dataset é recarregado inteiro.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+
+from cache_compartilhado import ARMAZEM_PRECALCULADO, tem_dados_antigos
+from config import FALHAS_BANCO, executar_query
+from datasets_mapeados import DATASETS_MAPEADOS
+from memoria import CONTADOR_MEMORIA
+from versao_dados import total_da_versao
+
+RECARGA_COMPLETA = int(os.getenv("DELTA_RECARGA_COMPLETA", "21600"))
+MAX_GESTORES = int(os.getenv("DELTA_MAX_GESTORES", "64"))
+# Janela do delta antes da marca, para transações confirmadas depois de a marca avançar
+SOBREPOSICAO = pd.Timedelta(seconds=int(os.getenv("DELTA_SOBREPOSICAO", "300")))
+
+
+class DatasetIncremental:
+    """
+    Dataset por gestor (email_hash) mantido em memória e atualizado por delta.
+    `preparar(df)` é aplicado só às linhas novas (colunas derivadas, tipos).
+    """
+
+    def __init__(self, nome, query, filtro, ordenar=None, chave="avaliacao_id"):
+        self.nome = nome
+        self.query_completa = query.format(filtro=filtro, condicao=filtro)
+        self.query_delta = query.format(filtro=filtro, condicao="av.updated_at >= :desde")
+        self.ordenar = ordenar
+        self.chave = chave
+        # email_hash → {"df", "chave", "marca", "total", "carregado_em", "atualizado_em"},
+        # do menos para o mais recente
+        self._estado = OrderedDict()
+        self._lock = threading.Lock()
+        self._cache = f"delta:{nome}"
+        CONTADOR_MEMORIA.registrar_cache(self._cache, self.descartar)
+
+    def em_memoria(self, email_hash):
+        """True se o gestor já tem o dataset em memória (a próxima carga é um delta)."""
+        with self._lock:
+            return email_hash in self._estado
+
+    def obter(self, email_hash, versao, preparar=None):
+        """
+        DataFrame do gestor atualizado para `versao` (versao_gestor). O DataFrame fica
+        guardado para o próximo delta: quem recebe não deve alterá-lo.
+        """
+        total = total_da_versao(versao)
+        with self._lock:
+            estado = self._estado.get(email_hash)
+
+        if estado is None:
+            df = self._do_precalculo(email_hash, versao, total)
+            if df is not None:
+                return df
+        if (
+            estado is None
+            or pd.isna(estado["marca"])          # dataset vazio: não há de onde partir
+            or total < estado["total"]
+            or time.time() - estado["carregado_em"] > RECARGA_COMPLETA
+        ):
+            return self._carregar_completo(email_hash, versao, total, preparar)
+        return self._aplicar_delta(email_hash, versao, estado, total, preparar)
+
+    def _do_precalculo(self, email_hash, versao, total):
+        df = ARMAZEM_PRECALCULADO.obter((self.nome, email_hash, versao))
+        if df is None:
+            return None
+        logging.info(f"🗄️ {self.nome}: {len(df)} linhas do pré-cálculo")
+        return self._guardar(email_hash, versao, df, self._marca(df), total, carregado_em=time.time())
+
+    def _carregar_completo(self, email_hash, versao, total, preparar):
+        bruto = executar_query(self.query_completa, params={"email_hash": email_hash}, nome=self.nome)
+        if tem_dados_antigos(bruto):
+            # último resultado válido (banco fora): serve sem virar estado da versão nova
+            df = self._preparar(bruto, preparar)
+            df.attrs["dados_de"] = bruto.attrs["dados_de"]
+            return df
+        marca = self._marca(bruto)
+        df = self._preparar(bruto, preparar)
+        df = self._guardar(email_hash, versao, df, marca, total, carregado_em=time.time())
+        self._publicar(email_hash, versao, df)
+        logging.info(f"📥 {self.nome}: carga completa com {len(df)} linhas")
+        return df
+
+    def _aplicar_delta(self, email_hash, versao, estado, total, preparar):
+        df, marca = estado["df"], estado["marca"]
+        if df is None:
+            df = DATASETS_MAPEADOS.abrir(estado["chave"])
+            if df is None:
+                # arquivo da versão anterior já removido pela limpeza
+                return self._carregar_completo(email_hash, versao, total, preparar)
+        # com a sobreposição, linhas já carregadas voltam e só substituem as iguais
+        try:
+            delta = executar_query(
+                self.query_delta,
+                params={"email_hash": email_hash, "desde": (marca - SOBREPOSICAO).to_pydatetime()},
+                nome=f"{self.nome}_delta",
+                ultimo_valido=False,
+            )
+        except FALHAS_BANCO as e:
+            # versão anterior, marcada como antiga; o estado continua nela e o próximo delta tenta de novo
+            logging.warning(f"🛟 {self.nome}: delta falhou ({type(e).__name__}); servindo a versão anterior")
+            df = df.copy(deep=False)
+            df.attrs["dados_de"] = estado["atualizado_em"]
+            return df
+
+        if not delta.empty:
+            # a marca avança também com as avaliações que saíram do dataset (incluir = false)
+            marca = max(marca, self._marca(delta))
+            novas = self._preparar(delta, preparar)
+            tocadas = df[self.chave].isin(delta[self.chave])
+            continuam = df[self.chave].isin(novas[self.chave])
+            df = pd.concat([df[~tocadas], novas], ignore_index=True)
+            if self.ordenar:
+                df = df.sort_values(self.ordenar, kind="stable", ignore_index=True)
+            logging.info(
+                f"🔁 {self.nome}: delta de {len(delta)} avaliações desde {estado['marca']} — "
+                f"{len(novas) - continuam.sum()} inseridas, {continuam.sum()} atualizadas, "
+                f"{(tocadas & ~continuam).sum()} removidas"
+            )
+        df = self._guardar(email_hash, versao, df, marca, total, carregado_em=estado["carregado_em"])
+        self._publicar(email_hash, versao, df)
+        return df
+
+    def _publicar(self, email_hash, versao, df):
+        """Grava o dataset da versão no armazém, para as outras instâncias partirem dele."""
+        if ARMAZEM_PRECALCULADO.gravando and not tem_dados_antigos(df):
+            ARMAZEM_PRECALCULADO.gravar((self.nome, email_hash, versao), df)
+
+    @staticmethod
+    def _marca(bruto):
+        return pd.to_datetime(bruto["atualizado_em"]).max() if len(bruto) else pd.NaT
+
+    @staticmethod
+    def _preparar(df, preparar):
+        df = df[df.pop("incluir").astype(bool)].reset_index(drop=True)
+        if preparar is not None:
+            df = preparar(df)
+        return df
+
+    def _guardar(self, email_hash, versao, df, marca, total, carregado_em):
+        """
+        Guarda o estado do gestor e devolve o df lido de DATASETS_MAPEADOS. Publicado, o
+        estado guarda só a chave e o próximo delta relê o dataset de lá (as colunas
+        comprimidas não ficam presas aqui); sem publicação, guarda o próprio df.
+        """
+        chave = (self.nome, email_hash, versao)
+        df = DATASETS_MAPEADOS.publicar(chave, df)
+        publicado = DATASETS_MAPEADOS.publicado(chave)
+        removidos = []
+        with self._lock:
+            self._estado[email_hash] = {
+                "df": None if publicado else df, "chave": chave,
+                "marca": marca, "total": total, "carregado_em": carregado_em,
+                "atualizado_em": datetime.now(),
+            }
+            self._estado.move_to_end(email_hash)
+            while len(self._estado) > MAX_GESTORES:
+                removidos.append(self._estado.popitem(last=False)[0])
+            # MAX_GESTORES = 0 (worker de pré-cálculo): o estado acabou de sair
+            mantido = email_hash in self._estado
+        for removido in removidos:
+            CONTADOR_MEMORIA.esquecer(self._cache, removido)
+        if publicado or not mantido:
+            # publicado: já contado em DATASETS_MAPEADOS; fora do estado: nada fica na memória
+            CONTADOR_MEMORIA.esquecer(self._cache, email_hash)
+        else:
+            CONTADOR_MEMORIA.guardar(self._cache, email_hash, df)
+        return df
+
+    def descartar(self, email_hash):
+        """Esquece o estado do gestor: a próxima carga parte do pré-cálculo ou do banco."""
+        with self._lock:
+            self._estado.pop(email_hash, None)
@@ -0,0 +1,114 @@
+# benchmark_datasets.py
+"""
+Benchmark da forma comprimida dos datasets por gestor (datasets_mapeados.py): taxa de
+compressão e latência de descompressão com dados sintéticos no formato do dataset de
+desempenho por ilha (textos repetitivos de escola/turma/classificação, pontos pequenos).
+
+Para cada tamanho compara o DataFrame em memória (pandas), o Arrow sem compressão
+(DATASETS_COMPRESSAO=nenhuma) e lz4/zstd com e sem dicionário. A latência é a mediana
+de --repeticoes leituras a frio (colunas descomprimidas descartadas entre uma e outra):
+o dataset inteiro, uma coluna numérica e uma de texto.
+
+Uso:
+    python benchmark_datasets.py
+    python benchmark_datasets.py --tamanhos 10000 200000 --repeticoes 20
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from datasets_mapeados import QuadroComprimido, tabela_comprimivel
+
+ILHAS = [
+    "pts_ilha_leitura", "pts_ilha_escrita", "pts_ilha_letras_palavras", "pts_ilha_atencao_visual",
+    "pts_ilha_habilidades_motoras", "pts_ilha_rima", "pts_ilha_memoria", "pts_ilha_calculo",
+]
+
+
+def gerar_avaliacoes_sinteticas(n, seed=42):
+    """Linhas no formato do dataset de desempenho por ilha (uma por avaliação)."""
+    rng = np.random.default_rng(seed)
+    escolas = [f"Escola Municipal {i}" for i in range(40)]
+    alunos = rng.integers(0, max(n // 3, 1), n)
+    df = pd.DataFrame({
+        "avaliacao_id": np.arange(n),
+        "aluno_id": alunos,
+        "aluno_nome": [f"Aluno {a} da Silva" for a in alunos],
+        "escola_nome": rng.choice(escolas, n),
+        "turma_nome": rng.choice(list("ABCDEF"), n),
+        "turma_serie": rng.choice(["1", "2", "3", "4", "5"], n),
+        "turma_turno": rng.choice(["Manhã", "Tarde"], n),
+        "turma_ano": rng.choice(["2024", "2025"], n),
+        "classificacao_aluno": rng.choice(["Adequado", "Atenção", "Intervenção"], n),
+        "atualizado_em": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 3e7, n), unit="s"),
+        **{ilha: rng.integers(0, 7, n) for ilha in ILHAS},
+    })
+    df["turma_id"] = df["turma_ano"] + ": " + df["turma_serie"] + "ª série " + df["turma_nome"] + " " + df["turma_turno"]
+    return df
+
+
+def gravar(df, compressao, dicionario):
+    """Bytes do arquivo Arrow IPC na configuração pedida."""
+    tabela = tabela_comprimivel(df, fracao_dicionario=0.5 if dicionario else 0.0)
+    destino = io.BytesIO()
+    opcoes = pa.ipc.IpcWriteOptions(compression=compressao)
+    with pa.ipc.new_file(destino, tabela.schema, options=opcoes) as escritor:
+        escritor.write_table(tabela)
+    return destino.getvalue()
+
+
+def latencia(quadro, colunas, repeticoes):
+    """Mediana, em ms, de para_pandas(colunas) com as colunas descomprimidas descartadas antes."""
+    tempos = []
+    for _ in range(repeticoes):
+        quadro.liberar()
+        inicio = time.perf_counter()
+        quadro.para_pandas(colunas)
+        tempos.append(time.perf_counter() - inicio)
+    return float(np.median(tempos)) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de compressão dos datasets por gestor.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--repeticoes", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    configuracoes = [
+        ("arrow", None, False),
+        ("lz4", "lz4", False),
+        ("lz4+dicionário", "lz4", True),
+        ("zstd", "zstd", False),
+        ("zstd+dicionário", "zstd", True),
+    ]
+
+    print(
+        f"{'linhas':>8} | {'formato':<16} | {'MB':>7} | {'taxa':>5} | {'gestores/GB':>11} | "
+        f"{'tudo (ms)':>9} | {'1 num (ms)':>10} | {'1 texto (ms)':>12}"
+    )
+    print("-" * 100)
+    for n in args.tamanhos:
+        df = gerar_avaliacoes_sinteticas(n)
+        em_memoria = int(df.memory_usage(deep=True, index=True).sum())
+        print(
+            f"{n:>8} | {'pandas':<16} | {em_memoria / 2**20:>7.2f} | {1:>5.1f} | "
+            f"{2**30 / em_memoria:>11,.0f} | {'-':>9} | {'-':>10} | {'-':>12}"
+        )
+        for nome, compressao, dicionario in configuracoes:
+            dados = gravar(df, compressao, dicionario)
+            quadro = QuadroComprimido(pa.BufferReader(pa.py_buffer(dados)))
+            pd.testing.assert_frame_equal(quadro.para_pandas(), df)
+            print(
+                f"{n:>8} | {nome:<16} | {len(dados) / 2**20:>7.2f} | {em_memoria / len(dados):>5.1f} | "
+                f"{2**30 / len(dados):>11,.0f} | {latencia(quadro, None, args.repeticoes):>9.2f} | "
+                f"{latencia(quadro, ['pts_ilha_leitura'], args.repeticoes):>10.2f} | "
+                f"{latencia(quadro, ['turma_id'], args.repeticoes):>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# benchmark_mapa.py
+"""
+Benchmark do mapa de escolas: tamanho do HTML enviado ao navegador e tempo de geração
+(montagem do folium.Map + serialização do HTML) com dados sintéticos.
+
+Compara a camada única FastMarkerCluster (construir_mapa) com o modelo antigo,
+um folium.Marker + folium.Icon + tooltip HTML por escola.
+
+O tempo de renderização no navegador depende do cliente e não é medido aqui; o tamanho
+do payload e a quantidade de objetos JS criados no carregamento são o que o determinam.
+
+Uso:
+    python benchmark_mapa.py
+    python benchmark_mapa.py --tamanhos 1000 10000 50000 --sem-legado
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# O benchmark não acessa o banco, mas config.py exige as variáveis para criar a engine
+for _var in ("DB_USER", "DB_PASS", "DB_HOST", "DB_NAME"):
+    os.environ.setdefault(_var, "benchmark")
+
+import folium
+from folium.plugins import MarkerCluster
+
+import DashMapaEscolas as mapa
+
+
+def gerar_escolas_sinteticas(n, seed=42):
+    """Gera linhas no formato da query do mapa (uma linha por escola x status)."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(n)
+    escolas = pd.DataFrame({
+        "school_id": ids,
+        "school_name": [f"Escola Municipal {i}" for i in ids],
+        "students_count": rng.integers(20, 1500, n),
+        "state": rng.choice(["SP", "RJ", "MG", "BA", "PR"], n),
+        "city": rng.choice([f"Cidade {i}" for i in range(200)], n),
+        "zip_code": [f"{z:08d}" for z in rng.integers(1000000, 99999999, n)],
+        # coordenadas arredondadas geram escolas sobrepostas (exercita o jitter)
+        "latitude": np.round(rng.uniform(-30, -5, n), 3),
+        "longitude": np.round(rng.uniform(-55, -35, n), 3),
+    })
+    partes = []
+    for status in ["NaoIniciado", "EmAndamento", "Concluido"]:
+        parte = escolas.sample(frac=0.7, random_state=int(rng.integers(1_000_000)))
+        partes.append(parte.assign(
+            avaliacao_status=status,
+            total_alunos_status=rng.integers(1, 60, len(parte))
+        ))
+    return pd.concat(partes, ignore_index=True)
+
+
+def construir_mapa_legado(status_por_escola):
+    """Reprodução do modelo antigo: um folium.Marker por escola."""
+    m = folium.Map(
+        location=[status_por_escola.iloc[0]["lat_jitter"], status_por_escola.iloc[0]["lon_jitter"]],
+        zoom_start=10, tiles="OpenStreetMap"
+    )
+    container = MarkerCluster().add_to(m) if len(status_por_escola) > 500 else m
+    colunas_status = mapa.colunas_de_status(status_por_escola)
+    for _, row in status_por_escola.iterrows():
+        status = "<br>".join(
+            f"{mapa.status_labels.get(c, c)}: {row[c]}" for c in colunas_status if row[c] > 0
+        )
+        popup = f"""
+        <b>{row['school_name']}</b><br>
+        {row['city']} - {row['state']}<br>
+        Total de Alunos Cadastrados: {row['students_count']}<br>
+        <br>
+        <b>Status de Avaliação</b><br>
+        {status}
+        """
+        folium.Marker(
+            location=[row["lat_jitter"], row["lon_jitter"]],
+            tooltip=popup,
+            icon=folium.Icon(color="blue", icon="graduation-cap", prefix="fa")
+        ).add_to(container)
+    return m
+
+
+def medir(construtor, status_por_escola):
+    """Retorna (bytes do HTML, segundos para montar o mapa e serializar o HTML)."""
+    inicio = time.perf_counter()
+    html = construtor(status_por_escola).get_root().render()
+    return len(html.encode("utf-8")), time.perf_counter() - inicio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de payload e tempo de geração do mapa de escolas.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--sem-legado", action="store_true", help="Não mede o modelo antigo (lento em 50k)")
+    args = parser.parse_args(argv)
+
+    print(f"{'escolas':>8} | {'modelo':<18} | {'payload (KB)':>12} | {'geração (s)':>11}")
+    print("-" * 60)
+    for n in args.tamanhos:
+        status_por_escola = mapa.montar_status_por_escola(gerar_escolas_sinteticas(n))
+
+        modelos = [("FastMarkerCluster", mapa.construir_mapa)]
+        if not args.sem_legado:
+            modelos.append(("folium.Marker", construir_mapa_legado))
+
+        for nome, construtor in modelos:
+            tamanho, segundos = medir(construtor, status_por_escola)
+            print(f"{n:>8} | {nome:<18} | {tamanho / 1024:>12,.0f} | {segundos:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,639 @@
+# cache_compartilhado.py
+"""
+Armazenamento compartilhado de artefatos (ex: HTML do mapa, figuras Plotly) entre sessões e processos.
+
+O cache compartilhado fica atrás de um backend plugável (CACHE_BACKEND): memoria, sqlite
+(arquivo local, padrão) ou redis (REDIS_URL; compartilhado entre instâncias). DataFrames
+vão em Arrow IPC com compressão (CACHE_COMPRESSAO: zstd ou lz4).
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from memoria import CONTADOR_MEMORIA
+
+# Diretório base do cache (no Cloud Run, /tmp fica em memória da instância)
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(tempfile.gettempdir(), "neuroverse_cache"))
+
+
+class CacheDisco:
+    """
+    Cache de bytes em disco: um arquivo por chave dentro de CACHE_DIR/<namespace>.
+    Escrita atômica (arquivo temporário + os.replace), então vários processos podem
+    ler e gravar ao mesmo tempo sem ver arquivos pela metade.
+    """
+
+    def __init__(self, namespace, ttl=None, diretorio=None):
+        self.ttl = ttl
+        self.diretorio = Path(diretorio or CACHE_DIR) / namespace
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+
+    def _caminho(self, chave):
+        return self.diretorio / (hashlib.sha256(repr(chave).encode("utf-8")).hexdigest() + ".bin")
+
+    def obter(self, chave):
+        """Retorna os bytes gravados para a chave ou None (ausente/expirado)."""
+        caminho = self._caminho(chave)
+        try:
+            if self.ttl is not None and time.time() - caminho.stat().st_mtime > self.ttl:
+                return None
+            return caminho.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def gravar(self, chave, valor):
+        caminho = self._caminho(chave)
+        fd, temporario = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(valor)
+            os.replace(temporario, caminho)
+        except Exception:
+            Path(temporario).unlink(missing_ok=True)
+            raise
+
+    def remover_expirados(self):
+        """Apaga arquivos mais antigos que o ttl. Retorna quantos foram removidos."""
+        if self.ttl is None:
+            return 0
+        removidos = 0
+        limite = time.time() - self.ttl
+        for caminho in self.diretorio.glob("*.bin"):
+            try:
+                if caminho.stat().st_mtime < limite:
+                    caminho.unlink()
+                    removidos += 1
+            except FileNotFoundError:
+                continue
+        if removidos:
+            logging.info(f"🧹 {removidos} arquivos expirados removidos de {self.diretorio}")
+        return removidos
+
+
+# -----------------------------
+# 🔌 Backends do cache compartilhado
+# -----------------------------
+# Todos guardam bytes por chave (str) com ttl opcional em segundos. `compartilhado` indica
+# se outro processo/instância enxerga o que foi gravado.
+class BackendMemoria:
+    """Bytes na memória do processo (LRU por tamanho). Não sobrevive ao processo."""
+    nome = "memoria"
+    compartilhado = False
+
+    def __init__(self, max_bytes=256 * 2**20):
+        self.max_bytes = max_bytes
+        self._itens = OrderedDict()   # chave → (bytes, expira_em)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            if item[1] is not None and item[1] < time.time():
+                self._remover(chave)
+                return None
+            self._itens.move_to_end(chave)
+            return item[0]
+
+    def gravar(self, chave, valor, ttl=None):
+        with self._lock:
+            self._remover(chave)
+            self._itens[chave] = (valor, time.time() + ttl if ttl else None)
+            self._bytes += len(valor)
+            while self._bytes > self.max_bytes and len(self._itens) > 1:
+                self._remover(next(iter(self._itens)))
+
+    def remover(self, chave):
+        with self._lock:
+            self._remover(chave)
+
+    def _remover(self, chave):
+        item = self._itens.pop(chave, None)
+        if item is not None:
+            self._bytes -= len(item[0])
+
+
+class BackendSQLite:
+    """
+    Arquivo SQLite local (WAL): compartilhado pelos processos da instância e, num volume
+    montado, entre reinícios. Uma conexão por thread.
+
+    As gravações fazem a manutenção a cada `intervalo_limpeza` segundos: apagam os itens
+    expirados e, se o arquivo passar de `max_mb`, os gravados há mais tempo. Com o /tmp em
+    memória (Cloud Run), as chaves versionadas não crescem sem limite.
+    """
+    nome = "sqlite"
+    compartilhado = True
+
+    def __init__(self, caminho=None, max_mb=None, intervalo_limpeza=None):
+        self.caminho = caminho or os.getenv("CACHE_SQLITE", os.path.join(CACHE_DIR, "cache.sqlite3"))
+        self.max_bytes = int(float(max_mb or os.getenv("CACHE_SQLITE_MAX_MB", "512")) * 2**20)
+        self.intervalo_limpeza = float(intervalo_limpeza or os.getenv("CACHE_SQLITE_LIMPEZA", "300"))
+        Path(self.caminho).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._ultima_limpeza = time.time()
+        conn = self._conexao()
+        # só vale para arquivo novo: páginas liberadas voltam ao sistema (incremental_vacuum)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (chave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira_em REAL)"
+        )
+
+    def _conexao(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def obter(self, chave):
+        linha = self._conexao().execute(
+            "SELECT valor FROM cache WHERE chave = ? AND (expira_em IS NULL OR expira_em > ?)", (chave, time.time())
+        ).fetchone()
+        return None if linha is None else linha[0]
+
+    def gravar(self, chave, valor, ttl=None):
+        self._conexao().execute(
+            "INSERT OR REPLACE INTO cache (chave, valor, expira_em) VALUES (?, ?, ?)",
+            (chave, sqlite3.Binary(valor), time.time() + ttl if ttl else None)
+        )
+        with self._lock:
+            if time.time() - self._ultima_limpeza < self.intervalo_limpeza:
+                return
+            self._ultima_limpeza = time.time()
+        self.remover_expirados()
+        self.limitar_tamanho()
+
+    def remover(self, chave):
+        self._conexao().execute("DELETE FROM cache WHERE chave = ?", (chave,))
+
+    def remover_expirados(self):
+        removidos = self._conexao().execute("DELETE FROM cache WHERE expira_em < ?", (time.time(),)).rowcount
+        if removidos:
+            self._conexao().execute("PRAGMA incremental_vacuum")
+            logging.info(f"🧹 {removidos} itens expirados removidos de {self.caminho}")
+        return removidos
+
+    def limitar_tamanho(self):
+        """Acima de max_bytes, apaga os itens gravados há mais tempo (menor rowid) até voltar a 80%."""
+        conn = self._conexao()
+        total = conn.execute("SELECT COALESCE(SUM(LENGTH(valor)), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        excesso, liberados, ultimo = total - int(self.max_bytes * 0.8), 0, None
+        # INSERT OR REPLACE regrava com rowid novo: rowid crescente = ordem de gravação
+        for rowid, tamanho in conn.execute("SELECT rowid, LENGTH(valor) FROM cache ORDER BY rowid"):
+            liberados += tamanho
+            ultimo = rowid
+            if liberados >= excesso:
+                break
+        removidos = conn.execute("DELETE FROM cache WHERE rowid <= ?", (ultimo,)).rowcount
+        conn.execute("PRAGMA incremental_vacuum")
+        logging.info(
+            f"🧹 Cache {self.caminho} acima de {self.max_bytes / 2**20:.0f} MB: "
+            f"{removidos} itens mais antigos removidos ({liberados / 2**20:.1f} MB)"
+        )
+        return removidos
+
+
+class BackendRedis:
+    """
+    Servidor com protocolo Redis (Redis, Memorystore, Valkey, ou um stand-in local):
+    compartilhado por todas as instâncias, então o cache continua quente quando o
+    autoscaling cria ou derruba instâncias. `cliente` aceita qualquer objeto com
+    get/set(ex=)/delete (ex.: fakeredis nos testes).
+    """
+    nome = "redis"
+    compartilhado = True
+
+    def __init__(self, url=None, cliente=None):
+        if cliente is None:
+            import redis  # dependência opcional: só com CACHE_BACKEND=redis
+            cliente = redis.Redis.from_url(
+                url or os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+                socket_timeout=float(os.getenv("REDIS_TIMEOUT", "1"))
+            )
+        self.cliente = cliente
+
+    def obter(self, chave):
+        return self.cliente.get(chave)
+
+    def gravar(self, chave, valor, ttl=None):
+        self.cliente.set(chave, valor, ex=int(ttl) if ttl else None)
+
+    def remover(self, chave):
+        self.cliente.delete(chave)
+
+
+BACKENDS = {
+    BackendMemoria.nome: BackendMemoria,
+    BackendSQLite.nome: BackendSQLite,
+    BackendRedis.nome: BackendRedis,
+}
+
+
+def registrar_backend(nome, classe):
+    """Registra um backend extra (classe sem argumentos obrigatórios, com obter/gravar/remover)."""
+    BACKENDS[nome] = classe
+
+
+def criar_backend(nome=None):
+    """Backend escolhido por CACHE_BACKEND (memoria, sqlite ou redis; padrão sqlite)."""
+    nome = nome or os.getenv("CACHE_BACKEND", "sqlite")
+    if nome not in BACKENDS:
+        raise ValueError(f"Backend de cache desconhecido: {nome} (disponíveis: {', '.join(BACKENDS)})")
+    return BACKENDS[nome]()
+
+
+# -----------------------------
+# 📦 Serialização (Arrow IPC comprimido)
+# -----------------------------
+# zstd comprime mais; lz4 descomprime mais rápido
+COMPRESSAO = os.getenv("CACHE_COMPRESSAO", "zstd")
+
+# 1º byte do valor serializado
+_ARROW, _BYTES, _FIGURA, _JSON, _TUPLA = b"A", b"B", b"F", b"J", b"T"
+
+# Metadados do schema com as colunas que tabela_arrow gravou em JSON
+_META_JSON = b"colunas_json"
+
+
+def _comprimir(dados):
+    return struct.pack("<Q", len(dados)) + pa.compress(dados, codec=COMPRESSAO, asbytes=True)
+
+
+def _descomprimir(dados):
+    (tamanho,) = struct.unpack_from("<Q", dados)
+    return pa.decompress(dados[8:], decompressed_size=tamanho, codec=COMPRESSAO, asbytes=True)
+
+
+def colunas_aninhadas(df):
+    """
+    Colunas de objetos com listas, dicionários ou arrays (ex.: JSONB do banco, como
+    feelings_results). O Arrow as converte em list<struct>, preenche com None as chaves
+    ausentes e devolve arrays numpy na leitura: não voltam os mesmos objetos.
+    """
+    return [
+        coluna for coluna, tipo in df.dtypes.items()
+        if tipo == object and any(isinstance(v, (list, dict, tuple, np.ndarray)) for v in df[coluna].array)
+    ]
+
+
+def _para_json(valor):
+    if valor is None or (isinstance(valor, float) and valor != valor):
+        return None
+    # arrays/escalares numpy (ex.: de um DataFrame que já passou pelo Arrow) viram listas/números
+    return json.dumps(valor, ensure_ascii=False, default=lambda o: o.tolist() if hasattr(o, "tolist") else str(o))
+
+
+def tabela_arrow(df):
+    """
+    Tabela Arrow do DataFrame (com o índice). Colunas de listas/dicionários vão como texto
+    JSON, listadas nos metadados para a leitura decodificar (ler_json).
+    """
+    aninhadas = colunas_aninhadas(df)
+    if aninhadas:
+        df = df.copy(deep=False)
+        for coluna in aninhadas:
+            df[coluna] = df[coluna].map(_para_json).astype(object)
+    tabela = pa.Table.from_pandas(df, preserve_index=True)
+    metadados = dict(tabela.schema.metadata or {})
+    metadados[_META_JSON] = json.dumps(aninhadas).encode("utf-8")
+    return tabela.replace_schema_metadata(metadados)
+
+
+def ler_json(df, schema):
+    """Decodifica de volta para listas/dicionários as colunas que tabela_arrow gravou em JSON."""
+    for coluna in json.loads((schema.metadata or {}).get(_META_JSON, b"[]")):
+        if coluna in df.columns:
+            df[coluna] = df[coluna].map(lambda v: json.loads(v) if isinstance(v, str) else None).astype(object)
+    return df
+
+
+
+def serializar(valor):
+    """
+    Bytes do valor para o backend: DataFrame em Arrow IPC com buffers comprimidos (colunas
+    aninhadas em JSON), figura Plotly e valores simples (números, textos, listas,
+    dicionários) em JSON comprimido, bytes como estão e tuplas parte a parte.
+
+    Nada vai em pickle: um backend compartilhado (Redis) é gravável por outros, e ler um
+    pickle de lá executaria o que alguém gravou. O que não tem forma segura (ex.: coluna
+    de objetos mistos) levanta TypeError e não é compartilhado.
+    """
+    if isinstance(valor, pd.DataFrame):
+        try:
+            tabela = tabela_arrow(valor)
+            saida = pa.BufferOutputStream()
+            with pa.ipc.new_stream(saida, tabela.schema, options=pa.ipc.IpcWriteOptions(compression=COMPRESSAO)) as escritor:
+                escritor.write_table(tabela)
+            return _ARROW + saida.getvalue().to_pybytes()
+        except (pa.ArrowException, ValueError) as e:
+            raise TypeError(f"DataFrame fora do Arrow: {e}") from e
+    if isinstance(valor, bytes):
+        return _BYTES + valor
+    if isinstance(valor, tuple):
+        partes = [serializar(parte) for parte in valor]
+        return _TUPLA + b"".join(struct.pack("<Q", len(parte)) + parte for parte in partes)
+    if type(valor).__module__.startswith("plotly."):
+        return _FIGURA + _comprimir(valor.to_json().encode("utf-8"))
+    try:
+        return _JSON + _comprimir(json.dumps(valor, ensure_ascii=False, allow_nan=True).encode("utf-8"))
+    except (TypeError, ValueError) as e:
+        raise TypeError(f"{type(valor).__name__} sem serialização segura") from e
+
+
+def desserializar(dados):
+    tipo, corpo = dados[:1], memoryview(dados)[1:]
+    if tipo == _ARROW:
+        tabela = pa.ipc.open_stream(pa.py_buffer(corpo)).read_all()
+        return ler_json(tabela.to_pandas(), tabela.schema)
+    if tipo == _BYTES:
+        return bytes(corpo)
+    if tipo == _TUPLA:
+        partes, inicio = [], 0
+        while inicio < len(corpo):
+            (tamanho,) = struct.unpack_from("<Q", corpo, inicio)
+            partes.append(desserializar(bytes(corpo[inicio + 8:inicio + 8 + tamanho])))
+            inicio += 8 + tamanho
+        return tuple(partes)
+    if tipo == _FIGURA:
+        import plotly.io as pio
+        return pio.from_json(_descomprimir(corpo).decode("utf-8"))
+    if tipo == _JSON:
+        return json.loads(_descomprimir(corpo))
+    # ex.: pickle gravado por uma versão anterior — nunca desserializado
+    raise ValueError(f"tipo de valor recusado: {bytes(tipo)!r}")
+
+
+# -----------------------------
+# 🌐 Cache compartilhado entre processos e instâncias
+# -----------------------------
+class CacheCompartilhado:
+    """
+    Valores Python por chave num namespace do backend (serializados com `serializar`).
+    Falhas do backend (ex.: Redis fora) contam como ausência: o cache nunca derruba a página.
+    """
+
+    def __init__(self, namespace, backend, ttl=None):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.erros = 0
+
+    @property
+    def compartilhado(self):
+        return self.backend.compartilhado
+
+    def _chave(self, chave):
+        return f"{self.namespace}:{hashlib.sha256(repr(chave).encode('utf-8')).hexdigest()}"
+
+    def obter(self, chave):
+        """Valor gravado para a chave ou None (ausente, expirado ou ilegível)."""
+        try:
+            dados = self.backend.obter(self._chave(chave))
+            valor = None if dados is None else desserializar(dados)
+        except Exception as e:
+            self._contar("erros")
+            logging.warning(f"⚠️ Cache {self.namespace} ({self.backend.nome}) falhou na leitura: {e}")
+            return None
+        self._contar("misses" if valor is None else "hits")
+        return valor
+
+    def gravar(self, chave, valor):
+        try:
+            dados = serializar(valor)
+        except TypeError as e:
+            logging.warning(f"⚠️ Cache {self.namespace}: valor não compartilhado ({e})")
+            return
+        try:
+            self.backend.gravar(self._chave(chave), dados, ttl=self.ttl)
+        except Exception as e:
+            self._contar("erros")
+            logging.warning(f"⚠️ Cache {self.namespace} ({self.backend.nome}) falhou na gravação: {e}")
+
+    def contem(self, chave):
+        try:
+            return self.backend.obter(self._chave(chave)) is not None
+        except Exception:
+            return False
+
+    def remover_expirados(self):
+        """Limpeza dos backends sem expiração própria (o Redis expira sozinho)."""
+        remover = getattr(self.backend, "remover_expirados", None)
+        return remover() if remover is not None else 0
+
+    def _contar(self, campo):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def metricas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "backend": self.backend.nome,
+                "hits": self.hits,
+                "misses": self.misses,
+                "erros": self.erros,
+                "taxa_acerto": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+# Backend único do processo, usado por todos os namespaces
+BACKEND_CACHE = criar_backend()
+
+
+# -----------------------------
+# 🎨 Cache de figuras Plotly (em memória, LRU)
+# -----------------------------
+class CacheFiguras:
+    """
+    Figuras Plotly prontas, por chave (página, figura, gestor, filtros, versão dos dados).
+
+    Fica na memória do processo e guarda o próprio objeto Figure: um acerto não reconstrói
+    a figura (px.*, update_layout) nem a serializa/desserializa, ao contrário do
+    st.cache_data, que faz pickle do valor a cada leitura. Quem recebe a figura não deve
+    alterá-la (ela é compartilhada entre sessões).
+
+    Eviction LRU por quantidade (max_itens), por idade (ttl, em segundos) e pelo orçamento
+    de memória do processo (memoria.CONTADOR_MEMORIA). Com um `compartilhado`
+    (CacheCompartilhado), a figura ausente na memória é procurada lá antes de ser
+    construída, e toda figura construída é gravada lá: outra instância, ou a mesma depois
+    de reiniciar, não reconstrói.
+    """
+
+    def __init__(self, max_itens=256, ttl=None, compartilhado=None, nome="figuras"):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.compartilhado = compartilhado
+        self.nome = nome
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        CONTADOR_MEMORIA.registrar_cache(nome, self.descartar)
+
+    def _expirado(self, criado_em):
+        return self.ttl is not None and time.time() - criado_em > self.ttl
+
+    def obter(self, chave, construir):
+        """Devolve a figura da chave; na ausência, chama construir() e guarda o resultado."""
+        with self._lock:
+            item = self._itens.get(chave)
+            acerto = item is not None and not self._expirado(item[1])
+            if acerto:
+                self._itens.move_to_end(chave)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if acerto:
+            CONTADOR_MEMORIA.usar(self.nome, chave)
+            return item[0]
+
+        figura = self.compartilhado.obter(chave) if self.compartilhado is not None else None
+        if figura is None:
+            inicio = time.time()
+            figura = construir()
+            logging.info(f"🎨 Figura {chave[:2]} construída em {time.time() - inicio:.3f}s ({self.resumo()})")
+            if self.compartilhado is not None and figura is not None:
+                self.compartilhado.gravar(chave, figura)
+
+        removidas = []
+        with self._lock:
+            self._itens[chave] = (figura, time.time())
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                removidas.append(self._itens.popitem(last=False)[0])
+                self.evictions += 1
+        for removida in removidas:
+            CONTADOR_MEMORIA.esquecer(self.nome, removida)
+        CONTADOR_MEMORIA.guardar(self.nome, chave, figura)
+        return figura
+
+    def em_cache(self, pagina, versao):
+        """
+        Decorador para funções figura(email_hash, *filtros). `versao(email_hash)` devolve a
+        versão atual dos dados do gestor, então dados novos geram uma chave nova.
+        """
+        def decorador(func):
+            @functools.wraps(func)
+            def wrapper(email_hash, *filtros):
+                chave = (pagina, func.__name__, email_hash, filtros, versao(email_hash))
+                return self.obter(chave, lambda: func(email_hash, *filtros))
+            return wrapper
+        return decorador
+
+    def metricas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "itens": len(self._itens),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "taxa_acerto": round(self.hits / total, 3) if total else 0.0,
+            }
+
+    def resumo(self):
+        m = self.metricas()
+        return f"{m['hits']} hits, {m['misses']} misses, {m['evictions']} evictions, {m['itens']} itens"
+
+    def descartar(self, chave):
+        """Tira a figura da memória (o orçamento de memória chama ao passar do limite)."""
+        with self._lock:
+            if self._itens.pop(chave, None) is not None:
+                self.evictions += 1
+
+    def limpar(self):
+        with self._lock:
+            chaves = list(self._itens)
+            self._itens.clear()
+        for chave in chaves:
+            CONTADOR_MEMORIA.esquecer(self.nome, chave)
+
+
+# Instância única do processo, compartilhada por todas as páginas e sessões
+CACHE_FIGURAS = CacheFiguras(
+    max_itens=int(os.getenv("CACHE_FIGURAS_MAX", "256")),
+    ttl=600,
+    compartilhado=CacheCompartilhado("figuras", BACKEND_CACHE, ttl=600) if BACKEND_CACHE.compartilhado else None
+)
+
+
+# -----------------------------
+# 🗄️ Resultados pré-calculados por gestor (precalcular_gestores.py)
+# -----------------------------
+class ArmazemPrecalculado:
+    """
+    DataFrames e agregados por gestor gravados pelo worker precalcular_gestores.py no
+    cache compartilhado e lidos primeiro pelas páginas. A chave inclui a versão dos dados
+    (versao_gestor), então um resultado só é aproveitado enquanto os dados do gestor não
+    mudarem.
+
+    Com backend compartilhado (sqlite, redis) as páginas também gravam o que calculam,
+    e os outros processos e instâncias aproveitam; com o backend em memória só o worker
+    (gravando = True) grava.
+    """
+
+    def __init__(self, ttl=None, backend=None):
+        self.cache = CacheCompartilhado("precalculado", backend or BACKEND_CACHE, ttl=ttl)
+        self.gravando = self.cache.compartilhado
+
+    def obter(self, chave):
+        """Valor gravado para a chave ou None."""
+        return self.cache.obter(chave)
+
+    def gravar(self, chave, valor):
+        self.cache.gravar(chave, valor)
+
+    def contem(self, chave):
+        return self.cache.contem(chave)
+
+    def ler_primeiro(self, nome):
+        """
+        Decorador para funções (email_hash, ..., versao): devolve o resultado pré-calculado
+        para os mesmos argumentos, se houver; senão calcula (e grava, no worker).
+        """
+        def decorador(func):
+            @functools.wraps(func)
+            def wrapper(*args):
+                chave = (nome,) + args
+                valor = self.obter(chave)
+                if valor is None:
+                    valor = func(*args)
+                    if self.gravando and not tem_dados_antigos(valor):
+                        self.gravar(chave, valor)
+                return valor
+            return wrapper
+        return decorador
+
+
+def tem_dados_antigos(valor):
+    """True se o valor (ou um DataFrame da tupla) veio do último resultado válido com o banco fora."""
+    partes = valor if isinstance(valor, tuple) else (valor,)
+    return any(isinstance(p, pd.DataFrame) and "dados_de" in p.attrs for p in partes)
+
+
+ARMAZEM_PRECALCULADO = ArmazemPrecalculado(ttl=int(os.getenv("PRECALCULADO_TTL", "86400")))
@@ -1,101 +1,519 @@
-# config.py
-import os
-import time
-import logging
-from pathlib import Path
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
-
-# -----------------------------
-# 🔹 Configuração de log padrão
-# -----------------------------
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
-
-# -----------------------------
-# 🔹 Carrega .env local (se existir)
-# -----------------------------
-env_path = Path('.') / '.env'
-if env_path.exists():
-    load_dotenv(dotenv_path=env_path)
-    print("🔹 .env carregado para ambiente local")
-
-# -----------------------------
-# 🔹 Busca variáveis de ambiente
-# -----------------------------
-DB_USER = os.getenv("DB_USER")
-DB_PASS = os.getenv("DB_PASS")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_NAME = os.getenv("DB_NAME")
-
-if not all([DB_USER, DB_PASS, DB_HOST, DB_NAME]):
-    raise ValueError("Alguma variável de conexão do banco não está definida!")
-
-# -----------------------------
-# 🔹 Cria engine SQLAlchemy
-# -----------------------------
-#DB_URI = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-
-# Monta a URL no formato correto para Unix Socket
-DB_URI = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@/{DB_NAME}?host={DB_HOST}"
-
-inicio_conexao = time.time()
-engine = create_engine(
-    DB_URI,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
-    pool_recycle=300,
-    pool_pre_ping=True
-)
-logging.info(f"✅ Engine criada com sucesso em {time.time() - inicio_conexao:.3f}s")
-
-# -----------------------------
-# 🕒 Decorador genérico para medir tempo
-# -----------------------------
-def medir_tempo(descricao="Execução"):
-    """
-    Decorador para medir o tempo de qualquer função.
-    """
-    def decorator(func):
-        def wrapper(*args, **kwargs):
-            inicio = time.time()
-            logging.info(f"⏱️ {descricao} iniciada...")
-            resultado = func(*args, **kwargs)
-            duracao = time.time() - inicio
-            logging.info(f"✅ {descricao} concluída em {duracao:.3f}s")
-            return resultado
-        return wrapper
-    return decorator
-
-# -----------------------------
-# 🧠 Função auxiliar para medir tempo de conexão e query
-# -----------------------------
-@medir_tempo("Conexão e execução de query")
-def executar_query(query_text, params=None):
-    """
-    Executa uma query SQL e mede separadamente o tempo de conexão e de execução.
-    Retorna o DataFrame com os resultados.
-    """
-    import pandas as pd
-    from sqlalchemy import text
-
-    # Se o parâmetro vier como TextClause, converte para string
-    if not isinstance(query_text, str):
-        query_text = str(query_text)
-
-    inicio_conn = time.time()
-    with engine.connect() as conn:
-        tempo_conexao = time.time() - inicio_conn
-        logging.info(f"🔌 Tempo para abrir conexão: {tempo_conexao:.3f}s")
-
-        inicio_query = time.time()
-        df = pd.read_sql(text(query_text), conn, params=params)
-        tempo_query = time.time() - inicio_query
-        logging.info(f"📊 Tempo para executar query: {tempo_query:.3f}s")
-
-    return df
-
+# config.py
+import os
+import time
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+from pathlib import Path
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from datasets_mapeados import DATASETS_MAPEADOS
+
+try:
+    # API interna do Streamlit (testada com 1.66, a versão fixada em requirements.txt)
+    from streamlit.runtime.scriptrunner_utils.script_run_context import get_run_yield_check
+except ImportError:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    def get_run_yield_check():
+        """Callback de parada/reexecução da sessão da thread, ou None (as esperas só não são interrompidas)."""
+        ctx = get_script_run_ctx(suppress_warning=True)
+        return getattr(ctx, "yield_check", None)
+
+# -----------------------------
+# 🔹 Configuração de log padrão
+# -----------------------------
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# -----------------------------
+# 🔹 Carrega .env local (se existir)
+# -----------------------------
+env_path = Path('.') / '.env'
+if env_path.exists():
+    load_dotenv(dotenv_path=env_path)
+    print("🔹 .env carregado para ambiente local")
+
+# -----------------------------
+# 🔹 Busca variáveis de ambiente
+# -----------------------------
+DB_USER = os.getenv("DB_USER")
+DB_PASS = os.getenv("DB_PASS")
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT", "5432")
+DB_NAME = os.getenv("DB_NAME")
+
+if not all([DB_USER, DB_PASS, DB_HOST, DB_NAME]):
+    raise ValueError("Alguma variável de conexão do banco não está definida!")
+
+# -----------------------------
+# 🔹 Cria engine SQLAlchemy
+# -----------------------------
+#DB_URI = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Monta a URL no formato correto para Unix Socket
+DB_URI = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@/{DB_NAME}?host={DB_HOST}"
+
+inicio_conexao = time.time()
+engine = create_engine(
+    DB_URI,
+    pool_size=5,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_recycle=300,
+    pool_pre_ping=True
+)
+logging.info(f"✅ Engine criada com sucesso em {time.time() - inicio_conexao:.3f}s")
+
+# -----------------------------
+# 🕒 Decorador genérico para medir tempo
+# -----------------------------
+def medir_tempo(descricao="Execução"):
+    """
+    Decorador para medir o tempo de qualquer função.
+    """
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            inicio = time.time()
+            logging.info(f"⏱️ {descricao} iniciada...")
+            resultado = func(*args, **kwargs)
+            duracao = time.time() - inicio
+            logging.info(f"✅ {descricao} concluída em {duracao:.3f}s")
+            return resultado
+        return wrapper
+    return decorator
+
+# -----------------------------
+# ⏳ Tempo limite por consulta nomeada (statement_timeout, ms)
+# -----------------------------
+TEMPO_LIMITE_PADRAO_MS = int(os.getenv("TEMPO_LIMITE_PADRAO_MS", "30000"))
+TEMPOS_LIMITE_MS = {
+    "mapa_escolas": 60000,            # global, todas as escolas
+    "desempenho_ilhas": 30000,
+    "competencias": 30000,
+    "pedagogico": 30000,
+    "sentimentos": 30000,
+    "resumo_turmas_ilhas": 10000,     # resumos dos cards: precisam ser rápidos
+    "resumo_turmas_competencias": 10000,
+    "desempenho_ilhas_delta": 10000,  # deltas por updated_at (atualizacao_incremental.py)
+    "competencias_delta": 10000,
+    "pedagogico_delta": 10000,
+    "versao_gestor": 2000,            # sondas de versão (versao_dados.py)
+    "versao_global": 5000,
+}
+
+# De quanto em quanto tempo quem espera uma consulta verifica se a sessão reexecutou
+INTERVALO_VERIFICACAO = 0.1
+
+# Sinal de cancelamento da tarefa em segundo plano atual (renderizacao.em_segundo_plano)
+SINAL_CANCELAMENTO = contextvars.ContextVar("sinal_cancelamento", default=None)
+
+
+class ConsultaSuperada(Exception):
+    """A sessão que esperava a consulta reexecutou ou parou antes do resultado."""
+
+
+# -----------------------------
+# 🤝 Single-flight: consultas idênticas simultâneas viram uma só
+# -----------------------------
+class _Execucao:
+    """Uma execução no banco e quem está esperando por ela."""
+
+    def __init__(self, nome, guardar=False):
+        self.nome = nome
+        self.guardar = guardar     # o resultado vira o último resultado válido da consulta
+        self.revalidando = False   # alguma sessão recebeu o resultado antigo no lugar deste
+        self.futuro = Future()
+        self.sessoes = 1           # total de chamadas atendidas por esta execução
+        self.interessados = 1      # chamadas ainda esperando o resultado
+        self.cancelada = False
+        self.conexao = None        # conexão psycopg2 enquanto a query roda (para cancel())
+        self._lock = threading.Lock()
+
+    def registrar_conexao(self, conexao):
+        """Guarda a conexão para cancelar(); False se o cancelamento chegou antes."""
+        with self._lock:
+            if self.cancelada:
+                return False
+            self.conexao = conexao
+            return True
+
+    def liberar_conexao(self):
+        with self._lock:
+            self.conexao = None
+
+    def cancelar(self):
+        """Cancela a query no servidor (ou impede que comece, se ainda espera conexão do pool)."""
+        with self._lock:
+            self.cancelada = True
+            conexao = self.conexao
+        if conexao is not None:
+            conexao.cancel()
+        logging.info(f"🛑 Consulta {self.nome or 'sem nome'} cancelada: nenhuma sessão espera mais o resultado")
+
+
+# (SQL, params) → _Execucao em andamento
+_EM_VOO = {}
+_LOCK_EM_VOO = threading.Lock()
+_METRICAS_EM_VOO = {"execucoes": 0, "economizadas": 0, "antigos_servidos": 0, "canceladas": 0}
+
+# Execuções no banco. Mesmo tamanho do pool de conexões: cada thread ocupa no máximo uma conexão.
+_POOL_CONSULTAS = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CONSULTA_WORKERS", "15")),
+    thread_name_prefix="consulta"
+)
+
+# Gravação do último resultado válido (arquivo mapeado), fora do caminho das sessões e
+# sem ocupar as threads que seguram conexões
+_POOL_GRAVACAO = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gravacao")
+
+
+def _chave_query(query_text, params):
+    # valores de params podem não ser hasheáveis (listas em IN/ANY)
+    return query_text, repr(sorted((params or {}).items()))
+
+
+def metricas_single_flight():
+    """Execuções no banco, chamadas economizadas, resultados antigos servidos, canceladas e consultas em voo."""
+    with _LOCK_EM_VOO:
+        return {**_METRICAS_EM_VOO, "em_voo": len(_EM_VOO)}
+
+
+def _desistir(chave, execucao, cancelar=True):
+    """Uma chamada deixa de esperar; sem mais ninguém esperando, a query é cancelada no servidor."""
+    with _LOCK_EM_VOO:
+        execucao.interessados -= 1
+        if not cancelar or execucao.interessados > 0 or execucao.futuro.done():
+            return
+        if _EM_VOO.get(chave) is execucao:
+            del _EM_VOO[chave]   # novas chamadas idênticas não se juntam a uma execução cancelada
+        _METRICAS_EM_VOO["canceladas"] += 1
+    execucao.cancelar()
+
+
+def _aguardar(chave, execucao, timeout=None):
+    """
+    Espera o resultado verificando a cada INTERVALO_VERIFICACAO se a sessão reexecutou
+    (ou se a tarefa em segundo plano foi cancelada); nesse caso desiste e repassa a exceção.
+    Com `timeout`, passado o prazo deixa de esperar sem cancelar a consulta (a revalidação
+    continua) e levanta FutureTimeoutError.
+    """
+    verificar_sessao = get_run_yield_check()
+    sinal = SINAL_CANCELAMENTO.get()
+    limite = None if timeout is None else time.time() + timeout
+    while True:
+        try:
+            return execucao.futuro.result(timeout=INTERVALO_VERIFICACAO)
+        except FutureTimeoutError:
+            if limite is not None and time.time() >= limite:
+                _desistir(chave, execucao, cancelar=False)
+                raise
+        try:
+            if sinal is not None and sinal.is_set():
+                raise ConsultaSuperada("Tarefa em segundo plano cancelada")
+            if verificar_sessao is not None:
+                verificar_sessao()   # StopException / RerunException quando a sessão reexecuta
+        except BaseException:
+            _desistir(chave, execucao)
+            raise
+
+
+# -----------------------------
+# 🛟 Último resultado válido + disjuntor do banco
+# -----------------------------
+MAX_RESULTADOS_GUARDADOS = int(os.getenv("MAX_RESULTADOS_GUARDADOS", "128"))
+# Com um resultado válido guardado, a sessão espera o banco (fila do pool incluída) no
+# máximo este tempo; passado isso recebe o antigo e a consulta termina em segundo plano
+ESPERA_REVALIDACAO = float(os.getenv("ESPERA_REVALIDACAO", "3"))
+# Por quanto tempo o resultado dessa revalidação é entregue sem ir ao banco de novo
+REVALIDACAO_VALIDA = float(os.getenv("REVALIDACAO_VALIDA", "60"))
+
+# Falhas do banco que abrem o circuito e são respondidas com o último resultado válido:
+# conexão, statement_timeout (OperationalError) e pool de conexões esgotado
+FALHAS_BANCO = (OperationalError, PoolTimeoutError)
+
+# (SQL, params) → (chave em DATASETS_MAPEADOS, datetime da consulta, veio de revalidação),
+# do menos para o mais recente. Só as consultas nomeadas em TEMPOS_LIMITE_MS; o DataFrame
+# fica no arquivo mapeado (compartilhado pelos processos do host) e só volta à memória
+# quando é servido.
+_ULTIMOS_RESULTADOS = OrderedDict()
+
+
+class CircuitoAberto(OperationalError):
+    """Banco considerado indisponível pelo disjuntor e sem resultado antigo para servir."""
+
+    def __init__(self, mensagem):
+        super().__init__(mensagem, None, None)
+
+
+class DisjuntorBanco:
+    """
+    Abre depois de `limite` falhas seguidas (FALHAS_BANCO): durante `espera` segundos as
+    consultas nem tentam o banco (sem esperar pool_timeout). Passada a espera, o circuito
+    fica meio-aberto: uma única consulta testa o banco (permitir() devolve True só para
+    ela) e as outras continuam como se estivesse aberto; sucesso fecha o circuito, falha
+    o abre de novo.
+    """
+
+    def __init__(self, limite=3, espera=30):
+        self.limite = limite
+        self.espera = espera
+        self.falhas = 0
+        self.aberto_ate = 0.0
+        self.sondando = False
+        self._lock = threading.Lock()
+
+    def aberto(self):
+        with self._lock:
+            return self.falhas >= self.limite and (time.time() < self.aberto_ate or self.sondando)
+
+    def permitir(self):
+        """True se a consulta pode ir ao banco: circuito fechado ou a sonda do meio-aberto."""
+        with self._lock:
+            if self.falhas < self.limite:
+                return True
+            if time.time() < self.aberto_ate or self.sondando:
+                return False
+            self.sondando = True
+        logging.info("🟡 Circuito meio-aberto: uma consulta testa o banco")
+        return True
+
+    def encerrar_sonda(self):
+        """A consulta terminou sem dizer nada do banco (ex.: cancelada): libera outra sonda."""
+        with self._lock:
+            self.sondando = False
+
+    def registrar_sucesso(self):
+        with self._lock:
+            if self.falhas >= self.limite:
+                logging.info("🟢 Banco respondeu: circuito fechado")
+            self.falhas = 0
+            self.sondando = False
+
+    def registrar_falha(self):
+        with self._lock:
+            self.sondando = False
+            self.falhas += 1
+            if self.falhas >= self.limite:
+                self.aberto_ate = time.time() + self.espera
+                logging.warning(f"🔴 {self.falhas} falhas seguidas no banco: circuito aberto por {self.espera}s")
+
+
+DISJUNTOR_BANCO = DisjuntorBanco(
+    limite=int(os.getenv("DISJUNTOR_FALHAS", "3")),
+    espera=int(os.getenv("DISJUNTOR_ESPERA", "30"))
+)
+
+
+def _guardar_resultado(chave, df, momento, revalidacao):
+    """
+    Guarda o último resultado válido da consulta (no _POOL_GRAVACAO): publica o DataFrame
+    em DATASETS_MAPEADOS e troca a referência em _ULTIMOS_RESULTADOS (o arquivo anterior
+    é removido).
+    """
+    chave_dataset = ("ultimo_resultado", *chave, momento.isoformat())
+    try:
+        if DATASETS_MAPEADOS.publicar(chave_dataset, df) is df:
+            return   # fora do Arrow: sem último resultado para esta consulta
+    except Exception as e:
+        logging.warning(f"⚠️ Último resultado válido não guardado: {e}")
+        return
+    removidas = []
+    with _LOCK_EM_VOO:
+        anterior = _ULTIMOS_RESULTADOS.get(chave)
+        if anterior is not None:
+            removidas.append(anterior[0])
+        _ULTIMOS_RESULTADOS[chave] = (chave_dataset, momento, revalidacao)
+        _ULTIMOS_RESULTADOS.move_to_end(chave)
+        while len(_ULTIMOS_RESULTADOS) > MAX_RESULTADOS_GUARDADOS:
+            removidas.append(_ULTIMOS_RESULTADOS.popitem(last=False)[1][0])
+    for removida in removidas:
+        DATASETS_MAPEADOS.remover(removida)
+
+
+def _ultimo_resultado(chave):
+    """(DataFrame, datetime) do último resultado válido da consulta, ou None."""
+    with _LOCK_EM_VOO:
+        guardado = _ULTIMOS_RESULTADOS.get(chave)
+    if guardado is None:
+        return None
+    df = DATASETS_MAPEADOS.abrir(guardado[0])
+    return None if df is None else (df, guardado[1])
+
+
+def _revalidado(chave):
+    """
+    Cópia do resultado de uma revalidação que terminou depois de alguma sessão receber o
+    antigo, com menos de REVALIDACAO_VALIDA segundos: quem repete a consulta recebe os
+    dados novos sem ir ao banco de novo. None se não houver.
+    """
+    with _LOCK_EM_VOO:
+        guardado = _ULTIMOS_RESULTADOS.get(chave)
+    if guardado is None or not guardado[2]:
+        return None
+    if (datetime.now() - guardado[1]).total_seconds() > REVALIDACAO_VALIDA:
+        return None
+    df = DATASETS_MAPEADOS.abrir(guardado[0])
+    return None if df is None else df.copy()
+
+
+def _servir_antigo(antigo, motivo):
+    """Cópia do último resultado válido, marcada em df.attrs["dados_de"] para o selo na página."""
+    df, momento = antigo
+    with _LOCK_EM_VOO:
+        _METRICAS_EM_VOO["antigos_servidos"] += 1
+    logging.warning(f"🛟 {motivo}: servindo resultado de {momento:%H:%M:%S}")
+    df = df.copy()
+    df.attrs["dados_de"] = momento
+    return df
+
+
+# -----------------------------
+# 🧠 Função auxiliar para medir tempo de conexão e query
+# -----------------------------
+@medir_tempo("Conexão e execução de query")
+def executar_query(query_text, params=None, nome=None, ultimo_valido=True):
+    """
+    Executa uma query SQL e mede separadamente o tempo de conexão e de execução.
+    Retorna o DataFrame com os resultados.
+
+    `nome` identifica a consulta para o statement_timeout (TEMPOS_LIMITE_MS; sem nome,
+    TEMPO_LIMITE_PADRAO_MS). Se a sessão reexecutar (ou parar) enquanto espera, a chamada
+    desiste e, sem outra sessão esperando o mesmo resultado, a query é cancelada no
+    servidor, liberando a conexão do pool.
+
+    Chamadas simultâneas com o mesmo (SQL, params) — várias sessões abrindo o mesmo
+    painel ao mesmo tempo — aguardam uma única execução e recebem cópias do resultado.
+
+    Consultas nomeadas em TEMPOS_LIMITE_MS guardam o último resultado válido, a não ser
+    com `ultimo_valido=False` (ex.: deltas, cujo resultado só vale para a marca d'água
+    em que foram pedidos). Com um resultado guardado:
+    - a sessão espera o banco no máximo ESPERA_REVALIDACAO segundos; passado isso recebe
+      o resultado antigo e a consulta termina em segundo plano. Quem repetir a consulta
+      em até REVALIDACAO_VALIDA segundos recebe o resultado dessa revalidação;
+    - com o circuito aberto, a consulta falhando (conexão, statement_timeout) ou o pool
+      de conexões esgotado, a sessão recebe o resultado antigo.
+    O resultado antigo vem com df.attrs["dados_de"] (hora da consulta), para o selo na página.
+    """
+    # Se o parâmetro vier como TextClause, converte para string
+    if not isinstance(query_text, str):
+        query_text = str(query_text)
+
+    chave = _chave_query(query_text, params)
+    guardar = ultimo_valido and nome in TEMPOS_LIMITE_MS
+
+    if guardar:
+        revalidado = _revalidado(chave)
+        if revalidado is not None:
+            return revalidado
+
+    if not DISJUNTOR_BANCO.permitir():
+        antigo = _ultimo_resultado(chave) if guardar else None
+        if antigo is not None:
+            return _servir_antigo(antigo, "Circuito do banco aberto")
+        raise CircuitoAberto("Banco indisponível (circuito aberto)")
+
+    with _LOCK_EM_VOO:
+        execucao = _EM_VOO.get(chave)
+        if execucao is None:
+            execucao = _EM_VOO[chave] = _Execucao(nome, guardar)
+            _METRICAS_EM_VOO["execucoes"] += 1
+            _POOL_CONSULTAS.submit(_executar_em_voo, chave, execucao, query_text, params)
+        else:
+            execucao.sessoes += 1
+            execucao.interessados += 1
+            _METRICAS_EM_VOO["economizadas"] += 1
+            logging.info("🤝 Consulta idêntica já em execução: aguardando o resultado compartilhado")
+        tem_antigo = guardar and chave in _ULTIMOS_RESULTADOS
+
+    try:
+        try:
+            df = _aguardar(chave, execucao, ESPERA_REVALIDACAO if tem_antigo else None)
+        except FutureTimeoutError:
+            execucao.revalidando = True
+            antigo = _ultimo_resultado(chave)
+            if antigo is not None:
+                return _servir_antigo(antigo, f"Banco sem resposta em {ESPERA_REVALIDACAO:g}s, revalidando")
+            # o arquivo do resultado antigo foi removido nesse meio-tempo: volta a esperar
+            with _LOCK_EM_VOO:
+                execucao.interessados += 1
+            df = _aguardar(chave, execucao)
+    except FALHAS_BANCO:
+        antigo = _ultimo_resultado(chave) if guardar else None
+        if antigo is None:
+            raise
+        return _servir_antigo(antigo, "Falha ou tempo limite esgotado no banco")
+
+    # cópia: cada sessão pode acrescentar colunas ao próprio DataFrame
+    return df.copy()
+
+
+def _executar_em_voo(chave, execucao, query_text, params):
+    """Executa a consulta no pool e entrega o resultado (ou o erro) a todos que aguardam."""
+    try:
+        df = _executar_no_banco(query_text, params, execucao)
+    except BaseException as e:
+        # cancelamento pedido por nós não indica problema no banco (statement_timeout indica)
+        if isinstance(e, FALHAS_BANCO) and not execucao.cancelada:
+            DISJUNTOR_BANCO.registrar_falha()
+        else:
+            DISJUNTOR_BANCO.encerrar_sonda()
+        with _LOCK_EM_VOO:
+            if _EM_VOO.get(chave) is execucao:
+                del _EM_VOO[chave]
+        execucao.futuro.set_exception(e)
+        return
+
+    DISJUNTOR_BANCO.registrar_sucesso()
+    # depois de sair de _EM_VOO ninguém mais se junta; o contador de sessões é final
+    with _LOCK_EM_VOO:
+        if _EM_VOO.get(chave) is execucao:
+            del _EM_VOO[chave]
+        compartilhado = execucao.sessoes - 1
+    execucao.futuro.set_result(df)
+    if execucao.guardar:
+        # depois de entregar e em outra thread: nem quem espera nem a conexão pagam a gravação
+        _POOL_GRAVACAO.submit(_guardar_resultado, chave, df, datetime.now(), execucao.revalidando)
+    if compartilhado:
+        m = metricas_single_flight()
+        logging.info(
+            f"🤝 Resultado compartilhado com {compartilhado} sessões "
+            f"({m['economizadas']} chamadas ao banco economizadas em {m['execucoes']} execuções)"
+        )
+
+
+def _executar_no_banco(query_text, params, execucao):
+    import pandas as pd
+
+    tempo_limite = TEMPOS_LIMITE_MS.get(execucao.nome, TEMPO_LIMITE_PADRAO_MS)
+
+    inicio_conn = time.time()
+    with engine.connect() as conn:
+        tempo_conexao = time.time() - inicio_conn
+        logging.info(f"🔌 Tempo para abrir conexão: {tempo_conexao:.3f}s")
+        # a conexão fica registrada antes do primeiro comando: um cancelamento daqui em
+        # diante chega ao servidor; um anterior impede a consulta de começar
+        if not execucao.registrar_conexao(conn.connection.driver_connection):
+            raise ConsultaSuperada("Consulta cancelada antes de começar")
+        inicio_query = time.time()
+        try:
+            # vale só para esta transação; a conexão volta ao pool sem o limite
+            conn.execute(text("SELECT set_config('statement_timeout', :ms, true)"), {"ms": str(tempo_limite)})
+            # cancel() entre dois comandos não tem query para interromper
+            if execucao.cancelada:
+                raise ConsultaSuperada("Consulta cancelada antes de começar")
+            df = pd.read_sql(text(query_text), conn, params=params)
+        finally:
+            execucao.liberar_conexao()
+        tempo_query = time.time() - inicio_query
+        logging.info(f"📊 Tempo para executar query: {tempo_query:.3f}s")
+
+    return df
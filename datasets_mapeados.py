@@ -0,0 +1,404 @@
+# datasets_mapeados.py
+"""
+Datasets compartilhados pelos processos do mesmo host em arquivos Arrow IPC mapeados em
+memória (mmap).
+
+O primeiro processo que carrega um dataset grava o arquivo uma única vez e todos os
+processos o abrem com pa.memory_map. As páginas ficam no page cache do kernel, uma vez
+por host, então a memória cresce com o número de datasets distintos e não com
+processos × sessões.
+
+Com DATASETS_COMPRESSAO (zstd, padrão, ou lz4) o arquivo guarda o dataset em forma
+colunar comprimida: textos repetitivos (turma, escola, classificação...) codificados em
+dicionário e cada buffer Arrow comprimido. Cada coluna só é descomprimida no primeiro
+acesso (QuadroComprimido), e as colunas descomprimidas contam no orçamento de memória do
+processo (memoria.py), que as descarta quando falta espaço — o arquivo comprimido
+continua e a próxima leitura descomprime de novo. Os datasets por gestor ocupam várias
+vezes menos memória, e cabem mais gestores no mesmo container.
+
+Com DATASETS_COMPRESSAO=nenhuma o arquivo vai sem compressão e o DataFrame devolvido é
+uma visão sobre as páginas do arquivo: colunas numéricas, datas e textos
+(ArrowStringArray) não são copiadas para a memória do processo. Vale a pena com muitos
+processos por host e memória de sobra para o page cache.
+
+Colunas de listas/dicionários (JSONB, ex.: feelings_results) vão no arquivo como texto
+JSON e voltam como os mesmos objetos na leitura.
+
+Cada chamada recebe uma cópia rasa (df.copy(deep=False)). Com Copy-on-Write (padrão do
+pandas 3; ligado na importação deste módulo com pandas 2.x), uma sessão pode acrescentar
+ou alterar colunas sem afetar as outras nem escrever no arquivo, que é somente leitura.
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from cache_compartilhado import CACHE_DIR, ler_json, tabela_arrow, tem_dados_antigos
+from memoria import CONTADOR_MEMORIA
+
+# No Cloud Run /tmp já é memória; em outro host, /dev/shm evita escrita em disco
+DATASETS_DIR = os.getenv("DATASETS_DIR", os.path.join(CACHE_DIR, "datasets"))
+# Arquivos não abertos há mais que isso são apagados (versões antigas dos dados)
+DATASETS_TTL = int(os.getenv("DATASETS_TTL", "21600"))
+# Datasets abertos por processo (só referências ao mmap; as páginas são do host)
+MAX_ABERTOS = int(os.getenv("DATASETS_MAX_ABERTOS", "256"))
+# zstd (menor) ou lz4 (descomprime mais rápido); "nenhuma" mapeia sem cópia
+COMPRESSAO = os.getenv("DATASETS_COMPRESSAO", "zstd").lower()
+# Colunas de texto com até esta fração de valores distintos vão em dicionário
+FRACAO_DICIONARIO = float(os.getenv("DATASETS_FRACAO_DICIONARIO", "0.5"))
+
+# As cópias rasas só isolam as sessões com Copy-on-Write (sempre ligado a partir do pandas 3)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.options.mode.copy_on_write = True
+
+# Metadados do schema com as colunas que a gravação codificou em dicionário
+_META_DICIONARIO = b"colunas_dicionario"
+
+
+# -----------------------------
+# 🗜️ Forma colunar comprimida
+# -----------------------------
+def tabela_comprimivel(df, fracao_dicionario=FRACAO_DICIONARIO):
+    """
+    Tabela Arrow do DataFrame com as colunas de texto repetitivas em dicionário (índices
+    inteiros + valores distintos uma vez). A leitura decodifica de volta ao tipo original.
+    """
+    tabela = tabela_arrow(df)
+    metadados = dict(tabela.schema.metadata or {})
+    codificadas = []
+    for i, campo in enumerate(tabela.schema):
+        if not (pa.types.is_string(campo.type) or pa.types.is_large_string(campo.type)):
+            continue
+        coluna = tabela.column(i)
+        if len(coluna) and pc.count_distinct(coluna).as_py() <= fracao_dicionario * len(coluna):
+            tabela = tabela.set_column(i, campo.name, coluna.dictionary_encode())
+            codificadas.append(campo.name)
+    metadados[_META_DICIONARIO] = json.dumps(codificadas).encode("utf-8")
+    return tabela.replace_schema_metadata(metadados)
+
+
+class QuadroComprimido:
+    """
+    DataFrame guardado como Arrow IPC comprimido (`fonte`: pa.memory_map ou
+    pa.BufferReader). Cada coluna é descomprimida (e decodificada do dicionário) só no
+    primeiro acesso, com IpcReadOptions(included_fields), e fica em memória até liberar().
+    """
+
+    def __init__(self, fonte):
+        self._fonte = fonte
+        self.schema = pa.ipc.open_file(fonte).schema
+        self._dicionario = set(json.loads((self.schema.metadata or {}).get(_META_DICIONARIO, b"[]")))
+        # índice que não é RangeIndex vira coluna no Arrow e vem junto em toda leitura
+        self._indices = [c for c in (self.schema.pandas_metadata or {}).get("index_columns", []) if isinstance(c, str)]
+        self._colunas = {}   # nome → pa.ChunkedArray descomprimido
+        self._quadros = {}   # colunas pedidas → DataFrame sobre as colunas descomprimidas
+        self._lock = threading.Lock()
+        self.descompressoes = 0
+
+    @property
+    def nbytes(self):
+        """Bytes comprimidos (o arquivo mapeado)."""
+        return self._fonte.size()
+
+    @property
+    def nbytes_descomprimidos(self):
+        with self._lock:
+            return sum(coluna.nbytes for coluna in self._colunas.values())
+
+    @property
+    def columns(self):
+        return [nome for nome in self.schema.names if nome not in self._indices]
+
+    def _descomprimir(self, nomes):
+        with self._lock:
+            prontas = {nome: self._colunas[nome] for nome in nomes if nome in self._colunas}
+        faltam = [nome for nome in nomes if nome not in prontas]
+        if not faltam:
+            return prontas
+        desconhecidas = set(faltam) - set(self.schema.names)
+        if desconhecidas:
+            raise KeyError(f"{sorted(desconhecidas)} not in index")
+
+        posicoes = [self.schema.get_field_index(nome) for nome in faltam]
+        leitor = pa.ipc.open_file(self._fonte, options=pa.ipc.IpcReadOptions(included_fields=posicoes))
+        tabela = leitor.read_all()
+        novas = {}
+        for nome, coluna in zip(tabela.schema.names, tabela.columns):
+            if nome in self._dicionario:
+                coluna = pa.chunked_array(
+                    [pedaco.dictionary_decode() for pedaco in coluna.chunks], type=coluna.type.value_type
+                )
+            novas[nome] = coluna
+        with self._lock:
+            self._colunas.update(novas)
+            self.descompressoes += 1
+        return {**prontas, **novas}
+
+    def para_pandas(self, colunas=None):
+        """
+        DataFrame com `colunas` (todas, por padrão), descomprimindo só as que faltam.
+
+        Devolve uma cópia rasa do DataFrame guardado para essas colunas: as colunas apontam
+        para os buffers do Arrow (somente leitura) e, com o original vivo aqui, o
+        Copy-on-Write copia a coluna antes de quem altera a cópia escrever nela.
+        """
+        nomes = self.columns if colunas is None else list(colunas)
+        with self._lock:
+            df = self._quadros.get(tuple(nomes))
+        if df is None:
+            arrays = self._descomprimir(nomes + self._indices)
+            tabela = pa.table({nome: arrays[nome] for nome in nomes + self._indices})
+            # os metadados do pandas (índice, tipos) valem também para um subconjunto das colunas
+            df = ler_json(tabela.replace_schema_metadata(self.schema.metadata).to_pandas(split_blocks=True), self.schema)
+            with self._lock:
+                df = self._quadros.setdefault(tuple(nomes), df)
+        return df.copy(deep=False)
+
+    def liberar(self):
+        """Descarta as colunas descomprimidas; o arquivo comprimido continua."""
+        with self._lock:
+            self._colunas.clear()
+            self._quadros.clear()
+
+
+# -----------------------------
+# 🗺️ Datasets por chave
+# -----------------------------
+class DatasetsMapeados:
+    """
+    DataFrames por chave em arquivos Arrow IPC mapeados. Valores que não cabem em Arrow
+    (colunas de objetos mistos) ficam só neste processo: guardados entre os abertos, no
+    heap e sob o orçamento de memória, até o descarte. Os vindos do último resultado
+    válido com o banco fora (df.attrs["dados_de"]) não são publicados: voltam como estão,
+    sem cache.
+    """
+
+    def __init__(self, diretorio=DATASETS_DIR, ttl=DATASETS_TTL, max_abertos=MAX_ABERTOS, compressao=COMPRESSAO):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_abertos = max_abertos
+        self.compressao = None if compressao in ("", "nenhuma", "none") else compressao
+        self._abertos = OrderedDict()   # chave → DataFrame sobre o mmap ou QuadroComprimido
+        self._lock = threading.Lock()
+        self._travas = {}               # chave → Lock de quem está calculando
+        self._ultima_limpeza = 0.0
+        self.publicados = 0
+        self.mapeados = 0
+        CONTADOR_MEMORIA.registrar_cache("mapeados", self.descartar)
+        CONTADOR_MEMORIA.registrar_cache("colunas", self.liberar_colunas)
+
+    def _caminho(self, chave):
+        # a compressão entra no nome: processos com configurações diferentes não se misturam
+        nome = repr((chave, self.compressao))
+        return self.diretorio / (hashlib.sha256(nome.encode("utf-8")).hexdigest() + ".arrow")
+
+    def _mapear(self, chave):
+        caminho = self._caminho(chave)
+        try:
+            fonte = pa.memory_map(str(caminho))
+            os.utime(caminho)   # marca de uso para a limpeza
+        except FileNotFoundError:
+            return None
+        if self.compressao:
+            entrada = QuadroComprimido(fonte)
+        else:
+            # split_blocks: uma coluna por bloco, sem consolidar (consolidar copiaria)
+            tabela = pa.ipc.open_file(fonte).read_all()
+            entrada = ler_json(tabela.to_pandas(split_blocks=True), tabela.schema)
+        with self._lock:
+            self.mapeados += 1
+        self._guardar_aberto(chave, entrada, mapeado=True)
+        return entrada
+
+    def _guardar_aberto(self, chave, entrada, mapeado):
+        """Registra a entrada entre os abertos (LRU de max_abertos) e no orçamento de memória."""
+        fechados = []
+        with self._lock:
+            self._abertos[chave] = entrada
+            self._abertos.move_to_end(chave)
+            while len(self._abertos) > self.max_abertos:
+                fechados.append(self._abertos.popitem(last=False)[0])
+        for fechado in fechados:
+            CONTADOR_MEMORIA.esquecer("mapeados", fechado)
+            CONTADOR_MEMORIA.esquecer("colunas", fechado)
+        CONTADOR_MEMORIA.guardar("mapeados", chave, entrada, mapeado=mapeado)
+
+    def abrir(self, chave, colunas=None):
+        """
+        DataFrame da chave (aberto ou guardado neste processo, ou publicado por outro) ou None. Com
+        `colunas`, só essas (no formato comprimido, só elas são descomprimidas).
+        """
+        with self._lock:
+            entrada = self._abertos.get(chave)
+            if entrada is not None:
+                self._abertos.move_to_end(chave)
+        if entrada is not None:
+            CONTADOR_MEMORIA.usar("mapeados", chave)
+        else:
+            entrada = self._mapear(chave)
+            if entrada is None:
+                return None
+
+        if not isinstance(entrada, QuadroComprimido):
+            return entrada if colunas is None else entrada[list(colunas)]
+        antes = entrada.descompressoes
+        df = entrada.para_pandas(colunas)
+        if entrada.descompressoes != antes:
+            # colunas descomprimidas ficam no heap do processo, sob o orçamento de memória
+            CONTADOR_MEMORIA.guardar("colunas", chave, None, tamanho=entrada.nbytes_descomprimidos)
+        else:
+            CONTADOR_MEMORIA.usar("colunas", chave)
+        return df
+
+    def publicado(self, chave):
+        """True se a chave está aberta ou guardada aqui, ou tem arquivo publicado por outro processo."""
+        with self._lock:
+            if chave in self._abertos:
+                return True
+        return self._caminho(chave).exists()
+
+    def publicar(self, chave, df):
+        """
+        Grava o DataFrame para a chave (se ninguém gravou ainda) e devolve o DataFrame lido
+        do arquivo. Fora do Arrow, guarda o próprio df só neste processo e o devolve.
+        """
+        if tem_dados_antigos(df):
+            return df
+        mapeado = self.abrir(chave)
+        if mapeado is not None:
+            return mapeado
+
+        caminho = self._caminho(chave)
+        fd, temporario = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        os.close(fd)
+        try:
+            if self.compressao:
+                tabela = tabela_comprimivel(df)
+            else:
+                tabela = tabela_arrow(df)
+            opcoes = pa.ipc.IpcWriteOptions(compression=self.compressao)
+            with pa.OSFile(temporario, "wb") as arquivo, pa.ipc.new_file(arquivo, tabela.schema, options=opcoes) as escritor:
+                escritor.write_table(tabela)
+            tamanho = os.path.getsize(temporario)
+            # os.replace atômico: quem abrir antes vê o arquivo inteiro ou nenhum
+            os.replace(temporario, caminho)
+        except (pa.ArrowException, TypeError, ValueError) as e:
+            Path(temporario).unlink(missing_ok=True)
+            logging.warning(f"⚠️ Dataset {chave[:1]} fora do Arrow ({e}); mantido só neste processo")
+            # cópia rasa: com Copy-on-Write, o que o chamador alterar no df não chega às sessões
+            self._guardar_aberto(chave, df.copy(deep=False), mapeado=False)
+            return df
+        except Exception:
+            Path(temporario).unlink(missing_ok=True)
+            raise
+
+        with self._lock:
+            self.publicados += 1
+        logging.info(
+            f"🗺️ Dataset {chave[:1]} publicado para os processos do host "
+            f"({len(df)} linhas, {tamanho / 2**20:.2f} MB, compressão {self.compressao or 'nenhuma'})"
+        )
+        self._limpar()
+        return self.abrir(chave)
+
+    def liberar_colunas(self, chave):
+        """Descarta as colunas descomprimidas da chave (o orçamento de memória chama)."""
+        with self._lock:
+            entrada = self._abertos.get(chave)
+        if isinstance(entrada, QuadroComprimido):
+            entrada.liberar()
+
+    def descartar(self, chave):
+        """Fecha o dataset neste processo; o arquivo continua para os outros."""
+        with self._lock:
+            self._abertos.pop(chave, None)
+        CONTADOR_MEMORIA.esquecer("colunas", chave)
+
+    def remover(self, chave):
+        self.descartar(chave)
+        CONTADOR_MEMORIA.esquecer("mapeados", chave)
+        self._caminho(chave).unlink(missing_ok=True)
+
+    def _limpar(self):
+        """Apaga arquivos sem uso há mais de ttl (no máximo uma vez por minuto)."""
+        agora = time.time()
+        with self._lock:
+            if agora - self._ultima_limpeza < 60:
+                return
+            self._ultima_limpeza = agora
+        removidos = 0
+        for caminho in self.diretorio.glob("*.arrow"):
+            try:
+                if caminho.stat().st_mtime < agora - self.ttl:
+                    # quem já mapeou continua lendo: o arquivo só some quando o último mmap fecha
+                    caminho.unlink()
+                    removidos += 1
+            except FileNotFoundError:
+                continue
+        if removidos:
+            logging.info(f"🧹 {removidos} datasets mapeados sem uso removidos")
+
+    def em_cache(self, nome, partes=None):
+        """
+        Decorador para funções (*args) → DataFrame (ou tupla de `partes` DataFrames): o
+        resultado é publicado em `(nome, *args)` e cada chamada recebe cópias rasas do
+        DataFrame lido do arquivo. `funcao(*args, colunas=[...])` devolve só essas colunas
+        (sem `partes`). `funcao.clear(*args)` descarta a entrada, como no st.cache_data.
+        """
+        def decorador(func):
+            def chaves(args):
+                base = (nome,) + args
+                return [base] if partes is None else [base + (i,) for i in range(partes)]
+
+            def calcular(args, colunas):
+                # uma sessão calcula; as outras do processo esperam e abrem o resultado
+                with self._lock:
+                    trava = self._travas.setdefault(chaves(args)[0], threading.Lock())
+                with trava:
+                    valores = [self.abrir(chave, colunas) for chave in chaves(args)]
+                    if any(v is None for v in valores):
+                        resultado = func(*args)
+                        partes_resultado = [resultado] if partes is None else list(resultado)
+                        valores = []
+                        for chave, df in zip(chaves(args), partes_resultado):
+                            df = self.publicar(chave, df)
+                            valores.append(df if colunas is None else df[list(colunas)])
+                with self._lock:
+                    if self._travas.get(chaves(args)[0]) is trava:
+                        del self._travas[chaves(args)[0]]
+                return valores
+
+            @functools.wraps(func)
+            def wrapper(*args, colunas=None):
+                valores = [self.abrir(chave, colunas) for chave in chaves(args)]
+                if any(v is None for v in valores):
+                    valores = calcular(args, colunas)
+                copias = [df.copy(deep=False) for df in valores]
+                return copias[0] if partes is None else tuple(copias)
+
+            def clear(*args):
+                for chave in chaves(args):
+                    self.remover(chave)
+
+            wrapper.clear = clear
+            return wrapper
+        return decorador
+
+    def metricas(self):
+        with self._lock:
+            return {"abertos": len(self._abertos), "publicados": self.publicados, "mapeados": self.mapeados}
+
+
+# Instância única do processo
+DATASETS_MAPEADOS = DatasetsMapeados()
@@ -0,0 +1,149 @@
+# geocodificacao.py
+"""
+Geocodificação offline (sem rede) de escolas sem latitude/longitude, a partir do CEP.
+
+Usa a tabela local assets/cep_faixas.csv: faixas de CEP com o centróide aproximado da
+localidade, em dois níveis — município (capitais e grandes cidades) e estado. Cada CEP
+é resolvido pelo nível mais específico que o contém; a busca é vetorizada
+(np.searchsorted sobre as faixas ordenadas), então a lista inteira sai em uma passada.
+
+As coordenadas resolvidas ficam persistidas por (escola, CEP) no backend do cache
+compartilhado (CACHE_BACKEND): uma escola já geocodificada não é processada de novo por
+outro processo do host (sqlite) ou por outra instância (redis). Com o backend fora, a
+geocodificação só é refeita — a tabela de faixas é local.
+"""
+import io
+import logging
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cache_compartilhado import BACKEND_CACHE, CacheCompartilhado
+
+TABELA_CEP = Path(__file__).resolve().parent / "assets" / "cep_faixas.csv"
+
+# Do mais específico para o mais genérico
+NIVEIS = ["municipio", "estado"]
+
+CACHE_GEOCODIFICACAO = CacheCompartilhado("geocodificacao", BACKEND_CACHE)
+CHAVE_PERSISTIDA = "escolas"
+
+
+@lru_cache(maxsize=1)
+def carregar_faixas_cep():
+    """{nivel: (inicios, fins, latitudes, longitudes)} com as faixas ordenadas pelo início."""
+    tabela = pd.read_csv(TABELA_CEP, dtype={"cep_inicio": "int64", "cep_fim": "int64"})
+    faixas = {}
+    for nivel in NIVEIS:
+        t = tabela[tabela["nivel"] == nivel].sort_values("cep_inicio")
+        faixas[nivel] = (
+            t["cep_inicio"].to_numpy(), t["cep_fim"].to_numpy(),
+            t["latitude"].to_numpy(dtype=float), t["longitude"].to_numpy(dtype=float)
+        )
+    return faixas
+
+
+def normalizar_cep(ceps):
+    """CEP como inteiro de 8 dígitos ("01310-100", "1310100", 1310100.0 → 1310100); inválido vira <NA>."""
+    digitos = (
+        pd.Series(ceps).astype("string")
+        .str.replace(r"\.0$", "", regex=True)
+        .str.replace(r"\D", "", regex=True)
+    )
+    # CEP gravado como número perde o zero à esquerda (SP começa com 0)
+    digitos = digitos.where(digitos.str.len().isin([7, 8]))
+    return pd.to_numeric(digitos, errors="coerce").astype("Int64")
+
+
+def geocodificar_ceps(ceps):
+    """
+    Centróide aproximado de cada CEP. Retorna DataFrame (mesmo índice) com latitude,
+    longitude e precisao ("municipio", "estado" ou <NA> quando o CEP não foi resolvido).
+    """
+    numeros = normalizar_cep(ceps)
+    valores = numeros.fillna(-1).to_numpy(dtype=np.int64)
+
+    lat = np.full(len(valores), np.nan)
+    lon = np.full(len(valores), np.nan)
+    precisao = np.full(len(valores), None, dtype=object)
+    pendente = valores >= 0
+
+    for nivel, (inicios, fins, lats, lons) in carregar_faixas_cep().items():
+        if not pendente.any() or not len(inicios):
+            break
+        pos = np.searchsorted(inicios, valores, side="right") - 1
+        valida = np.clip(pos, 0, None)
+        achou = pendente & (pos >= 0) & (valores <= fins[valida])
+        lat[achou] = lats[valida[achou]]
+        lon[achou] = lons[valida[achou]]
+        precisao[achou] = nivel
+        pendente &= ~achou
+
+    return pd.DataFrame(
+        {"latitude": lat, "longitude": lon, "precisao": pd.array(precisao, dtype="string")},
+        index=pd.Series(ceps).index
+    )
+
+
+# -----------------------------
+# 💾 Resultados persistidos (escola, CEP) → coordenadas
+# -----------------------------
+def _ler_persistidos():
+    conteudo = CACHE_GEOCODIFICACAO.obter(CHAVE_PERSISTIDA)
+    if conteudo is None:
+        return pd.DataFrame(columns=["school_id", "cep", "latitude", "longitude", "precisao"])
+    return pd.read_csv(io.BytesIO(conteudo), dtype={"school_id": "string", "cep": "Int64", "precisao": "string"})
+
+
+def _gravar_persistidos(df):
+    CACHE_GEOCODIFICACAO.gravar(CHAVE_PERSISTIDA, df.to_csv(index=False).encode("utf-8"))
+
+
+def preencher_coordenadas(df, col_id="school_id", col_cep="zip_code"):
+    """
+    Preenche latitude/longitude ausentes (ou não numéricas) pelo CEP e adiciona a coluna
+    booleana `coord_aproximada`. Linhas cujo CEP não é resolvido continuam sem coordenadas.
+    """
+    df = df.copy()
+    df["latitude"] = pd.to_numeric(df["latitude"], errors="coerce")
+    df["longitude"] = pd.to_numeric(df["longitude"], errors="coerce")
+    df["coord_aproximada"] = False
+
+    faltantes = df["latitude"].isna() | df["longitude"].isna()
+    if not faltantes.any():
+        return df
+
+    # uma consulta por (escola, CEP), não por linha da query (escola x status)
+    alvo = pd.DataFrame({
+        "school_id": df.loc[faltantes, col_id].astype("string"),
+        "cep": normalizar_cep(df.loc[faltantes, col_cep]),
+    })
+    chaves = alvo.drop_duplicates()
+
+    persistidos = _ler_persistidos()
+    chaves = chaves.merge(persistidos, on=["school_id", "cep"], how="left")
+
+    novos = chaves["precisao"].isna() & chaves["cep"].notna()
+    if novos.any():
+        resolvidos = geocodificar_ceps(chaves.loc[novos, "cep"])
+        chaves.loc[novos, ["latitude", "longitude", "precisao"]] = resolvidos.to_numpy()
+        gravar = chaves.loc[novos & chaves["precisao"].notna()]
+        if not gravar.empty:
+            _gravar_persistidos(pd.concat([persistidos, gravar], ignore_index=True)
+                                .drop_duplicates(["school_id", "cep"], keep="last"))
+
+    coords = alvo.merge(chaves, on=["school_id", "cep"], how="left")
+    coords.index = alvo.index
+    resolvida = coords["latitude"].notna().to_numpy()
+    linhas = alvo.index[resolvida]
+
+    df.loc[linhas, "latitude"] = coords.loc[linhas, "latitude"].astype(float)
+    df.loc[linhas, "longitude"] = coords.loc[linhas, "longitude"].astype(float)
+    df.loc[linhas, "coord_aproximada"] = True
+
+    escolas = alvo.loc[linhas, "school_id"].nunique()
+    sem_cep = alvo.loc[~resolvida, "school_id"].nunique()
+    logging.info(f"📮 {escolas} escolas geocodificadas pelo CEP ({sem_cep} sem CEP reconhecido)")
+    return df
@@ -0,0 +1,98 @@
+# indice_alunos.py
+"""
+Busca de alunos por prefixo (sem acento, sem diferenciar maiúsculas) para os seletores de aluno.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Máximo de candidatos enviados ao seletor por busca
+LIMITE_CANDIDATOS = 50
+
+
+def normalizar_nomes(nomes):
+    """Minúsculas, sem acentos e com espaços simples ("  JOÃO  da Silva" → "joao da silva")."""
+    return (
+        pd.Series(nomes, dtype=object).fillna("").astype(str)
+        .str.normalize("NFKD")
+        .str.encode("ascii", "ignore").str.decode("ascii")   # NFKD separa o acento da letra
+        .str.casefold()
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+
+
+# -----------------------------
+# 🔤 Índice de prefixos
+# -----------------------------
+class IndiceAlunos:
+    """
+    Um aluno por nome (a primeira linha do DataFrame), com chaves normalizadas para
+    cada início de palavra do nome ("joao da silva", "da silva", "silva"), ordenadas.
+
+    A busca é um intervalo [lo, hi) no array ordenado (np.searchsorted), então só os
+    candidatos que casam com o prefixo são visitados, e a linha do aluno escolhido sai
+    do índice sem máscara booleana sobre o DataFrame.
+    """
+
+    def __init__(self, df, col_nome="aluno_nome"):
+        self.df = df
+        nomes = df[col_nome]
+        primeiros = np.flatnonzero((nomes.notna() & ~nomes.duplicated()).to_numpy())
+        self.nomes = nomes.iloc[primeiros].astype(str).to_numpy()
+        self._posicao = dict(zip(self.nomes, primeiros))
+
+        normalizados = normalizar_nomes(self.nomes)
+        self._rank = np.empty(len(self.nomes), dtype=np.int64)
+        self._rank[np.argsort(normalizados.to_numpy(dtype=str), kind="stable")] = np.arange(len(self.nomes))
+
+        chaves, alunos = [], []
+        for aluno, palavras in enumerate(normalizados.str.split(" ")):
+            for i in range(len(palavras)):
+                chaves.append(" ".join(palavras[i:]))
+                alunos.append(aluno)
+        chaves = np.array(chaves, dtype=str)
+        ordem = np.argsort(chaves, kind="stable")
+        self._chaves = chaves[ordem]
+        self._alunos = np.array(alunos, dtype=np.int64)[ordem]
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def buscar(self, termo, limite=LIMITE_CANDIDATOS):
+        """Nomes (ordem alfabética) com alguma palavra começando por `termo`. Retorna (nomes[:limite], total)."""
+        termo = normalizar_nomes([termo or ""]).iloc[0]
+        if termo:
+            lo = np.searchsorted(self._chaves, termo, side="left")
+            hi = np.searchsorted(self._chaves, termo + "\uffff", side="left")
+            ids = np.unique(self._alunos[lo:hi])
+        else:
+            ids = np.arange(len(self.nomes))
+        ids = ids[np.argsort(self._rank[ids], kind="stable")]
+        return self.nomes[ids[:limite]].tolist(), len(ids)
+
+    def linha(self, nome):
+        """Primeira linha do DataFrame para o aluno."""
+        return self.df.iloc[self._posicao[nome]]
+
+
+# -----------------------------
+# 🔎 Seletor com busca
+# -----------------------------
+def seletor_aluno(indice, rotulo, chave, limite=LIMITE_CANDIDATOS):
+    """
+    Campo de busca + selectbox só com os alunos que casam com o texto digitado.
+    Retorna o nome escolhido ou None quando nada casa.
+    """
+    termo = st.text_input(
+        "🔎 Buscar aluno:",
+        key=f"{chave}_busca",
+        placeholder=f"Digite o início do nome ou sobrenome ({len(indice)} alunos)"
+    )
+    candidatos, total = indice.buscar(termo, limite)
+    if not candidatos:
+        st.caption("Nenhum aluno encontrado.")
+        return None
+    if total > len(candidatos):
+        st.caption(f"Mostrando {len(candidatos)} de {total} alunos — continue digitando para refinar.")
+    return st.selectbox(rotulo, candidatos, key=chave)
@@ -0,0 +1,160 @@
+# indices_mapa.py
+"""
+Índices em memória usados pelo mapa de escolas (DashMapaEscolas).
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+# Tamanho da célula da grade (graus). 0.05° ≈ 5,5 km
+TAMANHO_CELULA = 0.05
+
+# Codificação (linha, coluna) → inteiro único
+_DESLOCAMENTO = 1 << 20
+_LARGURA = 1 << 21
+
+
+# -----------------------------
+# 🧭 Índice espacial em grade
+# -----------------------------
+class IndiceEspacial:
+    """
+    Índice espacial em grade (buckets de latitude/longitude).
+
+    As posições das escolas ficam ordenadas por célula e cada célula guarda o intervalo
+    [inicio, inicio + contagem) dessas posições, de modo que a consulta por viewport
+    percorre apenas as células, não as escolas. O DataFrame não é reordenado: o índice
+    guarda só as coordenadas e a permutação, e o df continua sendo a visão recebida
+    (mapeada, sem cópia no heap do processo).
+    """
+
+    def __init__(self, df, tamanho_celula=TAMANHO_CELULA, col_lat="lat_jitter", col_lon="lon_jitter"):
+        self.tamanho_celula = tamanho_celula
+
+        lat = df[col_lat].to_numpy(dtype=float)
+        lon = df[col_lon].to_numpy(dtype=float)
+        chaves = self._codificar(
+            np.floor(lat / tamanho_celula).astype(np.int64),
+            np.floor(lon / tamanho_celula).astype(np.int64)
+        )
+
+        ordem = np.argsort(chaves, kind="stable")
+        self.df = df
+        self.ordem = ordem
+        self.lat = lat[ordem]
+        self.lon = lon[ordem]
+
+        self.celulas, self.inicios, self.contagens = np.unique(chaves[ordem], return_index=True, return_counts=True)
+        self.linhas_cel, self.colunas_cel = self._decodificar(self.celulas)
+
+    @staticmethod
+    def _codificar(linhas, colunas):
+        return (linhas + _DESLOCAMENTO) * _LARGURA + (colunas + _DESLOCAMENTO)
+
+    @staticmethod
+    def _decodificar(chaves):
+        return chaves // _LARGURA - _DESLOCAMENTO, chaves % _LARGURA - _DESLOCAMENTO
+
+    def __len__(self):
+        return len(self.df)
+
+    def limites(self):
+        """Extensão total dos dados: (sul, oeste, norte, leste)."""
+        return float(self.lat.min()), float(self.lon.min()), float(self.lat.max()), float(self.lon.max())
+
+    def _celulas_visiveis(self, sul, oeste, norte, leste):
+        t = self.tamanho_celula
+        return (
+            (self.linhas_cel >= math.floor(sul / t)) & (self.linhas_cel <= math.floor(norte / t))
+            & (self.colunas_cel >= math.floor(oeste / t)) & (self.colunas_cel <= math.floor(leste / t))
+        )
+
+    def consultar(self, sul, oeste, norte, leste):
+        """Escolas dentro do retângulo (visita só as células que o interceptam)."""
+        sel = self._celulas_visiveis(sul, oeste, norte, leste)
+        inicios, contagens = self.inicios[sel], self.contagens[sel]
+        if not len(inicios):
+            return self.df.iloc[0:0]
+
+        # concatena os intervalos [inicio, inicio + contagem) sem loop Python
+        deslocamentos = np.repeat(inicios - np.cumsum(np.r_[0, contagens[:-1]]), contagens)
+        idx = deslocamentos + np.arange(contagens.sum())
+
+        dentro = (
+            (self.lat[idx] >= sul) & (self.lat[idx] <= norte)
+            & (self.lon[idx] >= oeste) & (self.lon[idx] <= leste)
+        )
+        return self.df.iloc[self.ordem[idx[dentro]]]
+
+
+def zoom_para_limites(sul, oeste, norte, leste):
+    """Zoom aproximado que enquadra o retângulo (usado antes do mapa devolver o zoom real)."""
+    extensao = max(norte - sul, leste - oeste, 1e-6)
+    return int(max(1, min(18, math.floor(math.log2(360 / extensao)) + 1)))
+
+
+# -----------------------------
+# 🗂️ Índice hierárquico estado → cidade → escolas
+# -----------------------------
+class IndiceHierarquico:
+    """
+    Escolas ordenadas por (estado, cidade), com o intervalo de linhas e o total de
+    escolas de cada estado e de cada cidade. Listas de opções e totais saem prontos
+    do índice e o recorte de uma seleção é uma fatia contígua (iloc), sem máscaras.
+
+    Com o df já ordenado (carregar_escolas publica assim), o índice usa o próprio df e as
+    fatias são visões sobre o arquivo mapeado; só um df fora de ordem é copiado.
+    """
+
+    def __init__(self, df, col_nome="school_name"):
+        # a ordenação usa só as duas colunas; o df inteiro não passa pelo sort_values
+        chaves = pd.DataFrame({"state": df["state"].to_numpy(), "city": df["city"].to_numpy()})
+        ordem = chaves.sort_values(["state", "city"], kind="stable", na_position="last").index.to_numpy()
+        if (ordem == np.arange(len(ordem))).all():
+            self.df = df.reset_index(drop=True)
+        else:
+            self.df = df.iloc[ordem].reset_index(drop=True)
+        self.total = int(self.df[col_nome].nunique())
+
+        # intervalos [inicio, fim) e total de escolas distintas por estado e por (estado, cidade)
+        base = pd.DataFrame({
+            "state": self.df["state"], "city": self.df["city"],
+            "pos": np.arange(len(self.df)), "nome": self.df[col_nome]
+        })
+        self._estados = self._intervalos(base.dropna(subset=["state"]), ["state"])
+        self._cidades = self._intervalos(base.dropna(subset=["state", "city"]), ["state", "city"])
+
+        self._cidades_por_estado = {}
+        for estado, cidade in self._cidades:
+            self._cidades_por_estado.setdefault(estado, []).append(cidade)
+
+        self.estados = list(self._estados)
+
+    @staticmethod
+    def _intervalos(base, nivel):
+        agregado = base.groupby(nivel, sort=True).agg(inicio=("pos", "min"), fim=("pos", "max"), escolas=("nome", "nunique"))
+        chaves = agregado.index if len(nivel) > 1 else agregado.index.tolist()
+        return {
+            chave: (int(inicio), int(fim) + 1, int(escolas))
+            for chave, inicio, fim, escolas in zip(chaves, agregado["inicio"], agregado["fim"], agregado["escolas"])
+        }
+
+    def cidades(self, estado):
+        """Cidades (ordenadas) do estado; a visão nacional ("Todos") não tem recorte por cidade."""
+        return self._cidades_por_estado.get(estado, [])
+
+    def _intervalo(self, estado, cidade):
+        if estado == "Todos":
+            return 0, len(self.df), self.total
+        if cidade == "Todos":
+            return self._estados.get(estado, (0, 0, 0))
+        return self._cidades.get((estado, cidade), (0, 0, 0))
+
+    def total_escolas(self, estado, cidade="Todos"):
+        return self._intervalo(estado, cidade)[2]
+
+    def fatiar(self, estado, cidade="Todos"):
+        """Escolas da seleção como fatia contígua do DataFrame ordenado."""
+        inicio, fim, _ = self._intervalo(estado, cidade)
+        return self.df.iloc[inicio:fim]
@@ -0,0 +1,321 @@
+# memoria.py
+"""
+Contabilidade de memória por sessão e por cache, com orçamento global do processo.
+
+Os caches do processo (figuras, estado dos datasets por gestor, datasets mapeados)
+avisam o CONTADOR_MEMORIA a cada entrada guardada, lida ou descartada. O tamanho de
+cada entrada é medido uma vez, ao ser guardada, e cada acesso feito dentro de uma sessão
+do Streamlit registra a sessão como usuária da entrada.
+
+- Orçamento: quando os bytes em heap passam de MEMORIA_ORCAMENTO_MB, as entradas com
+  maior bytes × tempo sem uso são descartadas dos seus caches (as grandes e ociosas
+  primeiro) até voltar a MEMORIA_ALVO do orçamento.
+- Sessões: uma sessão sem acessos há SESSAO_OCIOSA segundos deixa de contar como usuária
+  das entradas; o que só ela usava é descartado antes do que as sessões ativas usam.
+- Relatório: relatorio() traz os bytes por cache e por sessão (exclusivos da sessão,
+  divididos com outras e mapeados) e os caches do próprio Streamlit (st.cache_data,
+  st.cache_resource, session_state); a cada MEMORIA_RELATORIO_INTERVALO segundos o
+  resumo vai para o log, e relatorio_sessao() dá a linha de uma sessão (logada pelas
+  páginas ao fim de cada renderização, em renderizacao.MedidorPintura).
+
+Os caches do próprio Streamlit (st.cache_data, st.cache_resource, session_state) só
+aparecem no relatório: não contam no heap do orçamento nem são descartados por ele, já
+que o Streamlit não expõe o descarte por entrada. Eles se limitam pelo ttl/max_entries
+de cada decorador, e o orçamento deve deixar folga para eles.
+
+Datasets mapeados (datasets_mapeados.py) aparecem no relatório, mas ficam fora do
+orçamento: as páginas do arquivo são do host, divididas entre os processos, e expiram
+por DATASETS_TTL. Os DataFrames derivados das páginas (df_filtrado, df_stack,
+df_tabela...) são variáveis locais do script e saem da memória no fim de cada execução;
+o que uma aba ociosa mantém vivo são as entradas de cache que ela usou.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+ORCAMENTO_MB = float(os.getenv("MEMORIA_ORCAMENTO_MB", "1024"))
+# Fração do orçamento a que o descarte desce (folga para não descartar a cada entrada)
+ALVO = float(os.getenv("MEMORIA_ALVO", "0.8"))
+SESSAO_OCIOSA = int(os.getenv("SESSAO_OCIOSA", "900"))
+# Intervalo mínimo entre dois relatórios no log (0 desliga)
+INTERVALO_RELATORIO = int(os.getenv("MEMORIA_RELATORIO_INTERVALO", "300"))
+
+
+def _tamanho_estimado(valor):
+    """Bytes aproximados de dicionários/listas de dados: arrays pelo nbytes, listas pelo 1º item."""
+    if hasattr(valor, "nbytes"):
+        return int(valor.nbytes)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(_tamanho_estimado(v) for v in valor.values())
+    if isinstance(valor, (tuple, list)):
+        if not valor:
+            return sys.getsizeof(valor)
+        return sys.getsizeof(valor) + len(valor) * _tamanho_estimado(valor[0])
+    return sys.getsizeof(valor)
+
+
+def tamanho_figura(figura):
+    """
+    Estimativa barata dos bytes de uma figura Plotly: percorre os dicionários dos traces e
+    do layout que a figura guarda, sem copiá-los nem serializar (to_json/pickle custariam
+    mais que montar a figura).
+    """
+    return _tamanho_estimado(figura._data) + _tamanho_estimado(figura._layout)
+
+
+def tamanho_bytes(valor):
+    """Bytes ocupados por um valor de cache (DataFrame, figura, tupla de DataFrames...)."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True, index=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True, index=True))
+    if hasattr(valor, "nbytes"):
+        # arrays numpy, tabelas e colunas Arrow, quadros comprimidos
+        return int(valor.nbytes)
+    if isinstance(valor, (tuple, list)):
+        return sys.getsizeof(valor) + sum(tamanho_bytes(v) for v in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_bytes(v) for v in valor.values())
+    if isinstance(valor, (bytes, bytearray, str)) or valor is None:
+        return sys.getsizeof(valor)
+    if type(valor).__module__.startswith("plotly."):
+        return tamanho_figura(valor)
+    return sys.getsizeof(valor)
+
+
+def sessao_atual():
+    """session_id da sessão do Streamlit da thread atual, ou None (worker, pool de consultas)."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+class _Entrada:
+    __slots__ = ("bytes", "mapeado", "ultimo_uso", "sessoes", "valor_id")
+
+    def __init__(self, tamanho, mapeado, valor_id):
+        self.bytes = tamanho
+        self.mapeado = mapeado
+        self.valor_id = valor_id
+        self.ultimo_uso = time.time()
+        self.sessoes = set()
+
+
+class ContadorMemoria:
+    """
+    Registro das entradas dos caches do processo: (cache, chave) → bytes, último uso e
+    sessões que a usaram. Cada cache se registra com uma função descartar(chave), chamada
+    quando o orçamento manda tirar a entrada dele.
+    """
+
+    def __init__(self, orcamento_mb=ORCAMENTO_MB, alvo=ALVO, sessao_ociosa=SESSAO_OCIOSA,
+                 intervalo_relatorio=INTERVALO_RELATORIO):
+        self.orcamento = int(orcamento_mb * 2**20)
+        self.alvo = alvo
+        self.sessao_ociosa = sessao_ociosa
+        self.intervalo_relatorio = intervalo_relatorio
+        self._ultimo_relatorio = time.time()
+        self._descartes = {}    # nome do cache → descartar(chave)
+        self._entradas = {}     # (cache, chave) → _Entrada
+        self._sessoes = {}      # session_id → última atividade
+        self._heap = 0
+        self._lock = threading.Lock()
+        self.descartados = 0
+        self.bytes_descartados = 0
+
+    def registrar_cache(self, nome, descartar):
+        with self._lock:
+            self._descartes[nome] = descartar
+
+    def _marcar(self, entrada, agora):
+        entrada.ultimo_uso = agora
+        sessao = sessao_atual()
+        if sessao is not None:
+            entrada.sessoes.add(sessao)
+            self._sessoes[sessao] = agora
+
+    def guardar(self, cache, chave, valor, mapeado=False, tamanho=None):
+        """
+        Registra (ou substitui) a entrada com o tamanho de `valor` (ou `tamanho`, já medido
+        pelo cache) e verifica o orçamento. O cache deve chamar sem segurar o próprio lock:
+        o descarte pode voltar a ele.
+        """
+        agora = time.time()
+        if tamanho is None:
+            with self._lock:
+                entrada = self._entradas.get((cache, chave))
+                if entrada is not None and entrada.valor_id == id(valor):
+                    # mesmo objeto (ex.: delta sem mudanças): só o uso conta
+                    self._marcar(entrada, agora)
+                    return
+            tamanho = tamanho_bytes(valor)
+        with self._lock:
+            anterior = self._entradas.get((cache, chave))
+            entrada = _Entrada(tamanho, mapeado, id(valor))
+            if anterior is not None:
+                entrada.sessoes = anterior.sessoes
+                self._heap -= 0 if anterior.mapeado else anterior.bytes
+            self._entradas[(cache, chave)] = entrada
+            self._heap += 0 if mapeado else tamanho
+            self._marcar(entrada, agora)
+        self.verificar_orcamento()
+
+    def usar(self, cache, chave):
+        """Acerto no cache: atualiza o último uso e a sessão que leu."""
+        with self._lock:
+            entrada = self._entradas.get((cache, chave))
+            if entrada is not None:
+                self._marcar(entrada, time.time())
+
+    def esquecer(self, cache, chave):
+        """A entrada saiu do cache por conta própria (LRU, ttl, clear)."""
+        with self._lock:
+            entrada = self._entradas.pop((cache, chave), None)
+            if entrada is not None and not entrada.mapeado:
+                self._heap -= entrada.bytes
+
+    def _encerrar_sessoes_ociosas(self, agora):
+        ociosas = {s for s, momento in self._sessoes.items() if agora - momento > self.sessao_ociosa}
+        if not ociosas:
+            return
+        for s in ociosas:
+            del self._sessoes[s]
+        for entrada in self._entradas.values():
+            entrada.sessoes -= ociosas
+        logging.info(f"💤 {len(ociosas)} sessões ociosas há mais de {self.sessao_ociosa}s deixaram de segurar entradas")
+
+    def verificar_orcamento(self):
+        """Descarta as entradas de maior bytes × tempo sem uso enquanto o heap passar do orçamento."""
+        agora = time.time()
+        with self._lock:
+            self._encerrar_sessoes_ociosas(agora)
+            relatar = self.intervalo_relatorio and agora - self._ultimo_relatorio > self.intervalo_relatorio
+            if relatar:
+                self._ultimo_relatorio = agora
+            dentro = self._heap <= self.orcamento
+        if relatar:
+            self.registrar_relatorio()
+        if dentro:
+            return
+
+        with self._lock:
+            alvo = self.orcamento * self.alvo
+            candidatas = sorted(
+                ((chave, e) for chave, e in self._entradas.items() if not e.mapeado),
+                # sem sessão ativa primeiro; depois as maiores e mais ociosas
+                key=lambda item: (bool(item[1].sessoes), -item[1].bytes * (agora - item[1].ultimo_uso + 1)),
+            )
+            vitimas, liberado = [], 0
+            for chave, entrada in candidatas:
+                if self._heap - liberado <= alvo:
+                    break
+                vitimas.append(chave)
+                liberado += entrada.bytes
+            descartes = dict(self._descartes)
+            antes = self._heap
+
+        for cache, chave in vitimas:
+            try:
+                descartes[cache](chave)
+            except Exception as e:
+                logging.warning(f"⚠️ Falha ao descartar entrada do cache {cache}: {e}")
+            self.esquecer(cache, chave)
+        with self._lock:
+            self.descartados += len(vitimas)
+            self.bytes_descartados += antes - self._heap
+        logging.warning(
+            f"🧹 Memória acima do orçamento ({antes / 2**20:.0f} MB > {self.orcamento / 2**20:.0f} MB): "
+            f"{len(vitimas)} entradas descartadas, {(antes - self._heap) / 2**20:.1f} MB liberados"
+        )
+
+    @staticmethod
+    def _linha_sessao(momento, agora):
+        return {"exclusivos": 0, "compartilhados": 0, "mapeados": 0, "entradas": 0, "ociosa_s": round(agora - momento, 1)}
+
+    @staticmethod
+    def _somar_entrada(linha, entrada):
+        linha["entradas"] += 1
+        if entrada.mapeado:
+            linha["mapeados"] += entrada.bytes // len(entrada.sessoes)
+        elif len(entrada.sessoes) == 1:
+            linha["exclusivos"] += entrada.bytes
+        else:
+            # entrada dividida: cada sessão responde pela sua parte
+            linha["compartilhados"] += entrada.bytes // len(entrada.sessoes)
+
+    def relatorio(self):
+        """Bytes por cache e por sessão, o orçamento e os caches do Streamlit."""
+        agora = time.time()
+        with self._lock:
+            por_cache = {}
+            por_sessao = {s: self._linha_sessao(momento, agora) for s, momento in self._sessoes.items()}
+            for (cache, _), entrada in self._entradas.items():
+                total = por_cache.setdefault(cache, {"entradas": 0, "bytes": 0, "mapeado": entrada.mapeado})
+                total["entradas"] += 1
+                total["bytes"] += entrada.bytes
+                for s in entrada.sessoes:
+                    if s in por_sessao:
+                        self._somar_entrada(por_sessao[s], entrada)
+            relatorio = {
+                "heap_bytes": self._heap,
+                "orcamento_bytes": self.orcamento,
+                "descartados": self.descartados,
+                "bytes_descartados": self.bytes_descartados,
+                "caches": por_cache,
+                "sessoes": por_sessao,
+            }
+        relatorio["streamlit"] = _estatisticas_streamlit()
+        return relatorio
+
+    def relatorio_sessao(self, sessao=None):
+        """Linha do relatório da sessão (a atual, por padrão), ou None se ela não usou nenhum cache."""
+        sessao = sessao or sessao_atual()
+        agora = time.time()
+        with self._lock:
+            momento = self._sessoes.get(sessao)
+            if momento is None:
+                return None
+            linha = self._linha_sessao(momento, agora)
+            for entrada in self._entradas.values():
+                if sessao in entrada.sessoes:
+                    self._somar_entrada(linha, entrada)
+        return linha
+
+    def registrar_relatorio(self):
+        """Loga o relatório resumido (heap, orçamento e as sessões que mais seguram memória)."""
+        r = self.relatorio()
+        sessoes = sorted(r["sessoes"].items(), key=lambda i: -(i[1]["exclusivos"] + i[1]["compartilhados"]))
+        logging.info(
+            f"🧮 Memória dos caches: {r['heap_bytes'] / 2**20:.1f} MB de {r['orcamento_bytes'] / 2**20:.0f} MB — "
+            + ", ".join(f"{nome} {c['bytes'] / 2**20:.1f} MB" for nome, c in r["caches"].items())
+            + f"; Streamlit (fora do orçamento) {sum(r['streamlit'].values()) / 2**20:.1f} MB"
+            + f"; {len(sessoes)} sessões, maiores: "
+            + ", ".join(
+                f"{s[:8]} {(i['exclusivos'] + i['compartilhados']) / 2**20:.1f} MB (ociosa {i['ociosa_s']:.0f}s)"
+                for s, i in sessoes[:5]
+            )
+        )
+        return r
+
+
+def _estatisticas_streamlit():
+    """Bytes dos caches do Streamlit (st.cache_data, st.cache_resource, session_state) por função."""
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.stats import CACHE_MEMORY_FAMILY
+
+    if not Runtime.exists():
+        return {}
+    estatisticas = Runtime.instance().stats_mgr.get_stats([CACHE_MEMORY_FAMILY]).get(CACHE_MEMORY_FAMILY, [])
+    resultado = {}
+    for stat in estatisticas:
+        nome = f"{stat.category_name}:{stat.cache_name}" if stat.cache_name else stat.category_name
+        resultado[nome] = resultado.get(nome, 0) + stat.byte_length
+    return resultado
+
+
+# Instância única do processo
+CONTADOR_MEMORIA = ContadorMemoria()
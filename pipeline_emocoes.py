@@ -0,0 +1,264 @@
+# pipeline_emocoes.py
+"""
+Pipeline offline (batch) de extração de emoções das fotos das avaliações.
+
+Gera a estrutura lida por AnaliseSentimentos em `feelings_results`:
+    [{"emotions": {"happy": 12.3, "sad": ..., ...}, "dominant_emotion": "happy"}, ...]
+
+Organização esperada do diretório de entrada (uma pasta por avaliação):
+    fotos/
+        <avaliacao_id>/foto1.jpg
+        <avaliacao_id>/foto2.jpg
+
+Uso:
+    python pipeline_emocoes.py --entrada fotos/ --saida feelings_results.json
+    python pipeline_emocoes.py --entrada fotos/ --backend stub --processos 1
+    python pipeline_emocoes.py --entrada fotos/ --backend deepface --detector retinaface --lote 32 --gravar-banco
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Mesma ordem/chaves usadas pelo DeepFace e por AnaliseSentimentos
+EMOCOES = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+EXTENSOES_IMAGEM = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+# -----------------------------
+# 🔌 Backends de detecção
+# -----------------------------
+class BackendStub:
+    """
+    Backend leve e determinístico (sem rede e sem modelos), para testes.
+    As emoções são derivadas do hash do arquivo e somam 100%.
+    """
+    nome = "stub"
+
+    def __init__(self, detector=None):
+        self.detector = detector
+
+    def analisar(self, caminho):
+        digest = hashlib.sha256(Path(caminho).read_bytes()).digest()
+        pesos = [b + 1 for b in digest[:len(EMOCOES)]]
+        total = sum(pesos)
+        return {emocao: round(peso / total * 100, 4) for emocao, peso in zip(EMOCOES, pesos)}
+
+
+class BackendDeepFace:
+    """Backend real: DeepFace.analyze (TensorFlow) com detector de face configurável."""
+    nome = "deepface"
+
+    def __init__(self, detector="opencv"):
+        from deepface import DeepFace  # import pesado: só no processo que usa
+        self._deepface = DeepFace
+        self.detector = detector or "opencv"
+
+    def analisar(self, caminho):
+        resultado = self._deepface.analyze(
+            img_path=str(caminho),
+            actions=["emotion"],
+            detector_backend=self.detector,
+            enforce_detection=False,
+            silent=True
+        )
+        face = resultado[0] if isinstance(resultado, list) else resultado
+        # numpy.float32 → float para serializar em JSON
+        return {emocao: float(valor) for emocao, valor in face["emotion"].items()}
+
+
+BACKENDS = {
+    BackendStub.nome: BackendStub,
+    BackendDeepFace.nome: BackendDeepFace,
+}
+
+
+def registrar_backend(nome, classe):
+    """Registra um backend extra (classe com __init__(detector) e analisar(caminho) -> dict de emoções)."""
+    BACKENDS[nome] = classe
+
+
+# -----------------------------
+# ⚙️ Execução nos processos do pool
+# -----------------------------
+_backend = None
+
+
+def _inicializar_processo(nome_backend, detector):
+    """Carrega o backend uma única vez por processo (o modelo fica em memória entre lotes)."""
+    global _backend
+    _backend = BACKENDS[nome_backend](detector)
+
+
+def _processar_lote(caminhos):
+    """Analisa um lote de fotos. Retorna lista de (caminho, emoções ou None, erro ou None)."""
+    resultados = []
+    for caminho in caminhos:
+        try:
+            resultados.append((caminho, _backend.analisar(caminho), None))
+        except Exception as e:
+            resultados.append((caminho, None, str(e)))
+    return resultados
+
+
+# -----------------------------
+# 📂 Entrada / saída
+# -----------------------------
+def listar_fotos(diretorio):
+    """Retorna {avaliacao_id: [caminhos ordenados]} a partir das subpastas do diretório."""
+    fotos_por_avaliacao = {}
+    for caminho in sorted(Path(diretorio).rglob("*")):
+        if caminho.is_file() and caminho.suffix.lower() in EXTENSOES_IMAGEM:
+            # fotos soltas na raiz viram uma avaliação com o nome do arquivo
+            pasta = caminho.parent
+            avaliacao_id = pasta.name if pasta != Path(diretorio) else caminho.stem
+            fotos_por_avaliacao.setdefault(avaliacao_id, []).append(str(caminho))
+    return fotos_por_avaliacao
+
+
+def montar_resultado_foto(emocoes):
+    """Monta o item de feelings_results no formato esperado por AnaliseSentimentos."""
+    return {
+        "emotions": emocoes,
+        "dominant_emotion": max(emocoes, key=emocoes.get) if emocoes else None
+    }
+
+
+def gravar_no_banco(resultados):
+    """Grava feelings_results em littera.children_avaliation (uma linha por avaliação)."""
+    from sqlalchemy import text
+    from config import engine  # exige as variáveis de conexão do banco
+
+    # updated_at: a sonda de versão e os deltas (versao_dados.py, atualizacao_incremental.py) enxergam o resultado novo
+    comando = text(
+        "UPDATE littera.children_avaliation SET feelings_results = :resultado, updated_at = now() WHERE id = :id"
+    )
+    with engine.begin() as conn:
+        conn.execute(comando, [
+            {"id": avaliacao_id, "resultado": json.dumps(fotos)}
+            for avaliacao_id, fotos in resultados.items()
+        ])
+    logging.info(f"💾 {len(resultados)} avaliações gravadas no banco")
+
+
+# -----------------------------
+# 🚀 Pipeline
+# -----------------------------
+def executar_pipeline(diretorio, backend="deepface", detector=None, processos=None, lote=16):
+    """
+    Processa todas as fotos do diretório em lotes, num pool de processos.
+    Retorna (resultados, metricas): resultados = {avaliacao_id: [{"emotions": {...}}, ...]}.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {backend} (disponíveis: {', '.join(BACKENDS)})")
+    if lote < 1:
+        raise ValueError(f"lote deve ser >= 1 (recebido: {lote})")
+    if processos is not None and processos < 1:
+        raise ValueError(f"processos deve ser >= 1 (recebido: {processos})")
+
+    fotos_por_avaliacao = listar_fotos(diretorio)
+    caminhos = [c for fotos in fotos_por_avaliacao.values() for c in fotos]
+    lotes = [caminhos[i:i + lote] for i in range(0, len(caminhos), lote)]
+    processos = processos or os.cpu_count() or 1
+
+    logging.info(
+        f"⏱️ Pipeline iniciado: {len(caminhos)} fotos, {len(fotos_por_avaliacao)} avaliações, "
+        f"{len(lotes)} lotes de até {lote}, backend={backend}, processos={processos}"
+    )
+
+    inicio = time.time()
+    emocoes_por_foto = {}
+    erros = 0
+    processadas = 0
+
+    if processos <= 1:
+        # execução no próprio processo (útil para o backend stub e depuração)
+        _inicializar_processo(backend, detector)
+        resultados_lotes = map(_processar_lote, lotes)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(
+            max_workers=processos,
+            initializer=_inicializar_processo,
+            initargs=(backend, detector)
+        )
+        resultados_lotes = executor.map(_processar_lote, lotes)
+
+    try:
+        for i, resultado_lote in enumerate(resultados_lotes, start=1):
+            processadas += len(resultado_lote)
+            for caminho, emocoes, erro in resultado_lote:
+                if erro is not None:
+                    erros += 1
+                    logging.warning(f"⚠️ Falha ao analisar {caminho}: {erro}")
+                    continue
+                emocoes_por_foto[caminho] = emocoes
+
+            decorrido = time.time() - inicio
+            logging.info(
+                f"📦 Lote {i}/{len(lotes)} concluído — {processadas} fotos em {decorrido:.1f}s "
+                f"({processadas / decorrido if decorrido else 0:.2f} imagens/s)"
+            )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Fotos com falha ficam de fora: AnaliseSentimentos já trata fotos ausentes
+    resultados = {
+        avaliacao_id: [montar_resultado_foto(emocoes_por_foto[c]) for c in fotos if c in emocoes_por_foto]
+        for avaliacao_id, fotos in fotos_por_avaliacao.items()
+    }
+
+    duracao = time.time() - inicio
+    metricas = {
+        "fotos": len(caminhos),
+        "avaliacoes": len(resultados),
+        "erros": erros,
+        "segundos": round(duracao, 3),
+        "imagens_por_segundo": round(len(caminhos) / duracao, 2) if duracao else 0.0,
+    }
+    logging.info(
+        f"✅ Pipeline concluído: {metricas['fotos']} fotos em {metricas['segundos']:.3f}s "
+        f"({metricas['imagens_por_segundo']} imagens/s, {erros} erros)"
+    )
+    return resultados, metricas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extração offline de emoções para feelings_results.")
+    parser.add_argument("--entrada", required=True, help="Diretório com uma subpasta de fotos por avaliação")
+    parser.add_argument("--saida", default="feelings_results.json", help="Arquivo JSON de saída")
+    parser.add_argument("--backend", default="deepface", choices=sorted(BACKENDS), help="Backend de detecção")
+    parser.add_argument("--detector", default=None, help="Detector de face do backend (ex: opencv, retinaface, mtcnn)")
+    parser.add_argument("--processos", type=int, default=None, help="Processos no pool (padrão: nº de CPUs)")
+    parser.add_argument("--lote", type=int, default=16, help="Fotos por lote enviado a cada processo")
+    parser.add_argument("--gravar-banco", action="store_true", help="Grava feelings_results em littera.children_avaliation")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    resultados, metricas = executar_pipeline(
+        args.entrada,
+        backend=args.backend,
+        detector=args.detector,
+        processos=args.processos,
+        lote=args.lote
+    )
+
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, ensure_ascii=False)
+    logging.info(f"💾 Resultados salvos em {args.saida}")
+
+    if args.gravar_banco:
+        gravar_no_banco(resultados)
+
+    print(json.dumps(metricas))
+
+
+if __name__ == "__main__":
+    main()
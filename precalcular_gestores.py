@@ -0,0 +1,185 @@
+# precalcular_gestores.py
+"""
+Worker de pré-cálculo dos painéis por gestor.
+
+Para cada gestor com avaliações (auth.users.email_hash), calcula os datasets e os
+agregados que as páginas exibem na abertura e grava tudo no ARMAZEM_PRECALCULADO
+(cache_compartilhado), que as páginas leem antes de ir ao banco:
+    Pedagógico   dataset e barras empilhadas da seleção inicial (primeira escola);
+    Ilhas        dataset, resumo das turmas e médias por turma/ilha (heatmap);
+    CompFund     dataset, resumo das turmas e faixas de classificação por turma;
+    Sentimentos  avaliações/fotos e médias de emoção por turma.
+
+A versão dos dados do gestor (versao_gestor) faz parte de cada chave e, ao terminar
+um gestor, o worker grava a marca ("gestor", email_hash, versao). Rodar de novo depois
+de uma interrupção pula os gestores já prontos para a versão atual; quem teve dados
+novos é recalculado.
+
+Uso (job separado do Streamlit, com o mesmo CACHE_BACKEND das instâncias — redis, ou
+sqlite num volume compartilhado):
+    python precalcular_gestores.py
+    python precalcular_gestores.py --processos 4
+    python precalcular_gestores.py --limite 50 --processos 1
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Gestores com alguma avaliação, os de atividade mais recente primeiro
+QUERY_GESTORES = """
+SELECT u.email_hash
+FROM auth.users u
+JOIN auth.school_users su ON u.id = su.user_id
+JOIN core.school_classes t ON su.school_id = t.school_id
+JOIN core.children a ON t.id = a.class_id
+JOIN littera.children_avaliation av ON a.id = av.child_id
+WHERE u.email_hash IS NOT NULL
+GROUP BY u.email_hash
+ORDER BY MAX(av.updated_at) DESC
+"""
+
+# Seleção inicial das páginas de turmas (multiselect com "Todos")
+TODAS_TURMAS = ("Todos",)
+
+FORMATO_LOG = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+# -----------------------------
+# ⚙️ Execução nos processos do pool
+# -----------------------------
+def _inicializar_processo():
+    """Liga a gravação do armazém no processo (as páginas só o leem)."""
+    logging.basicConfig(level=logging.INFO, format=FORMATO_LOG)
+
+    import atualizacao_incremental
+    from cache_compartilhado import ARMAZEM_PRECALCULADO
+
+    ARMAZEM_PRECALCULADO.gravando = True
+    # sem deltas no worker: nenhum dataset fica em memória de um gestor para o outro
+    atualizacao_incremental.MAX_GESTORES = 0
+
+
+def precalcular_gestor(email_hash):
+    """Calcula e grava o que as páginas leem do gestor. Retorna (email_hash, situação, segundos)."""
+    import streamlit as st
+
+    import AnaliseSentimentos as sentimentos
+    import DashCompFundAluno as compfund
+    import DashDesemAlunosPorIlha as ilhas
+    import DashPedagogico as pedagogico
+    from cache_compartilhado import ARMAZEM_PRECALCULADO
+    from versao_dados import versao_gestor
+
+    inicio = time.time()
+    try:
+        versao = versao_gestor(email_hash)
+        marca = ("gestor", email_hash, versao)
+        if ARMAZEM_PRECALCULADO.contem(marca):
+            return email_hash, "pronto", 0.0
+
+        df = pedagogico.carregar_pedagogico(email_hash, versao)
+        if not df.empty:
+            primeira_escola = sorted(df["escola_nome"].unique())[0]
+            pedagogico.agregado_escolas(email_hash, (primeira_escola,), versao)
+
+        if not ilhas.carregar_desempenho(email_hash, versao).empty:
+            ilhas.carregar_resumo_turmas(email_hash, versao)
+            ilhas.medias_por_turma(email_hash, TODAS_TURMAS, versao)
+
+        if not compfund.carregar_competencias(email_hash, versao).empty:
+            compfund.carregar_resumo_turmas(email_hash, versao)
+            compfund.faixas_por_turma(email_hash, TODAS_TURMAS, versao)
+
+        df, _ = sentimentos.carregar_emocoes(email_hash, versao)
+        if not df.empty:
+            sentimentos.matriz_emocoes_por_turma(email_hash, versao)
+
+        ARMAZEM_PRECALCULADO.gravar(marca, True)
+        return email_hash, "calculado", time.time() - inicio
+    except Exception as e:
+        logging.warning(f"⚠️ Falha no pré-cálculo do gestor {email_hash[:8]}: {e}")
+        return email_hash, "erro", time.time() - inicio
+    finally:
+        # o que interessa já está no armazém; o cache em memória do processo não cresce
+        st.cache_data.clear()
+
+
+# -----------------------------
+# 🚀 Execução
+# -----------------------------
+def executar(processos=None, limite=None):
+    """Pré-calcula todos os gestores num pool de processos. Retorna as métricas da execução."""
+    if processos is not None and processos < 1:
+        raise ValueError(f"processos deve ser >= 1 (recebido: {processos})")
+    if limite is not None and limite < 1:
+        raise ValueError(f"limite deve ser >= 1 (recebido: {limite})")
+    from config import executar_query
+
+    gestores = executar_query(QUERY_GESTORES, nome="gestores")["email_hash"].tolist()
+    if limite:
+        gestores = gestores[:limite]
+    processos = processos or os.cpu_count() or 1
+
+    logging.info(f"⏱️ Pré-cálculo iniciado: {len(gestores)} gestores, processos={processos}")
+
+    inicio = time.time()
+    contagem = {"calculado": 0, "pronto": 0, "erro": 0}
+
+    if processos <= 1:
+        # execução no próprio processo (depuração)
+        _inicializar_processo()
+        resultados = map(precalcular_gestor, gestores)
+        executor = None
+    else:
+        # spawn: processos novos, sem as conexões e threads do processo principal
+        executor = ProcessPoolExecutor(
+            max_workers=processos,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_inicializar_processo
+        )
+        resultados = (f.result() for f in as_completed([executor.submit(precalcular_gestor, h) for h in gestores]))
+
+    try:
+        for i, (email_hash, situacao, segundos) in enumerate(resultados, start=1):
+            contagem[situacao] += 1
+            decorrido = time.time() - inicio
+            logging.info(
+                f"📦 {i}/{len(gestores)} gestores — {email_hash[:8]} {situacao} em {segundos:.1f}s "
+                f"({contagem['calculado'] / decorrido * 60 if decorrido else 0:.1f} gestores/min calculados, "
+                f"{contagem['pronto']} já prontos, {contagem['erro']} erros)"
+            )
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    duracao = time.time() - inicio
+    metricas = {
+        "gestores": len(gestores),
+        **contagem,
+        "segundos": round(duracao, 3),
+        "gestores_por_minuto": round(contagem["calculado"] / duracao * 60, 2) if duracao else 0.0,
+    }
+    logging.info(
+        f"✅ Pré-cálculo concluído: {contagem['calculado']} gestores calculados em {metricas['segundos']:.1f}s "
+        f"({metricas['gestores_por_minuto']} gestores/min), {contagem['pronto']} já prontos, {contagem['erro']} erros"
+    )
+    return metricas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pré-calcula os painéis de todos os gestores.")
+    parser.add_argument("--processos", type=int, default=None, help="Processos no pool (padrão: nº de CPUs)")
+    parser.add_argument("--limite", type=int, default=None, help="Só os N gestores de atividade mais recente")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format=FORMATO_LOG)
+    metricas = executar(processos=args.processos, limite=args.limite)
+    print(json.dumps(metricas))
+
+
+if __name__ == "__main__":
+    main()
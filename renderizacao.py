@@ -0,0 +1,206 @@
+# renderizacao.py
+"""
+Renderização progressiva das páginas: trabalho pesado (consultas, figuras) em um pool
+de threads enquanto o script já desenha o que está pronto, e medição do tempo até a
+primeira pintura útil (KPIs) e até a página completa.
+"""
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import numpy as np
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from config import DISJUNTOR_BANCO, INTERVALO_VERIFICACAO, SINAL_CANCELAMENTO, get_run_yield_check
+from memoria import CONTADOR_MEMORIA, sessao_atual
+
+# Pool compartilhado pelo processo (as consultas liberam o GIL enquanto esperam o banco)
+POOL_RENDERIZACAO = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RENDER_WORKERS", "4")),
+    thread_name_prefix="render"
+)
+
+
+# Trabalho que a execução atual não espera (figuras das abas fechadas): pool próprio e
+# pequeno, para não ocupar as threads do que a página está aguardando
+POOL_ESPECULATIVO = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RENDER_ESPECULATIVO_WORKERS", "1")),
+    thread_name_prefix="especulativo"
+)
+# Tarefas especulativas na fila ou rodando; acima disso, novas são ignoradas
+MAX_ESPECULATIVAS = int(os.getenv("RENDER_ESPECULATIVO_MAX", "4"))
+
+_ESPECULATIVAS = {}     # session_id → Futures especulados pela última execução
+_LOCK_ESPECULATIVAS = threading.Lock()
+_pendentes_especulativas = 0
+
+
+def _submeter(pool, func, args, kwargs):
+    ctx = get_script_run_ctx()
+    sinal = threading.Event()
+
+    def executar():
+        thread = threading.current_thread()
+        add_script_run_ctx(thread, ctx)
+        token = SINAL_CANCELAMENTO.set(sinal)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            SINAL_CANCELAMENTO.reset(token)
+            add_script_run_ctx(thread, None)
+
+    futuro = pool.submit(executar)
+    futuro.sinal_cancelamento = sinal
+    return futuro
+
+
+def em_segundo_plano(func, *args, **kwargs):
+    """
+    Executa func(*args, **kwargs) no pool e devolve o Future. A thread recebe o contexto
+    da sessão atual, então funções com st.cache_data se comportam como no script.
+    Espere o resultado com aguardar(futuro) para que uma reexecução da sessão cancele
+    as consultas da tarefa.
+    """
+    return _submeter(POOL_RENDERIZACAO, func, args, kwargs)
+
+
+def especular(func, *args, **kwargs):
+    """
+    Como em_segundo_plano, para trabalho que ninguém espera agora (ex.: a figura de uma aba
+    fechada): roda no POOL_ESPECULATIVO, é ignorado (devolve None) com MAX_ESPECULATIVAS
+    pendentes e é cancelado quando a sessão reexecuta a página (cancelar_especulacoes).
+    """
+    global _pendentes_especulativas
+    sessao = sessao_atual()
+    with _LOCK_ESPECULATIVAS:
+        if _pendentes_especulativas >= MAX_ESPECULATIVAS:
+            return None
+        _pendentes_especulativas += 1
+
+    def concluir(futuro):
+        global _pendentes_especulativas
+        with _LOCK_ESPECULATIVAS:
+            _pendentes_especulativas -= 1
+            futuros = _ESPECULATIVAS.get(sessao)
+            if futuros is not None:
+                futuros.discard(futuro)
+                if not futuros:
+                    del _ESPECULATIVAS[sessao]
+
+    futuro = _submeter(POOL_ESPECULATIVO, func, args, kwargs)
+    with _LOCK_ESPECULATIVAS:
+        _ESPECULATIVAS.setdefault(sessao, set()).add(futuro)
+    futuro.add_done_callback(concluir)
+    return futuro
+
+
+def cancelar_especulacoes():
+    """
+    Cancela o que a execução anterior da sessão especulou (chamar no início da página):
+    o que não começou sai da fila e o que está rodando tem as consultas canceladas.
+    """
+    with _LOCK_ESPECULATIVAS:
+        futuros = _ESPECULATIVAS.pop(sessao_atual(), set())
+    for futuro in futuros:
+        futuro.sinal_cancelamento.set()
+        futuro.cancel()
+
+
+def aguardar(futuro):
+    """
+    Resultado de um Future de em_segundo_plano. Se a sessão reexecutar (ou parar) durante
+    a espera, sinaliza a tarefa — suas consultas são canceladas no servidor — e repassa a
+    exceção do Streamlit.
+    """
+    verificar_sessao = get_run_yield_check()
+    while True:
+        try:
+            return futuro.result(timeout=INTERVALO_VERIFICACAO)
+        except FutureTimeoutError:
+            pass
+        try:
+            if verificar_sessao is not None:
+                verificar_sessao()
+        except BaseException:
+            futuro.sinal_cancelamento.set()
+            raise
+
+
+# -----------------------------
+# ⏱️ Tempo até a primeira pintura útil
+# -----------------------------
+# Últimas medições por (página, etapa), para p50/p95 no log
+_HISTORICO = defaultdict(lambda: deque(maxlen=200))
+_LOCK = threading.Lock()
+
+
+class MedidorPintura:
+    """
+    Marca etapas da renderização de uma página a partir do início do script:
+    medidor.marcar("kpis") → "primeira pintura útil"; medidor.marcar("completa", final=True)
+    → fim, com a memória que a sessão segura nos caches (CONTADOR_MEMORIA.relatorio_sessao).
+    """
+
+    def __init__(self, pagina):
+        self.pagina = pagina
+        self.inicio = time.perf_counter()
+
+    def marcar(self, etapa, final=False):
+        duracao = time.perf_counter() - self.inicio
+        with _LOCK:
+            historico = _HISTORICO[(self.pagina, etapa)]
+            historico.append(duracao)
+            p50, p95 = np.percentile(historico, [50, 95])
+        mensagem = (
+            f"🎨 {self.pagina}: {etapa} em {duracao:.3f}s "
+            f"(p50 {p50:.3f}s, p95 {p95:.3f}s em {len(historico)} renderizações)"
+        )
+        if final:
+            sessao = CONTADOR_MEMORIA.relatorio_sessao()
+            if sessao is not None:
+                mensagem += (
+                    f"; caches da sessão: {(sessao['exclusivos'] + sessao['compartilhados']) / 2**20:.1f} MB "
+                    f"+ {sessao['mapeados'] / 2**20:.1f} MB mapeados em {sessao['entradas']} entradas"
+                )
+        logging.info(mensagem)
+        return duracao
+
+
+def metricas_pintura():
+    """{(pagina, etapa): {"n", "p50", "p95"}} das últimas renderizações deste processo."""
+    with _LOCK:
+        return {
+            chave: {
+                "n": len(valores),
+                "p50": float(np.percentile(valores, 50)),
+                "p95": float(np.percentile(valores, 95)),
+            }
+            for chave, valores in _HISTORICO.items() if valores
+        }
+
+
+# -----------------------------
+# 🕒 Selo de dados antigos (banco lento ou indisponível)
+# -----------------------------
+def selo_dados_antigos(dfs, caches=(), args=()):
+    """
+    Mostra o selo "dados de HH:MM" quando algum DataFrame veio do último resultado
+    válido da camada de consultas (df.attrs["dados_de"]). Quando o circuito do banco
+    já fechou, limpa as entradas `caches` (funções st.cache_data) para `args`, e a
+    próxima execução da página busca dados novos em vez de manter os antigos no cache.
+    """
+    momentos = [df.attrs["dados_de"] for df in dfs if df is not None and "dados_de" in df.attrs]
+    if not momentos:
+        return
+    st.badge(
+        f"dados de {min(momentos):%H:%M}", icon="🕒", color="orange",
+        help="O banco está lento ou indisponível: exibindo o último resultado válido."
+    )
+    if not DISJUNTOR_BANCO.aberto():
+        for funcao in caches:
+            funcao.clear(*args)
@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# config.py exige as variáveis do banco na importação; as consultas são substituídas nos testes
+os.environ.setdefault("DB_USER", "teste")
+os.environ.setdefault("DB_PASS", "teste")
+os.environ.setdefault("DB_HOST", "/tmp")
+os.environ.setdefault("DB_NAME", "teste")
+# caches e datasets mapeados dos testes fora do diretório da aplicação
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="neuroverse_testes_"))
+os.environ.setdefault("CACHE_BACKEND", "memoria")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
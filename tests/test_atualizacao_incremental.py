@@ -0,0 +1,109 @@
+import pandas as pd
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import atualizacao_incremental
+from atualizacao_incremental import DatasetIncremental
+from memoria import CONTADOR_MEMORIA
+
+T0 = pd.Timestamp("2025-06-01 12:00:00")
+
+
+class BancoFalso:
+    """Substitui executar_query: carga completa devolve `linhas`, delta devolve `delta`."""
+
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.delta = []
+        self.falhar = False
+        self.chamadas = []
+
+    def __call__(self, query_text, params=None, nome=None, ultimo_valido=True):
+        self.chamadas.append({"nome": nome, "params": params, "ultimo_valido": ultimo_valido})
+        if "desde" not in params:
+            return pd.DataFrame(self.linhas)
+        if self.falhar:
+            raise OperationalError(query_text, params, Exception("banco fora"))
+        return pd.DataFrame(self.delta, columns=["avaliacao_id", "valor", "atualizado_em", "incluir"])
+
+
+def _linha(avaliacao_id, valor, atualizado_em, incluir=True):
+    return {"avaliacao_id": avaliacao_id, "valor": valor, "atualizado_em": atualizado_em, "incluir": incluir}
+
+
+@pytest.fixture
+def banco(monkeypatch):
+    falso = BancoFalso([_linha(1, 10, T0), _linha(2, 20, T0), _linha(3, 30, T0)])
+    monkeypatch.setattr(atualizacao_incremental, "executar_query", falso)
+    return falso
+
+
+def _dataset(request):
+    return DatasetIncremental(request.node.name, "select {filtro} where {condicao}", "true", ordenar=["avaliacao_id"])
+
+
+def test_delta_insere_atualiza_e_remove(banco, request):
+    dataset = _dataset(request)
+    assert list(dataset.obter("g", "3@v1")["valor"]) == [10, 20, 30]
+
+    banco.delta = [_linha(2, 21, T0 + pd.Timedelta(minutes=5)), _linha(3, 30, T0, incluir=False),
+                   _linha(4, 40, T0 + pd.Timedelta(minutes=6))]
+    df = dataset.obter("g", "4@v2")
+
+    assert list(df["avaliacao_id"]) == [1, 2, 4]
+    assert list(df["valor"]) == [10, 21, 40]
+    delta = banco.chamadas[-1]
+    assert delta["nome"].endswith("_delta") and delta["ultimo_valido"] is False
+
+
+def test_delta_parte_de_antes_da_marca(banco, request):
+    dataset = _dataset(request)
+    dataset.obter("g", "3@v1")
+
+    # transação que confirmou depois de a marca avançar: updated_at anterior à marca
+    banco.delta = [_linha(1, 10, T0), _linha(5, 50, T0 - pd.Timedelta(seconds=30))]
+    df = dataset.obter("g", "4@v2")
+
+    desde = banco.chamadas[-1]["params"]["desde"]
+    assert desde == (T0 - atualizacao_incremental.SOBREPOSICAO).to_pydatetime()
+    # a avaliação repetida da janela não duplica
+    assert list(df["avaliacao_id"]) == [1, 2, 3, 5]
+
+
+def test_delta_com_banco_fora_serve_a_versao_anterior_sem_publicar(banco, request):
+    dataset = _dataset(request)
+    dataset.obter("g", "3@v1")
+
+    banco.falhar = True
+    df = dataset.obter("g", "4@v2")
+
+    assert list(df["valor"]) == [10, 20, 30]
+    assert "dados_de" in df.attrs
+    # o estado continua na versão anterior: a próxima chamada tenta o delta de novo
+    assert dataset._estado["g"]["chave"][-1] == "3@v1"
+    banco.falhar = False
+    banco.delta = [_linha(2, 22, T0 + pd.Timedelta(minutes=1))]
+    df = dataset.obter("g", "4@v2")
+    assert list(df["valor"]) == [10, 22, 30] and "dados_de" not in df.attrs
+
+
+def test_sem_estado_no_worker_nada_fica_no_contador(banco, request, monkeypatch):
+    monkeypatch.setattr(atualizacao_incremental, "MAX_GESTORES", 0)
+    dataset = _dataset(request)
+
+    dataset.obter("g", "3@v1")
+
+    assert not dataset.em_memoria("g")
+    assert not [chave for chave in CONTADOR_MEMORIA._entradas if chave[0] == dataset._cache]
+
+
+def test_carga_completa_antiga_nao_vira_estado(banco, request, monkeypatch):
+    dataset = _dataset(request)
+    antigo = pd.DataFrame(banco.linhas)
+    antigo.attrs["dados_de"] = T0
+    monkeypatch.setattr(atualizacao_incremental, "executar_query", lambda *a, **k: antigo.copy())
+
+    df = dataset.obter("g", "3@v1")
+
+    assert df.attrs["dados_de"] == T0
+    assert not dataset.em_memoria("g")
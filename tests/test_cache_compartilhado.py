@@ -0,0 +1,65 @@
+import pickle
+
+import pandas as pd
+import pytest
+
+from cache_compartilhado import BackendMemoria, CacheCompartilhado, desserializar, serializar
+
+EMOCOES_IMAGENS = [
+    [
+        {"emotions": {"angry": 0.12, "fear": 1.3, "happy": 91.2, "neutral": 7.38}, "dominant_emotion": "happy"},
+        {"error": "Face could not be detected"},
+    ],
+    None,
+]
+
+
+def test_dataframe_com_coluna_aninhada_volta_igual():
+    df = pd.DataFrame({"aluno_id": [1, 2], "emocoes_imagens": EMOCOES_IMAGENS})
+
+    lido = desserializar(serializar(df))
+
+    pd.testing.assert_frame_equal(lido, df)
+    assert isinstance(lido["emocoes_imagens"].iloc[0], list)
+    # colunas aninhadas vão em JSON dentro do Arrow, não em pickle
+    assert serializar(df)[:1] == b"A"
+
+
+def test_tupla_de_dataframes_aninhados_e_planos():
+    aninhado = pd.DataFrame({"emocoes_imagens": EMOCOES_IMAGENS})
+    plano = pd.DataFrame({"turma_id": ["A", "B"], "media": [1.5, 2.0]})
+
+    lido_aninhado, lido_plano = desserializar(serializar((aninhado, plano)))
+
+    assert list(lido_aninhado["emocoes_imagens"]) == EMOCOES_IMAGENS
+    pd.testing.assert_frame_equal(lido_plano, plano)
+    # o plano continua em Arrow
+    assert serializar(plano)[:1] == b"A"
+
+
+def test_valores_simples_vao_em_json():
+    for valor in (True, 3, 2.5, "texto", None, {"turmas": ["A", "B"]}):
+        assert desserializar(serializar(valor)) == valor
+
+
+def test_pickle_lido_do_backend_e_recusado():
+    class Explosivo:
+        def __reduce__(self):
+            return (pytest.fail, ("pickle desserializado",))
+
+    cache = CacheCompartilhado("teste", BackendMemoria())
+    cache.backend.gravar(cache._chave("x"), b"P" + pickle.dumps(Explosivo()), ttl=None)
+
+    assert cache.obter("x") is None
+    assert cache.erros == 1
+
+
+def test_valor_sem_forma_segura_nao_e_compartilhado():
+    cache = CacheCompartilhado("teste", BackendMemoria())
+    misto = pd.DataFrame({"valor": [1, "x", 2.5]})
+
+    cache.gravar("misto", misto)
+    cache.gravar("objeto", object())
+
+    assert not cache.contem("misto") and not cache.contem("objeto")
+    assert cache.erros == 0
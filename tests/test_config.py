@@ -0,0 +1,146 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+import config
+
+
+class BancoFalso:
+    """Substitui _executar_no_banco: conta as execuções e responde conforme `modo`."""
+
+    def __init__(self):
+        self.execucoes = 0
+        self.modo = "ok"
+        self.espera = 0.0
+        self.valor = 1
+
+    def __call__(self, query_text, params, execucao):
+        self.execucoes += 1
+        time.sleep(self.espera)
+        if self.modo == "falha":
+            raise OperationalError(query_text, params, Exception("statement timeout"))
+        if self.modo == "pool":
+            raise PoolTimeoutError("QueuePool limit reached")
+        return pd.DataFrame({"valor": [self.valor]})
+
+
+@pytest.fixture
+def banco(monkeypatch):
+    falso = BancoFalso()
+    monkeypatch.setattr(config, "_executar_no_banco", falso)
+    monkeypatch.setattr(config, "DISJUNTOR_BANCO", config.DisjuntorBanco(limite=3, espera=30))
+    config._ULTIMOS_RESULTADOS.clear()
+    return falso
+
+
+def _gravacoes():
+    """Espera o _POOL_GRAVACAO guardar os últimos resultados válidos."""
+    config._POOL_GRAVACAO.submit(lambda: None).result()
+
+
+def test_chamadas_simultaneas_viram_uma_execucao(banco):
+    banco.espera = 0.3
+    resultados = []
+    threads = [
+        threading.Thread(target=lambda: resultados.append(config.executar_query("select 'simultaneas'")))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert banco.execucoes == 1
+    assert [df["valor"].iloc[0] for df in resultados] == [1] * 5
+    # cada chamada recebe a própria cópia
+    assert len({id(df) for df in resultados}) == 5
+
+
+def test_falha_serve_o_ultimo_resultado_valido(banco):
+    config.executar_query("select 'falha'", nome="competencias")
+    _gravacoes()
+
+    banco.modo = "falha"
+    df = config.executar_query("select 'falha'", nome="competencias")
+
+    assert df["valor"].iloc[0] == 1
+    assert "dados_de" in df.attrs
+
+
+def test_pool_esgotado_serve_o_ultimo_resultado_valido(banco):
+    config.executar_query("select 'pool'", nome="competencias")
+    _gravacoes()
+
+    banco.modo = "pool"
+    df = config.executar_query("select 'pool'", nome="competencias")
+
+    assert "dados_de" in df.attrs
+
+
+def test_sem_resultado_guardado_a_falha_chega_a_pagina(banco):
+    banco.modo = "falha"
+    with pytest.raises(OperationalError):
+        config.executar_query("select 'sem antigo'", nome="competencias")
+
+
+def test_consulta_sem_ultimo_valido_nunca_serve_antigo(banco):
+    config.executar_query("select 'delta'", nome="competencias_delta", ultimo_valido=False)
+    _gravacoes()
+    assert not config._ULTIMOS_RESULTADOS
+
+    banco.modo = "falha"
+    with pytest.raises(OperationalError):
+        config.executar_query("select 'delta'", nome="competencias_delta", ultimo_valido=False)
+
+
+def test_banco_lento_serve_antigo_e_entrega_a_revalidacao(banco, monkeypatch):
+    monkeypatch.setattr(config, "ESPERA_REVALIDACAO", 0.2)
+    config.executar_query("select 'lento'", nome="competencias")
+    _gravacoes()
+
+    banco.espera, banco.valor = 0.6, 2
+    inicio = time.time()
+    df = config.executar_query("select 'lento'", nome="competencias")
+    assert time.time() - inicio < 0.5
+    assert df["valor"].iloc[0] == 1 and "dados_de" in df.attrs
+
+    # a revalidação termina em segundo plano; a próxima chamada recebe o resultado novo sem ir ao banco
+    time.sleep(0.6)
+    _gravacoes()
+    execucoes = banco.execucoes
+    df = config.executar_query("select 'lento'", nome="competencias")
+    assert df["valor"].iloc[0] == 2 and "dados_de" not in df.attrs
+    assert banco.execucoes == execucoes
+
+
+def test_consulta_lenta_sem_antigo_e_esperada(banco, monkeypatch):
+    monkeypatch.setattr(config, "ESPERA_REVALIDACAO", 0.1)
+    banco.espera = 0.4
+
+    df = config.executar_query("select 'lenta'", nome="competencias")
+
+    assert df["valor"].iloc[0] == 1 and "dados_de" not in df.attrs
+
+
+def test_circuito_abre_e_meio_aberto_deixa_uma_sonda(banco):
+    banco.modo = "falha"
+    for _ in range(3):
+        with pytest.raises(OperationalError):
+            config.executar_query("select 'circuito'")
+    assert config.DISJUNTOR_BANCO.aberto()
+
+    with pytest.raises(config.CircuitoAberto):
+        config.executar_query("select 'circuito'")
+    assert banco.execucoes == 3
+
+    # passada a espera, só uma consulta testa o banco
+    disjuntor = config.DISJUNTOR_BANCO
+    disjuntor.aberto_ate = 0
+    assert disjuntor.permitir()
+    assert not disjuntor.permitir()
+    disjuntor.registrar_sucesso()
+    assert disjuntor.permitir() and not disjuntor.aberto()
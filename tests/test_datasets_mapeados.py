@@ -0,0 +1,94 @@
+import pandas as pd
+import pytest
+
+from datasets_mapeados import DatasetsMapeados
+
+# feelings_results como o pipeline_emocoes grava e o banco devolve (JSONB → list[dict]):
+# fotos com chaves diferentes, foto sem emoções e avaliação sem resultado
+EMOCOES_IMAGENS = [
+    [
+        {
+            "emotions": {"angry": 0.12, "disgust": 0.0, "fear": 1.3, "happy": 91.2, "sad": 2.1, "surprise": 0.4, "neutral": 4.88},
+            "dominant_emotion": "happy",
+        },
+        {"emotions": {"happy": 12.5, "neutral": 87.5}, "dominant_emotion": "neutral"},
+        {"error": "Face could not be detected"},
+    ],
+    [{"emotions": {}, "dominant_emotion": None}],
+    None,
+]
+
+
+def _sentimentos():
+    return pd.DataFrame({
+        "aluno_id": [10, 11, 12],
+        "turma_id": ["2025: 1ª série A Manhã"] * 3,
+        "emocoes_imagens": EMOCOES_IMAGENS,
+    })
+
+
+@pytest.mark.parametrize("compressao", ["zstd", "nenhuma"])
+def test_emocoes_imagens_voltam_como_gravadas(tmp_path, compressao):
+    datasets = DatasetsMapeados(diretorio=tmp_path, compressao=compressao)
+    df = _sentimentos()
+
+    lido = datasets.publicar(("sentimentos", "gestor", 1, 0), df)
+
+    assert list(lido["emocoes_imagens"]) == EMOCOES_IMAGENS
+    assert isinstance(lido["emocoes_imagens"].iloc[0], list)
+    # como a página usa: max() sobre as emoções de cada foto
+    foto = lido["emocoes_imagens"].iloc[0][0]
+    assert max(foto["emotions"], key=foto["emotions"].get) == "happy"
+
+
+def test_emocoes_imagens_em_outro_processo_e_por_coluna(tmp_path):
+    DatasetsMapeados(diretorio=tmp_path).publicar(("sentimentos", "gestor", 1, 0), _sentimentos())
+
+    # outro processo: só o arquivo
+    outro = DatasetsMapeados(diretorio=tmp_path)
+    lido = outro.abrir(("sentimentos", "gestor", 1, 0), colunas=["emocoes_imagens"])
+
+    assert list(lido.columns) == ["emocoes_imagens"]
+    assert list(lido["emocoes_imagens"]) == EMOCOES_IMAGENS
+
+
+@pytest.mark.parametrize("compressao", ["zstd", "nenhuma"])
+def test_copias_das_sessoes_sao_isoladas(tmp_path, compressao):
+    datasets = DatasetsMapeados(diretorio=tmp_path, compressao=compressao)
+    carregar = datasets.em_cache("turmas")(lambda gestor: pd.DataFrame({"media": [1.0, 2.0], "turma": ["A", "B"]}))
+
+    uma, outra = carregar("gestor"), carregar("gestor")
+    uma.loc[0, "media"] = 10.0
+    uma["nova"] = 1
+
+    assert list(outra["media"]) == [1.0, 2.0]
+    assert "nova" not in outra.columns
+    assert list(carregar("gestor")["media"]) == [1.0, 2.0]
+
+
+@pytest.mark.parametrize("compressao", ["zstd", "nenhuma"])
+def test_publicar_e_abrir_em_outro_processo(tmp_path, compressao):
+    df = pd.DataFrame({
+        "aluno_id": pd.array([1, 2, None], dtype="Int64"),
+        "media": [7.5, 8.25, None],
+        "turma": ["A", "A", None],
+        "data": pd.to_datetime(["2025-03-01", "2025-03-02", None]),
+    })
+    DatasetsMapeados(diretorio=tmp_path, compressao=compressao).publicar(("turmas", "gestor", 1), df)
+
+    lido = DatasetsMapeados(diretorio=tmp_path, compressao=compressao).abrir(("turmas", "gestor", 1))
+
+    pd.testing.assert_frame_equal(lido, df, check_dtype=False)
+    assert lido["data"].dtype.kind == "M"
+
+
+def test_fora_do_arrow_fica_so_neste_processo(tmp_path):
+    datasets = DatasetsMapeados(diretorio=tmp_path)
+    df = pd.DataFrame({"valor": [1, "x", 2.5]})
+
+    datasets.publicar(("misto", 1), df)
+
+    assert list(datasets.abrir(("misto", 1))["valor"]) == [1, "x", 2.5]
+    assert DatasetsMapeados(diretorio=tmp_path).abrir(("misto", 1)) is None
+    datasets.descartar(("misto", 1))
+    assert datasets.abrir(("misto", 1)) is None
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from datasets_mapeados import DatasetsMapeados
+from indices_mapa import IndiceEspacial, IndiceHierarquico
+
+
+def _escolas():
+    return pd.DataFrame({
+        "school_name": ["E1", "E2", "E3", "E4", "E5"],
+        "state": ["BA", "BA", "SP", "SP", None],
+        "city": ["Salvador", "Ilhéus", "Santos", "Santos", None],
+        "lat_jitter": [-12.97, -14.79, -23.96, -23.95, -10.0],
+        "lon_jitter": [-38.50, -39.04, -46.33, -46.32, -40.0],
+    }).sort_values(["state", "city"], kind="stable", na_position="last", ignore_index=True)
+
+
+@pytest.fixture
+def mapeado(tmp_path):
+    return DatasetsMapeados(diretorio=tmp_path, compressao="nenhuma").publicar(("mapa_escolas", 1), _escolas())
+
+
+def test_hierarquico_fatia_o_df_mapeado_sem_copia(mapeado):
+    indice = IndiceHierarquico(mapeado)
+
+    assert np.shares_memory(indice.df["lat_jitter"].to_numpy(), mapeado["lat_jitter"].to_numpy())
+    assert indice.estados == ["BA", "SP"]
+    assert indice.cidades("BA") == ["Ilhéus", "Salvador"]
+    assert list(indice.fatiar("SP")["school_name"]) == ["E3", "E4"]
+    assert indice.total_escolas("Todos") == 5 and indice.total_escolas("SP", "Santos") == 2
+
+
+def test_hierarquico_ordena_df_fora_de_ordem():
+    indice = IndiceHierarquico(_escolas().iloc[::-1])
+
+    assert list(indice.fatiar("BA", "Salvador")["school_name"]) == ["E1"]
+
+
+def test_espacial_consulta_sem_reordenar_o_df(mapeado):
+    indice = IndiceEspacial(mapeado)
+
+    assert indice.df is mapeado
+    visiveis = indice.consultar(-24.0, -46.5, -23.9, -46.3)
+    assert sorted(visiveis["school_name"]) == ["E3", "E4"]
+    assert indice.consultar(0, 0, 1, 1).empty
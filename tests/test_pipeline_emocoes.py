@@ -0,0 +1,37 @@
+import pytest
+
+from pipeline_emocoes import EMOCOES, executar_pipeline
+
+
+@pytest.fixture
+def fotos(tmp_path):
+    for avaliacao, nomes in {"101": ["a.jpg", "b.png"], "102": ["c.jpg"]}.items():
+        pasta = tmp_path / avaliacao
+        pasta.mkdir()
+        for nome in nomes:
+            (pasta / nome).write_bytes(nome.encode())
+    (tmp_path / "102" / "notas.txt").write_text("não é foto")
+    return tmp_path
+
+
+@pytest.mark.parametrize("lote", [1, 2, 16])
+def test_stub_em_lotes(fotos, lote):
+    resultados, metricas = executar_pipeline(fotos, backend="stub", processos=1, lote=lote)
+
+    assert metricas["fotos"] == 3 and metricas["erros"] == 0
+    assert [len(resultados["101"]), len(resultados["102"])] == [2, 1]
+    foto = resultados["101"][0]
+    assert set(foto["emotions"]) == set(EMOCOES)
+    assert sum(foto["emotions"].values()) == pytest.approx(100, abs=0.01)
+    assert foto["dominant_emotion"] == max(foto["emotions"], key=foto["emotions"].get)
+
+
+def test_resultado_nao_depende_do_lote(fotos):
+    assert executar_pipeline(fotos, backend="stub", processos=1, lote=1)[0] == \
+        executar_pipeline(fotos, backend="stub", processos=1, lote=3)[0]
+
+
+@pytest.mark.parametrize("parametros", [{"lote": 0}, {"lote": -4}, {"processos": 0}, {"backend": "nenhum"}])
+def test_parametros_invalidos(fotos, parametros):
+    with pytest.raises(ValueError):
+        executar_pipeline(fotos, **{"backend": "stub", **parametros})
@@ -0,0 +1,108 @@
+# versao_dados.py
+"""
+Versão dos dados para invalidar caches: uma sonda barata (COUNT + MAX(updated_at) em
+littera.children_avaliation) em vez de rodar o join completo para descobrir se algo mudou.
+
+- versao_gestor(email_hash): avaliações das escolas do gestor (painéis por gestor);
+- versao_global(): todas as avaliações + nº de escolas (mapa de escolas).
+
+O COUNT pega exclusões e o MAX(updated_at) pega inclusões e alterações. Cada versão é
+consultada no banco no máximo uma vez a cada VERSAO_INTERVALO segundos por processo;
+entre uma sonda e outra a versão sai da memória. Datasets, agregados e figuras usam a
+versão como parte da chave, então dados novos geram uma chave nova e nada antigo é
+servido como atual. O ttl dos caches fica só como rede de segurança para mudanças que a
+sonda não enxerga (ex.: nome de escola).
+"""
+import logging
+import os
+import threading
+import time
+
+from config import executar_query
+
+INTERVALO_SONDA = int(os.getenv("VERSAO_INTERVALO", "30"))
+
+QUERY_VERSAO_GESTOR = """
+SELECT
+    COUNT(av.id) AS total,
+    MAX(av.updated_at) AS atualizado_em
+FROM auth.users u
+JOIN auth.school_users su ON u.id = su.user_id
+JOIN core.school_classes t ON su.school_id = t.school_id
+JOIN core.children a ON t.id = a.class_id
+JOIN littera.children_avaliation av ON a.id = av.child_id
+WHERE u.email_hash = :email_hash
+"""
+
+QUERY_VERSAO_GLOBAL = """
+SELECT
+    COUNT(av.id) + (SELECT COUNT(*) FROM core.schools WHERE is_demo IS FALSE) AS total,
+    MAX(av.updated_at) AS atualizado_em
+FROM littera.children_avaliation av
+"""
+
+
+class SondaVersao:
+    """
+    Versões por escopo (email_hash do gestor, ou None para o global), revalidadas no
+    banco no máximo a cada `intervalo` segundos. Se a sonda falhar, a última versão
+    conhecida continua valendo.
+    """
+
+    def __init__(self, intervalo=INTERVALO_SONDA):
+        self.intervalo = intervalo
+        self._versoes = {}   # escopo → (versão, momento da sonda)
+        self._lock = threading.Lock()
+
+    def versao(self, email_hash=None):
+        with self._lock:
+            atual = self._versoes.get(email_hash)
+        if atual is not None and time.time() - atual[1] < self.intervalo:
+            return atual[0]
+
+        try:
+            nova = self._sondar(email_hash)
+        except Exception as e:
+            if atual is None:
+                raise
+            logging.warning(f"⚠️ Sonda de versão falhou ({e}); mantendo a versão {atual[0]}")
+            nova = atual[0]
+
+        with self._lock:
+            self._versoes[email_hash] = (nova, time.time())
+        if atual is not None and nova != atual[0]:
+            logging.info(f"🔄 Dados {'globais' if email_hash is None else 'do gestor'} mudaram: versão {atual[0]} → {nova}")
+        return nova
+
+    @staticmethod
+    def _sondar(email_hash):
+        if email_hash is None:
+            linha = executar_query(QUERY_VERSAO_GLOBAL, nome="versao_global")
+        else:
+            linha = executar_query(QUERY_VERSAO_GESTOR, params={"email_hash": email_hash}, nome="versao_gestor")
+        total, atualizado_em = linha.iloc[0]["total"], linha.iloc[0]["atualizado_em"]
+        return f"{int(total)}@{atualizado_em}"
+
+    def invalidar(self, email_hash=None):
+        """Força a próxima chamada a sondar o banco."""
+        with self._lock:
+            self._versoes.pop(email_hash, None)
+
+
+# Instância única do processo
+SONDA_VERSAO = SondaVersao()
+
+
+def versao_gestor(email_hash):
+    """Versão atual dos dados do gestor."""
+    return SONDA_VERSAO.versao(email_hash)
+
+
+def versao_global():
+    """Versão atual dos dados de todas as escolas."""
+    return SONDA_VERSAO.versao(None)
+
+
+def total_da_versao(versao):
+    """Total de avaliações (COUNT da sonda) embutido na versão ("1234@2025-06-01 ...")."""
+    return int(versao.split("@", 1)[0])